@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 17:52:10 2026
+@author: Jérémie Fache
+
+Messages per second and thread count of N streams, each filtering and
+counting READY messages, with one EventLoopScheduler per stream (as in
+roaming/rx_reminder) and with moebius.bus.aio on a single event loop.
+"""
+
+import asyncio
+import threading
+import time
+import rx
+from moebius.bus import messages
+from moebius.bus.aio import AsyncSubject
+
+N_STREAMS = 200
+N_MESSAGES = 200
+
+is_ready = messages.oftype(status=messages.READY)
+
+
+def create_messages():
+    return [messages.ready('s{}'.format(i % 7), payload=i) if i % 2 else
+            messages.processing('s{}'.format(i % 7), ratio=(i, N_MESSAGES))
+            for i in range(N_MESSAGES)]
+
+
+def bench_eventloopscheduler(bms):
+    remaining = [N_STREAMS]
+    lock = threading.Lock()
+    done = threading.Event()
+
+    def completed():
+        with lock:
+            remaining[0] -= 1
+            if not remaining[0]:
+                done.set()
+
+    subjects = []
+    for _ in range(N_STREAMS):
+        subject = rx.subjects.Subject()
+        (subject
+         .observe_on(rx.concurrency.EventLoopScheduler())
+         .filter(is_ready)
+         .scan(lambda c, _: c + 1, seed=0)
+         .subscribe(on_completed=completed))
+        subjects.append(subject)
+
+    start = time.perf_counter()
+    for bm in bms:
+        for subject in subjects:
+            subject.on_next(bm)
+    for subject in subjects:
+        subject.on_completed()
+    threads = threading.active_count()
+    done.wait()
+    return time.perf_counter() - start, threads
+
+
+def bench_asyncio(bms):
+    async def main():
+        subjects = []
+        tasks = []
+        for _ in range(N_STREAMS):
+            subject = AsyncSubject()
+            tasks.append(subject
+                         .filter(is_ready)
+                         .scan(lambda c, _: c + 1, seed=0)
+                         .subscribe())
+            subjects.append(subject)
+        await asyncio.sleep(0)
+
+        start = time.perf_counter()
+        for bm in bms:
+            for subject in subjects:
+                subject.on_next(bm)
+        for subject in subjects:
+            subject.on_completed()
+        threads = threading.active_count()
+        await asyncio.gather(*tasks)
+        return time.perf_counter() - start, threads
+
+    return asyncio.run(main())
+
+
+if __name__ == '__main__':
+    bms = create_messages()
+    total = N_STREAMS * N_MESSAGES
+
+    # asyncio first: EventLoopScheduler threads outlive their streams
+    for name, bench in (('asyncio', bench_asyncio),
+                        ('EventLoopScheduler', bench_eventloopscheduler)):
+        duration, threads = bench(bms)
+        print('{:20s} {:10.0f} messages/s  {:4d} threads'.format(
+            name, total / duration, threads))
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 13:20:41 2026
+@author: Jérémie Fache
+
+Memory used by a buffered window of bus messages, stored as a list of
+BusMessage and as a columnar MessageBatch.
+"""
+
+import gc
+import tracemalloc
+from pyrsistent import (m as pm, s as ps)
+from moebius.bus import messages
+from moebius.bus.batch import MessageBatch
+
+N_MESSAGES = 50000
+N_TAGS = 50
+N_ROOTS = 20
+
+
+def stream():
+    """
+    Emits READY and PROCESSING messages. Seeds are rebuilt for every message
+    (e.g. by combine_seeds) so equal seeds are distinct objects.
+    """
+    for i in range(N_MESSAGES):
+        tag = 'stage{}'.format(i % N_TAGS)
+        root = i % N_ROOTS
+        seeds = messages.combine_seeds(pm(root=ps('uid{}'.format(root))),
+                                       pm(other=ps('uid{}'.format(root))))
+        if i % 4:
+            yield messages.processing(tag, ratio=(i % 4, 4), seeds=seeds)
+        else:
+            yield messages.ready(tag, payload=i, seeds=seeds)
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    window = build()
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return window, current
+
+
+if __name__ == '__main__':
+    bms, list_bytes = measure(lambda: list(stream()))
+    del bms
+    batch, batch_bytes = measure(lambda: MessageBatch.from_messages(stream()))
+
+    print('messages:           {}'.format(N_MESSAGES))
+    print('list of BM:         {:10.1f} MB  {:6.1f} B/message'.format(
+        list_bytes / 1e6, list_bytes / N_MESSAGES))
+    print('MessageBatch:       {:10.1f} MB  {:6.1f} B/message'.format(
+        batch_bytes / 1e6, batch_bytes / N_MESSAGES))
+    print('reduction:          {:10.1f}x'.format(list_bytes / batch_bytes))
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 19:40:07 2026
+@author: Jérémie Fache
+
+Encoding and decoding throughput of moebius.bus.codec compared with pickle,
+for a stream of READY and PROCESSING messages carrying seeds.
+"""
+
+import pickle
+import time
+from pyrsistent import freeze
+from pyrsistent import s as ps
+from moebius.bus import messages
+from moebius.bus import codec
+
+N_MESSAGES = 20000
+
+
+def create_messages():
+    bms = []
+    for i in range(N_MESSAGES):
+        tag = 'stage{}'.format(i % 20)
+        seeds = freeze({'root{}'.format(i % 3): ps('uid{}'.format(i % 50)),
+                        'other': ps('uid{}'.format(i % 7))})
+        if i % 5:
+            bms.append(messages.processing(tag, ratio=(i % 5, 5), seeds=seeds))
+        else:
+            bms.append(messages.ready(tag, payload=float(i), seeds=seeds))
+    return bms
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    bms = create_messages()
+
+    pickled, pickle_enc = timed(
+        lambda: [pickle.dumps(bm, pickle.HIGHEST_PROTOCOL) for bm in bms])
+    _, pickle_dec = timed(lambda: [pickle.loads(data) for data in pickled])
+
+    encoded, codec_enc = timed(lambda: [codec.encode(bm) for bm in bms])
+    _, codec_dec = timed(lambda: [codec.decode(data) for data in encoded])
+
+    encoder = codec.Encoder()
+    streamed, stream_enc = timed(lambda: [encoder.encode(bm) for bm in bms])
+    decoder = codec.Decoder()
+    _, stream_dec = timed(lambda: [decoder.decode(data) for data in streamed])
+
+    print('{:24s} {:>12s} {:>12s} {:>10s}'.format(
+        '', 'encode msg/s', 'decode msg/s', 'B/message'))
+    for name, enc, dec, datas in (
+            ('pickle', pickle_enc, pickle_dec, pickled),
+            ('codec.encode', codec_enc, codec_dec, encoded),
+            ('codec.Encoder (stream)', stream_enc, stream_dec, streamed)):
+        size = sum(len(data) for data in datas) / N_MESSAGES
+        print('{:24s} {:12.0f} {:12.0f} {:10.1f}'.format(
+            name, N_MESSAGES / enc, N_MESSAGES / dec, size))
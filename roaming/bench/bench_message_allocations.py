@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Oct 22 18:05:44 2026
+@author: Jérémie Fache
+
+Memory retained and time per message of the message factories, against
+their former implementations (pmap progress payloads, namedtuple keyword
+construction and _replace() in identify()).
+"""
+
+import gc
+import time
+import tracemalloc
+from pyrsistent import (m as pm, s as ps)
+from moebius.bus import messages
+from moebius.bus.messages import BM
+
+N_MESSAGES = 100000
+# distinct uids of identify(), e.g. roots identified again downstream
+N_UIDS = 100
+
+
+def former_processing(tag, ratio=None, meta=None, seeds=pm()):
+    return BM(tag=tag, status=messages.PROCESSING,
+              payload=pm(ratio=ratio, meta=meta), seeds=seeds)
+
+
+def former_identify(bm, uid):
+    return bm._replace(seeds=pm(**{bm.tag: ps(uid)}))
+
+
+def former_ready(tag, payload=None, seeds=pm()):
+    return BM(tag=tag, status=messages.READY, payload=payload, seeds=seeds)
+
+
+RATIOS = [(i, N_MESSAGES) for i in range(N_MESSAGES)]
+UIDS = ['uid{}'.format(i % N_UIDS) for i in range(N_MESSAGES)]
+PAYLOADS = list(range(N_MESSAGES))
+ROOT = messages.ready('ROOT', 0)
+
+CASES = [
+    ('processing', lambda: [former_processing('tag', ratio)
+                            for ratio in RATIOS],
+     lambda: [messages.processing('tag', ratio) for ratio in RATIOS]),
+    ('identify', lambda: [former_identify(ROOT, uid) for uid in UIDS],
+     lambda: [ROOT.identify(uid) for uid in UIDS]),
+    ('ready', lambda: [former_ready('tag', payload) for payload in PAYLOADS],
+     lambda: messages.ready_many('tag', PAYLOADS)),
+]
+
+
+def retained(build):
+    """
+    Returns the bytes retained per message by the list built by *build*.
+    """
+    gc.collect()
+    tracemalloc.start()
+    bms = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del bms
+    return current / N_MESSAGES
+
+
+def best_time(build, repeat=7):
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        build()
+        duration = time.perf_counter() - start
+        best = duration if best is None else min(best, duration)
+    return best / N_MESSAGES
+
+
+if __name__ == '__main__':
+    print('{:12s} {:>22s} {:>22s}'.format('', 'bytes/message', 'us/message'))
+    for name, former, current in CASES:
+        # warms the seeds cache up
+        current()
+        former_bytes, current_bytes = retained(former), retained(current)
+        former_time, current_time = best_time(former), best_time(current)
+        print('{:12s} {:8.1f} -> {:8.1f}   {:8.3f} -> {:8.3f}  ({:.1f}x)'
+              .format(name, former_bytes, current_bytes, former_time * 1e6,
+                      current_time * 1e6, former_time / current_time))
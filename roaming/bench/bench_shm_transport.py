@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 18:30:12 2026
+@author: Jérémie Fache
+
+Throughput of large payloads sent to a subscriber process, through a
+multiprocessing queue (pickled and copied) or through moebius.bus.shm
+(envelope in the queue, payload read in place from shared memory).
+"""
+
+import multiprocessing
+import time
+from moebius.bus import messages
+from moebius.bus.shm import (SharedRing, ShmPublisher, ShmSubscriber)
+
+N_MESSAGES = 200
+PAYLOAD_SIZE = 8 * 1024 * 1024
+
+
+def consume_queue(control, done):
+    total = 0
+    while True:
+        bm = control.get()
+        if bm.payload is None:
+            break
+        total += bm.payload[-1]
+    done.put(total)
+
+
+def consume_shm(control, acks, done):
+    subscriber = ShmSubscriber(control, acks)
+    total = 0
+    while True:
+        bm = subscriber.get()
+        if bm.payload is None:
+            break
+        with subscriber.payload(bm) as payload:
+            total += payload[-1]
+    subscriber.close()
+    done.put(total)
+
+
+def run(target, args, publish, done):
+    process = multiprocessing.Process(target=target, args=args)
+    process.start()
+    payload = bytes(PAYLOAD_SIZE)
+    start = time.perf_counter()
+    for _ in range(N_MESSAGES):
+        publish(messages.ready('FRAME', payload))
+    publish(messages.ready('END'))
+    done.get()
+    duration = time.perf_counter() - start
+    process.join()
+    return duration
+
+
+if __name__ == '__main__':
+    control = multiprocessing.Queue()
+    done = multiprocessing.Queue()
+    queue_time = run(consume_queue, (control, done), control.put, done)
+
+    with SharedRing(8 * PAYLOAD_SIZE) as ring:
+        control = multiprocessing.Queue()
+        publisher = ShmPublisher(ring, [control])
+        shm_time = run(consume_shm, (control, ring.acks, done),
+                       publisher.publish, done)
+
+    size = N_MESSAGES * PAYLOAD_SIZE / 1e9
+    print('{} messages of {} MB'.format(N_MESSAGES, PAYLOAD_SIZE >> 20))
+    for name, duration in (('multiprocessing.Queue', queue_time),
+                           ('shared memory ring', shm_time)):
+        print('{:24s} {:8.3f} s {:8.2f} GB/s'.format(
+            name, duration, size / duration))
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Oct 22 16:52:18 2026
+@author: Jérémie Fache
+
+Load test of a pipeline in virtual time: one minute of bursty traffic
+through progress coalescing, deduplication and two stages, the second one
+bounded. The report is the same on every run with the same seed.
+"""
+
+import sys
+from moebius.bus import messages
+from moebius.bus.operators import (coalesce_processing, Deduplicate)
+from moebius.bus.simulation import (LoadGenerator, Simulation, format_report)
+
+DURATION = 60.0
+
+
+if __name__ == '__main__':
+    seed = int(sys.argv[1]) if len(sys.argv) > 1 else 0
+    sim = Simulation()
+    load = LoadGenerator({'CAM1': 4, 'CAM2': 2, 'CAM3': 1}, rate=150,
+                         steps=20, job_time=0.05, burst_period=5.0,
+                         burst_duration=0.5, burst_factor=4, seed=seed)
+
+    (sim.source(load, DURATION)
+     .let(coalesce_processing(window=0.01, scheduler=sim.scheduler))
+     .let(Deduplicate(max_messages=10000, window=10.0,
+                      scheduler=sim.scheduler))
+     .let(sim.stage('decode', 0.0005))
+     .filter(messages.oftype(status=messages.READY))
+     .let(sim.stage('fft', 0.004, workers=2, maxsize=50))
+     .subscribe())
+
+    print(format_report(sim.run()))
@@ -5,7 +5,34 @@ Created on Sat Oct 28 19:32:22 2017
 """
 import sys
 
+
+def _bench(args):
+    from moebius import bench
+    return bench.main(args)
+
+
+def _stats(args):
+    from moebius.bus import metrics
+    return metrics.main(args)
+
+
+def _shard(args):
+    from moebius.bus import shard
+    return shard.main(args)
+
+
+# subcommands: name -> function taking the remaining arguments and
+# returning the exit status
+COMMANDS = {'bench': _bench,
+            'stats': _stats,
+            'shard': _shard}
+
+
 def main(args=None):
+    argv = sys.argv[1:] if args is None else args
+    if argv and argv[0] in COMMANDS:
+        return COMMANDS[argv[0]](argv[1:])
+
     print("Lauching moebius")
     if args is None:
         args = sys.argv[1:]
@@ -26,4 +53,4 @@ def main(args=None):
 
 if __name__ == "__main__":
     print("moebius called from python -m")
-    main()
+    sys.exit(main())
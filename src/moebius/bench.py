@@ -0,0 +1,426 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 09:12:44 2026
+@author: Jérémie Fache
+"""
+
+import argparse
+import itertools
+import json
+import platform
+import random
+import sys
+import time
+from collections import (OrderedDict, deque)
+import rx
+from pyrsistent import (m as pm, s as ps)
+from moebius.bus import messages
+from moebius.bus.lineage import LineageIndex
+from moebius.bus.metrics import Metrics
+from moebius.bus.priority import PriorityBuffer
+
+# name -> (setup function, parameter sweeps, quick parameter sweeps)
+BENCHMARKS = OrderedDict()
+
+
+def benchmark(name, sweeps, quick=None):
+    """
+    Registers a benchmark.
+
+    The decorated function takes the parameters of one point of the sweeps
+    as keyword arguments and returns the function to be timed (setup is
+    not timed). *sweeps* maps each parameter to its list of values; *quick*
+    gives smaller sweeps used with --quick.
+    """
+    def decorator(setup):
+        BENCHMARKS[name] = (setup, sweeps, quick or sweeps)
+        return setup
+    return decorator
+
+
+def _points(sweeps):
+    names = list(sweeps)
+    for values in itertools.product(*(sweeps[name] for name in names)):
+        yield OrderedDict(zip(names, values))
+
+
+def _key(params):
+    return ','.join('{}={}'.format(name, value)
+                    for name, value in params.items())
+
+
+def _time(func, repeat, min_time):
+    """
+    Returns the best time of one call of *func*, in seconds.
+    """
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        duration = time.perf_counter() - start
+        if duration >= min_time:
+            break
+        number *= 2 if duration <= 0 else max(2, int(min_time / duration))
+
+    best = duration / number
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+# -----------------------------------------------------------------------------
+# -----------------------------------------------------------------------------
+def _random_tag(rnd, length=8):
+    return ''.join(rnd.choice('abcdefgh') for _ in range(length))
+
+
+def _tag_selectors(rnd, n_tags, ellipsis_share):
+    n_ellipsis = int(round(n_tags * ellipsis_share))
+    return ([_random_tag(rnd, 3) + '...' for _ in range(n_ellipsis)]
+            + [_random_tag(rnd) for _ in range(n_tags - n_ellipsis)])
+
+
+def _messages(rnd, n_messages):
+    return [messages.ready(_random_tag(rnd), payload=i)
+            if i % 2 else
+            messages.processing(_random_tag(rnd), ratio=(i, n_messages))
+            for i in range(n_messages)]
+
+
+@benchmark('oftype',
+           sweeps={'n_tags': [1, 10, 100],
+                   'ellipsis_share': [0.0, 0.5, 1.0],
+                   'n_messages': [1000, 10000]},
+           quick={'n_tags': [1, 100],
+                  'ellipsis_share': [0.0, 1.0],
+                  'n_messages': [1000]})
+def bench_oftype(n_tags, ellipsis_share, n_messages):
+    rnd = random.Random(0)
+    tags = _tag_selectors(rnd, n_tags, ellipsis_share)
+    bms = _messages(rnd, n_messages)
+    predicate = messages.oftype(tags, messages.READY)
+
+    def run():
+        for bm in bms:
+            predicate(bm)
+    return run
+
+
+@benchmark('oftype_mask',
+           sweeps={'n_tags': [1, 10, 100],
+                   'ellipsis_share': [0.0, 0.5, 1.0],
+                   'n_messages': [1000, 10000]},
+           quick={'n_tags': [1, 100],
+                  'ellipsis_share': [0.0, 1.0],
+                  'n_messages': [1000]})
+def bench_oftype_mask(n_tags, ellipsis_share, n_messages):
+    rnd = random.Random(0)
+    tags = _tag_selectors(rnd, n_tags, ellipsis_share)
+    bms = _messages(rnd, n_messages)
+    predicate = messages.oftype(tags, messages.READY)
+
+    return lambda: predicate.mask(bms)
+
+
+@benchmark('oftype_build',
+           sweeps={'n_tags': [1, 10, 100],
+                   'ellipsis_share': [0.0, 0.5, 1.0]},
+           quick={'n_tags': [1, 100],
+                  'ellipsis_share': [0.5]})
+def bench_oftype_build(n_tags, ellipsis_share):
+    rnd = random.Random(0)
+    tags = _tag_selectors(rnd, n_tags, ellipsis_share)
+
+    return lambda: messages.oftype(tags, messages.READY)
+
+
+@benchmark('combine_seeds',
+           sweeps={'n_maps': [2, 10, 50],
+                   'seed_size': [1, 100, 1000]},
+           quick={'n_maps': [2, 50],
+                  'seed_size': [1, 100]})
+def bench_combine_seeds(n_maps, seed_size):
+    seedss = [pm(root=ps(*('uid{}-{}'.format(i, j)
+                           for j in range(seed_size))),
+                 **{'tag{}'.format(i): ps('uid{}'.format(i))})
+              for i in range(n_maps)]
+
+    return lambda: messages.combine_seeds(*seedss)
+
+
+@benchmark('identify',
+           sweeps={'n_messages': [1000, 10000]},
+           quick={'n_messages': [1000]})
+def bench_identify(n_messages):
+    bms = _messages(random.Random(0), n_messages)
+    uids = ['uid{}'.format(i) for i in range(n_messages)]
+
+    def run():
+        for bm, uid in zip(bms, uids):
+            bm.identify(uid)
+    return run
+
+
+@benchmark('identify_repeated',
+           sweeps={'n_uids': [10, 1000],
+                   'n_messages': [1000, 10000]},
+           quick={'n_uids': [10],
+                  'n_messages': [1000]})
+def bench_identify_repeated(n_uids, n_messages):
+    """
+    identify() with uids seen before, e.g. roots identified again
+    downstream.
+    """
+    bm = messages.ready('tag')
+    uids = ['uid{}'.format(i % n_uids) for i in range(n_messages)]
+
+    def run():
+        for uid in uids:
+            bm.identify(uid)
+    return run
+
+
+@benchmark('ready',
+           sweeps={'n_messages': [1000, 10000]},
+           quick={'n_messages': [1000]})
+def bench_ready(n_messages):
+    ready = messages.ready
+    payloads = list(range(n_messages))
+
+    def run():
+        for payload in payloads:
+            ready('tag', payload)
+    return run
+
+
+@benchmark('processing',
+           sweeps={'n_messages': [1000, 10000]},
+           quick={'n_messages': [1000]})
+def bench_processing(n_messages):
+    processing = messages.processing
+    ratios = [(i, n_messages) for i in range(n_messages)]
+
+    def run():
+        for ratio in ratios:
+            processing('tag', ratio=ratio)
+    return run
+
+
+@benchmark('ready_many',
+           sweeps={'n_messages': [1000, 10000]},
+           quick={'n_messages': [1000]})
+def bench_ready_many(n_messages):
+    payloads = list(range(n_messages))
+
+    return lambda: messages.ready_many('tag', payloads)
+
+
+@benchmark('metrics',
+           sweeps={'enabled': [False, True],
+                   'n_messages': [1000, 10000]},
+           quick={'enabled': [False, True],
+                  'n_messages': [1000]})
+def bench_metrics(enabled, n_messages):
+    bms = _messages(random.Random(0), n_messages)
+    metrics = Metrics(enabled=enabled)
+    predicate = messages.oftype(status=messages.READY)
+
+    def identity(source):
+        return source.map(lambda bm: bm)
+
+    stage = metrics.instrument_stage(identity, 'stage')
+
+    def run():
+        source = metrics.instrument(rx.Observable.from_(bms), 'source')
+        stage(source.filter(predicate)).subscribe()
+    return run
+
+
+@benchmark('priority',
+           sweeps={'queue': ['fifo', 'priority'],
+                   'ready_share': [0.01, 0.1, 0.5],
+                   'n_messages': [1000, 10000]},
+           quick={'queue': ['fifo', 'priority'],
+                  'ready_share': [0.01],
+                  'n_messages': [1000]})
+def bench_priority(queue, ready_share, n_messages):
+    """
+    Time until the last READY message of a saturated queue is delivered,
+    i.e. the tail latency of READY results queued with a flood of progress
+    messages of long computations, each delivery costing some work.
+    """
+    rnd = random.Random(0)
+    result_tags = [_random_tag(rnd) for _ in range(100)]
+    progress_tags = [_random_tag(rnd) for _ in range(10)]
+    bms = [messages.ready(rnd.choice(result_tags), payload=i)
+           if rnd.random() < ready_share else
+           messages.processing(rnd.choice(progress_tags),
+                               ratio=(i, n_messages))
+           for i in range(n_messages)]
+    n_ready = sum(bm.status == messages.READY for bm in bms)
+
+    def consume(bm):
+        return sum(range(1000))
+
+    if queue == 'fifo':
+        def run():
+            buffer = deque(bms)
+            remaining = n_ready
+            while remaining:
+                bm = buffer.popleft()
+                consume(bm)
+                if bm.status == messages.READY:
+                    remaining -= 1
+    else:
+        def run():
+            buffer = PriorityBuffer()
+            for bm in bms:
+                buffer.push(bm)
+            remaining = n_ready
+            while remaining:
+                bm = buffer.pop()
+                consume(bm)
+                if bm.status == messages.READY:
+                    remaining -= 1
+    return run
+
+
+@benchmark('lineage',
+           sweeps={'query': ['derived', 'sources', 'scan'],
+                   'n_messages': [10000, 100000]},
+           quick={'query': ['derived', 'sources', 'scan'],
+                  'n_messages': [10000]})
+def bench_lineage(query, n_messages):
+    """
+    One provenance query among *n_messages* retained messages, each frame
+    root giving 3 derived messages that also derive from a calibration.
+    """
+    calibration = messages.ready('CAL').identify('cal')
+    bms = [calibration]
+    for i in range(n_messages // 4):
+        frame = messages.ready('FRAME', i).identify('frame{}'.format(i))
+        seeds = messages.combine_seeds(frame.seeds, calibration.seeds)
+        bms.append(frame)
+        bms.extend(messages.ready(tag, i, seeds=seeds)
+                   for tag in ('SPECTRUM', 'PEAKS', 'REPORT'))
+    uid = 'frame{}'.format(n_messages // 8)
+    report = bms[-1]
+
+    if query == 'scan':
+        # without index: a pass over the seeds of the retained messages
+        def run():
+            return [bm for bm in bms if uid in bm.seeds.get('FRAME', ())]
+        return run
+
+    index = LineageIndex()
+    index.extend(bms)
+    if query == 'derived':
+        return lambda: index.derived('FRAME', uid)
+    return lambda: index.sources(report)
+
+
+# -----------------------------------------------------------------------------
+# -----------------------------------------------------------------------------
+def run(names=None, quick=False, repeat=3, min_time=0.05, report=None):
+    """
+    Runs the registered benchmarks (all of them if *names* is None) and
+    returns the results as a dict:
+
+    {'meta': {...}, 'results': {name: {parameters: seconds per call}}}
+    """
+    results = OrderedDict()
+    for name, (setup, sweeps, quick_sweeps) in BENCHMARKS.items():
+        if names and name not in names:
+            continue
+
+        results[name] = OrderedDict()
+        for params in _points(quick_sweeps if quick else sweeps):
+            seconds = _time(setup(**params), repeat, min_time)
+            key = _key(params)
+            results[name][key] = seconds
+            if report is not None:
+                report(name, key, seconds)
+
+    meta = {'python': platform.python_version(),
+            'platform': platform.platform(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'quick': quick}
+
+    return {'meta': meta, 'results': results}
+
+
+def compare(results, baseline, threshold):
+    """
+    Returns the list of (name, parameters, baseline seconds, seconds) for
+    the points slower than the baseline by more than *threshold* (a ratio,
+    e.g. 0.2 for 20%). Points missing from either run are ignored.
+    """
+    regressions = []
+    for name, points in results['results'].items():
+        base_points = baseline['results'].get(name, {})
+        for key, seconds in points.items():
+            base = base_points.get(key)
+            if base is not None and seconds > base * (1.0 + threshold):
+                regressions.append((name, key, base, seconds))
+    return regressions
+
+
+def main(args=None):
+    """
+    Command line entry point of `python -m moebius bench`. Returns the exit
+    status: 1 when a regression against the baseline is found.
+    """
+    parser = argparse.ArgumentParser(
+        prog='moebius bench',
+        description='Benchmarks of the bus message hot paths.')
+    parser.add_argument('names', nargs='*', metavar='NAME',
+                        help='benchmarks to run (default: all), among: '
+                        + ', '.join(BENCHMARKS))
+    parser.add_argument('--quick', action='store_true',
+                        help='run smaller parameter sweeps')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='number of timings of each point (best is kept)')
+    parser.add_argument('--min-time', type=float, default=0.05,
+                        help='minimum duration of one timing, in seconds')
+    parser.add_argument('-o', '--output',
+                        help='save the results to this JSON file')
+    parser.add_argument('-b', '--baseline',
+                        help='compare with the results of this JSON file')
+    parser.add_argument('-t', '--threshold', type=float, default=0.2,
+                        help='relative slowdown against the baseline '
+                        'considered as a regression (default: 0.2)')
+    options = parser.parse_args(args)
+
+    unknown = set(options.names).difference(BENCHMARKS)
+    if unknown:
+        parser.error('unknown benchmarks: {}'.format(', '.join(unknown)))
+
+    def report(name, key, seconds):
+        print('{:16s} {:48s} {:12.3f} us'.format(name, key, seconds * 1e6))
+
+    results = run(options.names, options.quick, options.repeat,
+                  options.min_time, report)
+
+    if options.output:
+        with open(options.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if options.baseline:
+        with open(options.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, options.threshold)
+        for name, key, base, seconds in regressions:
+            print('REGRESSION {} {}: {:.3f} us -> {:.3f} us ({:+.0%})'.format(
+                name, key, base * 1e6, seconds * 1e6, seconds / base - 1.0))
+        if regressions:
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
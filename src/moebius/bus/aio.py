@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 16:48:09 2026
+@author: Jérémie Fache
+"""
+
+import asyncio
+import rx
+from rx.disposables import AnonymousDisposable
+
+
+class _Failure(object):
+    __slots__ = ('error',)
+
+    def __init__(self, error):
+        self.error = error
+
+
+# end of stream marker
+_END = object()
+
+
+async def _iterate_queue(queue):
+    while True:
+        item = await queue.get()
+        if item is _END:
+            return
+        if isinstance(item, _Failure):
+            raise item.error
+        yield item
+
+
+# -----------------------------------------------------------------------------
+# -----------------------------------------------------------------------------
+class AsyncStream(object):
+    """
+    Stream of items built on async generators, all running on one asyncio
+    event loop.
+
+    *subscribe* is a function returning a new async iterator each time the
+    stream is iterated. Operators mirror the rx.Observable ones used with
+    Bus Messages:
+
+    >>> counts = (subject
+    ...           .filter(oftype('A...', READY))
+    ...           .scan(lambda c, _: c + 1, seed=0))
+    >>> async for count in counts:
+    ...     print(count)
+    """
+
+    def __init__(self, subscribe):
+        self._subscribe = subscribe
+
+    def __aiter__(self):
+        return self._subscribe().__aiter__()
+
+    def filter(self, predicate):
+        source = self
+
+        async def filtered():
+            async for item in source:
+                if predicate(item):
+                    yield item
+
+        return AsyncStream(filtered)
+
+    def map(self, selector):
+        source = self
+
+        async def mapped():
+            async for item in source:
+                yield selector(item)
+
+        return AsyncStream(mapped)
+
+    def do_action(self, action):
+        source = self
+
+        async def done():
+            async for item in source:
+                action(item)
+                yield item
+
+        return AsyncStream(done)
+
+    def scan(self, accumulator, seed):
+        source = self
+
+        async def scanned():
+            acc = seed
+            async for item in source:
+                acc = accumulator(acc, item)
+                yield acc
+
+        return AsyncStream(scanned)
+
+    def merge(self, *others):
+        return merge(self, *others)
+
+    def subscribe(self, on_next=None, on_error=None, on_completed=None):
+        """
+        Consumes the stream in a task of the running event loop and returns
+        the task. Cancel the task to unsubscribe.
+        """
+        async def consume():
+            try:
+                async for item in self:
+                    if on_next is not None:
+                        on_next(item)
+            except asyncio.CancelledError:
+                raise
+            except Exception as error:
+                if on_error is None:
+                    raise
+                on_error(error)
+                return
+
+            if on_completed is not None:
+                on_completed()
+
+        return asyncio.ensure_future(consume())
+
+    async def to_list(self):
+        return [item async for item in self]
+
+
+# -----------------------------------------------------------------------------
+def merge(*streams):
+    """
+    Returns an AsyncStream emitting the items of all *streams* as they
+    arrive. It completes when all streams complete and fails as soon as one
+    stream fails.
+    """
+    async def merged():
+        queue = asyncio.Queue()
+
+        async def pump(stream):
+            try:
+                async for item in stream:
+                    queue.put_nowait(item)
+            except asyncio.CancelledError:
+                raise
+            except Exception as error:
+                queue.put_nowait(_Failure(error))
+                return
+            queue.put_nowait(_END)
+
+        tasks = [asyncio.ensure_future(pump(stream)) for stream in streams]
+        remaining = len(tasks)
+        try:
+            while remaining:
+                item = await queue.get()
+                if item is _END:
+                    remaining -= 1
+                elif isinstance(item, _Failure):
+                    raise item.error
+                else:
+                    yield item
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    return AsyncStream(merged)
+
+
+# -----------------------------------------------------------------------------
+# -----------------------------------------------------------------------------
+class AsyncSubject(AsyncStream):
+    """
+    Hot AsyncStream the items of which are pushed with on_next(). Each
+    iteration gets its own queue, so a slow consumer does not block the
+    others. Items pushed while no iteration is running are lost, as with
+    rx.subjects.Subject.
+
+    on_next(), on_error() and on_completed() must be called from the thread
+    of the event loop (see from_observable() for other threads).
+    """
+
+    def __init__(self):
+        super().__init__(self._subscribe_queue)
+        self._queues = []
+
+    def _subscribe_queue(self):
+        queue = asyncio.Queue()
+        self._queues.append(queue)
+
+        async def iterate():
+            try:
+                async for item in _iterate_queue(queue):
+                    yield item
+            finally:
+                self._queues.remove(queue)
+
+        return iterate()
+
+    def on_next(self, item):
+        for queue in self._queues:
+            queue.put_nowait(item)
+
+    def on_error(self, error):
+        for queue in self._queues:
+            queue.put_nowait(_Failure(error))
+
+    def on_completed(self):
+        for queue in self._queues:
+            queue.put_nowait(_END)
+
+
+# -----------------------------------------------------------------------------
+# -----------------------------------------------------------------------------
+def from_observable(observable):
+    """
+    Returns an AsyncStream of the items emitted by an rx.Observable.
+
+    The observable is subscribed each time the stream is iterated, from the
+    running event loop. Items can be emitted from any thread: they are
+    handed over to the event loop with call_soon_threadsafe().
+    """
+    def subscribe():
+        loop = asyncio.get_event_loop()
+        queue = asyncio.Queue()
+
+        def put(item):
+            loop.call_soon_threadsafe(queue.put_nowait, item)
+
+        disposable = observable.subscribe(
+            put,
+            lambda error: put(_Failure(error)),
+            lambda: put(_END))
+
+        async def iterate():
+            try:
+                async for item in _iterate_queue(queue):
+                    yield item
+            finally:
+                disposable.dispose()
+
+        return iterate()
+
+    return AsyncStream(subscribe)
+
+
+def to_observable(stream, loop):
+    """
+    Returns an rx.Observable emitting the items of an AsyncStream, which is
+    iterated on *loop*. Observers are called from the thread of the loop.
+    Disposing the subscription cancels the iteration.
+    """
+    def subscribe(observer):
+        async def consume():
+            try:
+                async for item in stream:
+                    observer.on_next(item)
+            except asyncio.CancelledError:
+                raise
+            except Exception as error:
+                observer.on_error(error)
+                return
+            observer.on_completed()
+
+        future = asyncio.run_coroutine_threadsafe(consume(), loop)
+        return AnonymousDisposable(future.cancel)
+
+    return rx.Observable.create(subscribe)
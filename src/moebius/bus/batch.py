@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 12:21:07 2026
+@author: Jérémie Fache
+"""
+
+from array import array
+from moebius.bus.messages import BM
+
+
+def _code_array(codes, size):
+    """
+    Returns *codes* as the most compact unsigned array able to hold values
+    lower than *size*.
+    """
+    for typecode in 'BHIL':
+        if size <= 1 << (8 * array(typecode).itemsize):
+            return array(typecode, codes)
+    return array('Q', codes)
+
+
+class _Interner(object):
+    """
+    Assigns integer codes to values, by equality.
+    """
+    __slots__ = ('table', 'codes')
+
+    def __init__(self):
+        self.table = []
+        self.codes = {}
+
+    def __call__(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.table)
+            self.table.append(value)
+        return code
+
+
+class _SeedsInterner(object):
+    """
+    Assigns integer codes to seeds, by identity then by hash when seeds are
+    hashable.
+    """
+    __slots__ = ('table', 'by_id', 'by_hash')
+
+    def __init__(self):
+        self.table = []
+        self.by_id = {}
+        self.by_hash = {}
+
+    def __call__(self, seeds):
+        code = self.by_id.get(id(seeds))
+        if code is not None:
+            return code
+
+        try:
+            code = self.by_hash.get(seeds)
+        except TypeError:
+            code = None
+            hashable = False
+        else:
+            hashable = True
+
+        if code is None:
+            code = len(self.table)
+            self.table.append(seeds)
+            if hashable:
+                self.by_hash[seeds] = code
+
+        # table keeps the object alive so id() is not reused
+        if self.table[code] is seeds:
+            self.by_id[id(seeds)] = code
+        return code
+
+
+# -----------------------------------------------------------------------------
+# -----------------------------------------------------------------------------
+class MessageView(object):
+    """
+    Lazy view on a row of a MessageBatch.
+
+    Implements the BusMessage attributes (tag, status, payload, seeds) so
+    that it can be tested with oftype().
+    """
+    __slots__ = ('_batch', '_index')
+
+    def __init__(self, batch, index):
+        self._batch = batch
+        self._index = index
+
+    @property
+    def tag(self):
+        batch = self._batch
+        return batch.tag_table[batch.tag_codes[self._index]]
+
+    @property
+    def status(self):
+        batch = self._batch
+        return batch.status_table[batch.status_codes[self._index]]
+
+    @property
+    def payload(self):
+        return self._batch.payloads[self._index]
+
+    @property
+    def seeds(self):
+        batch = self._batch
+        return batch.seeds_table[batch.seeds_codes[self._index]]
+
+    def to_message(self):
+        """
+        Returns the row as a BusMessage.
+        """
+        return BM(self.tag, self.status, self.payload, self.seeds)
+
+    def __repr__(self):
+        return 'MessageView({!r})'.format(self.to_message())
+
+
+# -----------------------------------------------------------------------------
+# -----------------------------------------------------------------------------
+class MessageBatch(object):
+    """
+    Column-wise storage of a sequence of Bus Messages.
+
+    Tags and statuses are interned in tables and stored as compact integer
+    codes (one byte per message for up to 256 distinct values). Seeds are
+    interned by identity, or by hash when hashable, since messages derived
+    from the same inputs share equal seeds. Payloads are kept in a list.
+
+    >>> batch = MessageBatch.from_messages(messages)
+    >>> batch.to_messages() == list(messages)
+    True
+    >>> ready_a = batch.filter(oftype('A...', READY))
+
+    Rows are accessed through lazy MessageView objects that implement the
+    BusMessage attributes.
+    """
+    __slots__ = ('tag_table', 'status_table', 'seeds_table',
+                 'tag_codes', 'status_codes', 'seeds_codes', 'payloads')
+
+    def __init__(self, tag_table, status_table, seeds_table,
+                 tag_codes, status_codes, seeds_codes, payloads):
+        self.tag_table = tag_table
+        self.status_table = status_table
+        self.seeds_table = seeds_table
+        self.tag_codes = tag_codes
+        self.status_codes = status_codes
+        self.seeds_codes = seeds_codes
+        self.payloads = payloads
+
+    @classmethod
+    def from_messages(cls, bms):
+        """
+        Builds a batch from an iterable of Bus Messages.
+        """
+        tags = _Interner()
+        statuses = _Interner()
+        seedss = _SeedsInterner()
+
+        tag_codes = []
+        status_codes = []
+        seeds_codes = []
+        payloads = []
+
+        for bm in bms:
+            tag_codes.append(tags(bm.tag))
+            status_codes.append(statuses(bm.status))
+            seeds_codes.append(seedss(bm.seeds))
+            payloads.append(bm.payload)
+
+        return cls(tuple(tags.table),
+                   tuple(statuses.table),
+                   tuple(seedss.table),
+                   _code_array(tag_codes, len(tags.table)),
+                   _code_array(status_codes, len(statuses.table)),
+                   _code_array(seeds_codes, len(seedss.table)),
+                   payloads)
+
+    def to_messages(self):
+        """
+        Returns the list of Bus Messages stored in the batch.
+        """
+        tag_table = self.tag_table
+        status_table = self.status_table
+        seeds_table = self.seeds_table
+        return [BM(tag_table[t], status_table[s], payload, seeds_table[d])
+                for t, s, d, payload in zip(self.tag_codes,
+                                            self.status_codes,
+                                            self.seeds_codes,
+                                            self.payloads)]
+
+    def __len__(self):
+        return len(self.payloads)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('MessageBatch index out of range')
+        return MessageView(self, index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield MessageView(self, index)
+
+    def mask(self, predicate):
+        """
+        Returns a list of booleans, one per message, telling whether the
+        message passes *predicate* (a function returned by oftype()).
+
+        The predicate is evaluated once per table entry, then looked up
+        through the codes of each message.
+        """
+        selected_tags = predicate.select_tags(self.tag_table)
+        selected_status = predicate.select_status(self.status_table)
+
+        ok_tags = [tag in selected_tags for tag in self.tag_table]
+        ok_status = [sta in selected_status for sta in self.status_table]
+
+        return [ok_tags[t] and ok_status[s]
+                for t, s in zip(self.tag_codes, self.status_codes)]
+
+    def filter(self, predicate):
+        """
+        Returns a new batch holding the messages that pass *predicate*. The
+        tables are shared with this batch.
+        """
+        indexes = [index for index, ok in enumerate(self.mask(predicate))
+                   if ok]
+
+        def take(codes):
+            return array(codes.typecode, [codes[i] for i in indexes])
+
+        return MessageBatch(self.tag_table,
+                            self.status_table,
+                            self.seeds_table,
+                            take(self.tag_codes),
+                            take(self.status_codes),
+                            take(self.seeds_codes),
+                            [self.payloads[i] for i in indexes])
@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 17:21:05 2026
+@author: Jérémie Fache
+"""
+
+import math
+import time
+from datetime import timedelta
+from threading import (Lock, RLock)
+import rx
+from rx.concurrency import timeout_scheduler
+from rx.disposables import (AnonymousDisposable, CompositeDisposable)
+from moebius.bus.messages import (READY, ready)
+
+# weight of the last batch in the moving fit of the cost of the handler
+COST_SMOOTHING = 0.3
+
+
+class BatchStage(object):
+    """
+    Calls a batch handler on groups of READY Bus Messages.
+
+    The stage is a function taking an rx.Observable of Bus Messages and
+    returning an rx.Observable. READY input messages are buffered, either
+    all together or per selector when *selectors* (a list of oftype()
+    predicates) is given, a message going to the buffer of the first
+    selector it matches. Other messages are ignored.
+
+    A buffer is flushed when it holds *batch_size* messages or when its
+    oldest message has waited *max_wait* seconds. *handler* is then called
+    once with the list of the payloads and must return the list of the
+    results, in the same order; the stage emits a ready(tag, result)
+    message per result, with the seeds of the corresponding input message.
+
+    The batch size adapts to the handler: the duration of a call is modeled
+    as a fixed cost plus a cost per item, fitted on the recent calls, and
+    the batch size is the number of items the handler is expected to
+    process in *target_latency* seconds, bounded by *max_size*. It never
+    goes below the size at which the fixed cost stops dominating, so a
+    handler whose cost hardly depends on the batch size (or exceeds
+    *target_latency* anyway) gets batches of *max_size*. While the recent
+    calls all have the same size, the fixed cost cannot be told apart: the
+    last fit is kept if any, otherwise another size is probed: twice the
+    size if the handler looks fast enough, else at most half of it.
+    Batches flushed before being full (by *max_wait* or completion) feed
+    the fit but only shrink the batch size if they already exceeded
+    *target_latency*. With *target_latency* None, it is always *max_size*.
+
+    Handlers run on the thread that flushes the buffer: the thread of the
+    source, or the one of *scheduler* (rx timeout_scheduler by default)
+    when the wait expires.
+
+    >>> stage = BatchStage(model.predict, 'PREDICTION', max_size=256)
+    >>> predictions = stage(source.filter(oftype('FEATURES')))
+    """
+
+    def __init__(self, handler, tag, max_size=100, max_wait=0.01,
+                 selectors=None, target_latency=0.05, scheduler=None):
+        if max_size < 1:
+            raise ValueError('max_size must be >= 1, got {}'.format(
+                max_size))
+
+        self.handler = handler
+        self.tag = tag
+        self.max_size = max_size
+        self.max_wait = max_wait
+        self.selectors = selectors
+        self.target_latency = target_latency
+        self.scheduler = scheduler or timeout_scheduler
+
+        self.batch_size = max_size
+        # fitted cost of a handler call and of each item, in seconds
+        self.fixed_cost = None
+        self.item_cost = None
+        # exponentially weighted sums of 1, n, duration, n**2, n * duration
+        self._sums = [0.0] * 5
+        self._lock = Lock()
+
+    def _observe(self, n_items, duration, full=True):
+        """
+        Updates the batch size from the duration of a handler call, on a
+        batch of batch_size items if *full*.
+        """
+        if self.target_latency is None:
+            return
+
+        with self._lock:
+            keep = 1.0 - COST_SMOOTHING
+            sums = self._sums
+            for i, value in enumerate((1.0, n_items, duration,
+                                       n_items * n_items,
+                                       n_items * duration)):
+                sums[i] = keep * sums[i] + value
+            w, n, d, nn, nd = sums
+
+            spread = w * nn - n * n
+            if spread <= 1e-6 * n * n:
+                # calls of a single size: the fixed cost cannot be fitted
+                if self.fixed_cost is not None:
+                    size = self._size(self.fixed_cost, self.item_cost)
+                else:
+                    self.item_cost = d / n
+                    observed = int(round(n / w))
+                    ideal = self._size(0.0, self.item_cost)
+                    if observed <= ideal:
+                        size = 2 * observed
+                    else:
+                        size = min(ideal, observed // 2)
+            else:
+                # weighted least squares fit of duration = fixed + n * item
+                self.item_cost = (w * nd - n * d) / spread
+                self.fixed_cost = max(0.0, (d - self.item_cost * n) / w)
+                size = self._size(self.fixed_cost, self.item_cost)
+
+            if not full and duration <= self.target_latency:
+                # a few messages in a quiet period tell nothing about the
+                # latency of a full batch
+                size = max(size, self.batch_size)
+            self.batch_size = max(1, min(self.max_size, size))
+
+    def _size(self, fixed_cost, item_cost):
+        """
+        Returns the batch size for the fitted costs, before bounds.
+        """
+        if item_cost <= 0 or fixed_cost >= self.target_latency:
+            # larger batches are free, or the target cannot be met
+            return self.max_size
+        size = int((self.target_latency - fixed_cost) / item_cost)
+        # below, the handler mostly spends its time in fixed costs
+        return max(size, int(math.ceil(fixed_cost / item_cost)))
+
+    def __call__(self, source):
+        def subscribe(observer):
+            run = _BatchRun(self, observer)
+            subscription = source.subscribe(run)
+            return CompositeDisposable(subscription,
+                                       AnonymousDisposable(run.dispose))
+
+        return rx.Observable.create(subscribe)
+
+
+# -----------------------------------------------------------------------------
+class _Buffer(object):
+    __slots__ = ('bms', 'timer')
+
+    def __init__(self):
+        self.bms = []
+        self.timer = None
+
+    def cancel_timer(self):
+        if self.timer is not None:
+            self.timer.dispose()
+            self.timer = None
+
+
+class _BatchRun(object):
+    """
+    Observer of the source of a BatchStage for one subscription.
+    """
+
+    def __init__(self, stage, observer):
+        self.stage = stage
+        self.observer = observer
+        # reentrant: the observer may dispose the subscription while called
+        self.lock = RLock()
+        n_buffers = 1 if stage.selectors is None else len(stage.selectors)
+        self.buffers = [_Buffer() for _ in range(n_buffers)]
+        self.stopped = False
+
+    def _buffer(self, bm):
+        selectors = self.stage.selectors
+        if selectors is None:
+            return self.buffers[0]
+        for selector, buffer in zip(selectors, self.buffers):
+            if selector(bm):
+                return buffer
+        return None
+
+    def on_next(self, bm):
+        if bm.status != READY:
+            return
+
+        with self.lock:
+            if self.stopped:
+                return
+
+            buffer = self._buffer(bm)
+            if buffer is None:
+                return
+
+            buffer.bms.append(bm)
+            stage = self.stage
+            if len(buffer.bms) >= stage.batch_size:
+                self._flush(buffer)
+            elif buffer.timer is None:
+                buffer.timer = stage.scheduler.schedule_relative(
+                    timedelta(seconds=stage.max_wait),
+                    lambda scheduler, _: self._expire(buffer))
+
+    def _expire(self, buffer):
+        with self.lock:
+            if self.stopped:
+                return
+            buffer.timer = None
+            if buffer.bms:
+                self._flush(buffer)
+
+    def _flush(self, buffer):
+        """
+        Calls the handler on the buffered messages. Called with the lock
+        held.
+        """
+        buffer.cancel_timer()
+        bms = buffer.bms
+        buffer.bms = []
+
+        stage = self.stage
+        start = time.perf_counter()
+        try:
+            results = stage.handler([bm.payload for bm in bms])
+            if len(results) != len(bms):
+                raise ValueError('batch handler returned {} results for {} '
+                                 'payloads'.format(len(results), len(bms)))
+        except Exception as error:
+            self._stop()
+            self.observer.on_error(error)
+            return
+        stage._observe(len(bms), time.perf_counter() - start,
+                       len(bms) >= stage.batch_size)
+
+        for bm, result in zip(bms, results):
+            if self.stopped:
+                return
+            self.observer.on_next(ready(stage.tag, result, seeds=bm.seeds))
+
+    def _stop(self):
+        self.stopped = True
+        for buffer in self.buffers:
+            buffer.cancel_timer()
+
+    def dispose(self):
+        with self.lock:
+            self._stop()
+            for buffer in self.buffers:
+                buffer.bms = []
+
+    def on_error(self, error):
+        with self.lock:
+            if not self.stopped:
+                self._stop()
+                self.observer.on_error(error)
+
+    def on_completed(self):
+        with self.lock:
+            if self.stopped:
+                return
+            for buffer in self.buffers:
+                if buffer.bms:
+                    self._flush(buffer)
+                if self.stopped:
+                    return
+            self._stop()
+            self.observer.on_completed()
@@ -0,0 +1,331 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Oct 21 09:15:48 2026
+@author: Jérémie Fache
+"""
+
+import hashlib
+import os
+import pickle
+import struct
+import tempfile
+import types
+from collections import OrderedDict
+from collections.abc import (Mapping, Set)
+from functools import partial
+from threading import Lock
+
+_FLOAT64 = struct.Struct('<d')
+
+
+def _feed(value, h):
+    """
+    Feeds a canonical encoding of *value* to the hash object *h*.
+
+    Unlike pickle, the encoding does not depend on the iteration order of
+    sets and mappings, which changes with the hash seed of the process.
+    """
+    kind = type(value)
+    if value is None:
+        h.update(b'N')
+    elif kind is bool:
+        h.update(b'T' if value else b'F')
+    elif kind is int:
+        data = str(value).encode('ascii')
+        h.update(b'i%d:' % len(data))
+        h.update(data)
+    elif kind is float:
+        h.update(b'f')
+        h.update(_FLOAT64.pack(value))
+    elif kind is str:
+        data = value.encode('utf-8')
+        h.update(b's%d:' % len(data))
+        h.update(data)
+    elif kind in (bytes, bytearray):
+        h.update(b'b%d:' % len(value))
+        h.update(value)
+    elif isinstance(value, (tuple, list)):
+        h.update(b'l%d:' % len(value))
+        for item in value:
+            _feed(item, h)
+    elif isinstance(value, Mapping):
+        items = sorted(_digest(item) for item in value.items())
+        h.update(b'm%d:' % len(items))
+        for digest in items:
+            h.update(digest)
+    elif isinstance(value, Set):
+        items = sorted(_digest(item) for item in value)
+        h.update(b'e%d:' % len(items))
+        for digest in items:
+            h.update(digest)
+    elif hasattr(value, 'tobytes') and hasattr(value, 'dtype'):
+        # numpy arrays
+        h.update(b'a')
+        _feed((str(value.dtype), tuple(value.shape)), h)
+        h.update(value.tobytes())
+    else:
+        h.update(b'p')
+        h.update(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+
+
+def _digest(value):
+    h = hashlib.sha256()
+    _feed(value, h)
+    return h.digest()
+
+
+def _name(obj):
+    return '{}:{}'.format(getattr(obj, '__module__', None),
+                          getattr(obj, '__qualname__',
+                                  type(obj).__qualname__))
+
+
+def _feed_code(code, h):
+    """
+    Feeds the bytecode of a code object and its constants (line numbers
+    excluded) to the hash object *h*.
+    """
+    h.update(b'c')
+    _feed((code.co_code, code.co_names, code.co_varnames), h)
+    h.update(b'l%d:' % len(code.co_consts))
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            _feed_code(const, h)
+        else:
+            _feed(const, h)
+
+
+def _feed_handler(handler, h, seen):
+    """
+    Feeds what the results of *handler* depend on to the hash object *h*:
+    its name, code and bound state (closure cells, defaults, partial and
+    method arguments, attributes of a callable object).
+
+    Raises TypeError if some of the state cannot be hashed.
+    """
+    if id(handler) in seen:
+        # recursive closure
+        h.update(b'r')
+        return
+    seen.add(id(handler))
+
+    _feed(_name(handler), h)
+    if isinstance(handler, partial):
+        _feed_handler(handler.func, h, seen)
+        _feed_state((handler.args, handler.keywords), h, seen)
+    elif isinstance(handler, types.MethodType):
+        _feed_handler(handler.__func__, h, seen)
+        _feed_state(handler.__self__, h, seen)
+    elif isinstance(handler, types.FunctionType):
+        _feed_code(handler.__code__, h)
+        cells = tuple(_cell_contents(cell)
+                      for cell in handler.__closure__ or ())
+        _feed_state((cells, handler.__defaults__, handler.__kwdefaults__),
+                    h, seen)
+    elif isinstance(handler, (type, types.BuiltinFunctionType)):
+        # identified by its name, as pickle does
+        pass
+    else:
+        # callable object
+        call = getattr(type(handler), '__call__', None)
+        if isinstance(call, types.FunctionType):
+            _feed_code(call.__code__, h)
+        _feed_state(handler, h, seen)
+
+
+def _cell_contents(cell):
+    try:
+        return cell.cell_contents
+    except ValueError:
+        # not assigned yet
+        return None
+
+
+def _feed_state(value, h, seen):
+    """
+    Feeds the state bound to a handler, whose callables are fed as
+    handlers.
+    """
+    if isinstance(value, (tuple, list)):
+        h.update(b'l%d:' % len(value))
+        for item in value:
+            _feed_state(item, h, seen)
+    elif isinstance(value, (partial, types.FunctionType, types.MethodType)):
+        _feed_handler(value, h, seen)
+    else:
+        try:
+            _feed(value, h)
+        except Exception as error:
+            raise TypeError('cannot hash the state {!r}: {}'.format(
+                value, error))
+
+
+def handler_identity(handler):
+    """
+    Returns a string identifying a handler across processes.
+
+    It is a digest of its module and qualified name, of its code and of
+    the state bound to it: closure cells, default arguments, arguments of a
+    functools.partial, instance of a bound method or attributes of a
+    callable object, so that two lambdas or partials of the same module
+    get different identities. Functions referenced through globals are not
+    followed.
+
+    Its cache_version attribute, if any, is added (to be changed when its
+    results change in a way the code does not tell). A handler whose state
+    cannot be hashed (e.g. an unpicklable object in a closure) raises
+    TypeError, unless it has a cache_version: it is then identified by its
+    name and version only.
+
+    *handler* can be a tuple of handlers, e.g. with the split and merge
+    functions of a stage.
+    """
+    if isinstance(handler, tuple):
+        return ','.join(handler_identity(func) for func in handler)
+
+    version = getattr(handler, 'cache_version', None)
+    h = hashlib.sha256()
+    try:
+        _feed_handler(handler, h, set())
+        identity = '{}#{}'.format(_name(handler), h.hexdigest()[:16])
+    except TypeError as error:
+        if version is None:
+            raise TypeError('cannot identify the handler {!r} for caching '
+                            '({}): set its cache_version attribute'.format(
+                                handler, error))
+        identity = _name(handler)
+
+    if version is not None:
+        identity += '@{}'.format(version)
+    return identity
+
+
+def cache_key(handler, payload, seeds, identity=None):
+    """
+    Returns the stable key (a hex sha256) of the result of *handler* on
+    *payload* with *seeds*. *handler* can be a tuple of handlers, e.g. with
+    the split and merge functions of a stage. *identity*, the result of
+    handler_identity(handler), can be given to save computing it.
+    """
+    if identity is None:
+        identity = handler_identity(handler)
+    h = hashlib.sha256()
+    _feed(identity, h)
+    _feed(payload, h)
+    _feed(seeds, h)
+    return h.hexdigest()
+
+
+# -----------------------------------------------------------------------------
+# -----------------------------------------------------------------------------
+class ResultCache(object):
+    """
+    Content-addressed cache of handler results.
+
+    Results are stored pickled, by key (see cache_key()), in an in-memory
+    LRU tier holding at most *max_bytes* of pickled data. With a
+    *directory*, results are also written to disk, one file per key, and a
+    result missing from memory is looked up there (and brought back in
+    memory). Disk entries are never evicted; clear() removes them.
+
+    >>> cache = ResultCache(512 * 1024 * 1024, directory='/tmp/results')
+    >>> stage = ComputeStage(fft, 'SPECTRUM', cache=cache)
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024, directory=None):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def nbytes(self):
+        return self._bytes
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + '.pkl')
+
+    def _store(self, key, data):
+        """
+        Puts pickled data in the memory tier. Called with the lock held.
+        """
+        if len(data) > self.max_bytes:
+            return
+
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= len(previous)
+        self._entries[key] = data
+        self._bytes += len(data)
+
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+            self.evictions += 1
+
+    def get(self, key, default=None):
+        """
+        Returns the result stored for *key*, or *default*.
+        """
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return pickle.loads(data)
+
+        if self.directory is not None:
+            try:
+                with open(self._path(key), 'rb') as f:
+                    data = f.read()
+            except FileNotFoundError:
+                pass
+            else:
+                with self._lock:
+                    self._store(key, data)
+                    self.disk_hits += 1
+                return pickle.loads(data)
+
+        with self._lock:
+            self.misses += 1
+        return default
+
+    def put(self, key, result):
+        data = pickle.dumps(result, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._store(key, data)
+
+        if self.directory is not None:
+            path = self._path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # written aside then renamed, so readers never see partial data
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, path)
+
+    def clear(self):
+        """
+        Empties both tiers.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+        if self.directory is not None:
+            for root, _, names in os.walk(self.directory):
+                for name in names:
+                    if name.endswith('.pkl'):
+                        os.remove(os.path.join(root, name))
@@ -0,0 +1,413 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 18:14:33 2026
+@author: Jérémie Fache
+"""
+
+import pickle
+import struct
+from collections.abc import Mapping
+from pyrsistent import (PMap, pmap, pset)
+from moebius.bus.messages import (BM, Progress)
+
+VERSION = 1
+
+# maximum number of distinct seeds kept by a Decoder
+SEEDS_CACHE_SIZE = 4096
+
+# value kinds
+_NONE = 0
+_STR = 1
+_INT = 2
+_FLOAT = 3
+_TRUE = 4
+_FALSE = 5
+_BYTES = 6
+_PROGRESS = 7
+_TUPLE = 8
+_OTHER = 9
+
+# seeds kinds
+_SEEDS_MAP = 0
+_SEEDS_OTHER = 1
+
+_FLOAT64 = struct.Struct('<d')
+_FRAME_HEADER = struct.Struct('<I')
+
+# size of the length prefix of a frame
+FRAME_HEADER_SIZE = _FRAME_HEADER.size
+
+
+class CodecError(ValueError):
+    """
+    Raised when decoding malformed data.
+    """
+
+
+class PickleEncoder(object):
+    """
+    Default payload encoder, used for payloads that have no dedicated
+    binary encoding.
+
+    A payload encoder implements encode(payload) returning a bytes-like
+    object and decode(view) taking a memoryview.
+    """
+
+    def __init__(self, protocol=pickle.HIGHEST_PROTOCOL):
+        self.protocol = protocol
+
+    def encode(self, payload):
+        return pickle.dumps(payload, self.protocol)
+
+    def decode(self, view):
+        return pickle.loads(view)
+
+
+_DEFAULT_PAYLOAD_ENCODER = PickleEncoder()
+
+
+# -----------------------------------------------------------------------------
+def _pack_varint(n, out):
+    while n >= 0x80:
+        out.append((n & 0x7f) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+# -----------------------------------------------------------------------------
+# -----------------------------------------------------------------------------
+class Encoder(object):
+    """
+    Binary encoder of Bus Messages.
+
+    Tags, statuses and seeds tags are written once and then referenced by
+    their index in a string table. An encoder keeps its table from one
+    message to the next, so the messages it encodes must be decoded in the
+    same order by a single Decoder. Use encode() for independent messages.
+    Other strings, such as uids and payloads, are always written inline so
+    that the table of a long-lived encoder only grows with the set of tags.
+    """
+
+    def __init__(self, payload_encoder=None):
+        if payload_encoder is None:
+            payload_encoder = _DEFAULT_PAYLOAD_ENCODER
+        self.payload_encoder = payload_encoder
+        self._strings = {}
+
+    def encode(self, bm):
+        """
+        Returns the encoded message as a bytearray.
+        """
+        out = bytearray((VERSION,))
+        size = len(self._strings)
+        try:
+            self._string(bm.tag, out)
+            self._string(bm.status, out)
+            self._value(bm.payload, out)
+            self._seeds(bm.seeds, out)
+        except BaseException:
+            # the decoder will never see the strings of this message
+            strings = self._strings
+            while len(strings) > size:
+                strings.popitem()
+            raise
+        return out
+
+    def write(self, stream, bm):
+        """
+        Writes the encoded message as a length-prefixed frame to a binary
+        file-like object.
+        """
+        write_frame(stream, self.encode(bm))
+
+    def _string(self, s, out):
+        index = self._strings.get(s)
+        if index is not None:
+            _pack_varint(index + 1, out)
+            return
+
+        self._strings[s] = len(self._strings)
+        data = s.encode('utf-8')
+        out.append(0)
+        _pack_varint(len(data), out)
+        out += data
+
+    def _value(self, value, out):
+        kind = type(value)
+        if value is None:
+            out.append(_NONE)
+        elif kind is str:
+            data = value.encode('utf-8')
+            out.append(_STR)
+            _pack_varint(len(data), out)
+            out += data
+        elif kind is bool:
+            out.append(_TRUE if value else _FALSE)
+        elif kind is int:
+            # zigzag varint
+            out.append(_INT)
+            _pack_varint(value << 1 if value >= 0 else (-value << 1) - 1, out)
+        elif kind is float:
+            out.append(_FLOAT)
+            out += _FLOAT64.pack(value)
+        elif kind is bytes:
+            out.append(_BYTES)
+            _pack_varint(len(value), out)
+            out += value
+        elif kind is tuple:
+            out.append(_TUPLE)
+            _pack_varint(len(value), out)
+            for item in value:
+                self._value(item, out)
+        elif kind is Progress or (isinstance(value, PMap) and len(value) == 2
+                                  and 'ratio' in value and 'meta' in value):
+            # payload of messages.processing(), or its former pmap form
+            out.append(_PROGRESS)
+            self._value(value['ratio'], out)
+            self._value(value['meta'], out)
+        else:
+            data = self.payload_encoder.encode(value)
+            out.append(_OTHER)
+            _pack_varint(len(data), out)
+            out += data
+
+    def _seeds(self, seeds, out):
+        if not isinstance(seeds, Mapping):
+            out.append(_SEEDS_OTHER)
+            self._value(seeds, out)
+            return
+
+        out.append(_SEEDS_MAP)
+        _pack_varint(len(seeds), out)
+        for tag, uids in seeds.items():
+            self._string(tag, out)
+            _pack_varint(len(uids), out)
+            for uid in uids:
+                self._value(uid, out)
+
+
+# -----------------------------------------------------------------------------
+# -----------------------------------------------------------------------------
+class Decoder(object):
+    """
+    Binary decoder of Bus Messages, counterpart of Encoder.
+
+    Messages are decoded from a memoryview with struct.unpack_from, without
+    copying the buffer. Bytes payloads are returned as memoryview slices of
+    the buffer when *zero_copy* is True.
+    """
+
+    def __init__(self, payload_encoder=None, zero_copy=False):
+        if payload_encoder is None:
+            payload_encoder = _DEFAULT_PAYLOAD_ENCODER
+        self.payload_encoder = payload_encoder
+        self.zero_copy = zero_copy
+        self._strings = []
+        self._seeds_cache = {}
+
+    def decode(self, data):
+        """
+        Returns the Bus Message encoded in *data* (any bytes-like object).
+        """
+        view = memoryview(data)
+        if view.format != 'B':
+            view = view.cast('B')
+
+        try:
+            if view[0] != VERSION:
+                raise CodecError('unsupported version {}'.format(view[0]))
+
+            offset = 1
+            tag, offset = self._string(view, offset)
+            status, offset = self._string(view, offset)
+            payload, offset = self._value(view, offset)
+            seeds, offset = self._seeds(view, offset)
+        except (IndexError, struct.error) as error:
+            raise CodecError('truncated message: {}'.format(error))
+
+        if offset != len(view):
+            raise CodecError('{} trailing bytes'.format(len(view) - offset))
+
+        return BM(tag, status, payload, seeds)
+
+    def read(self, stream):
+        """
+        Yields the messages of the frames read from a binary file-like
+        object.
+        """
+        for frame in read_frames(stream):
+            yield self.decode(frame)
+
+    def _varint(self, view, offset):
+        byte = view[offset]
+        offset += 1
+        if byte < 0x80:
+            return byte, offset
+
+        n = byte & 0x7f
+        shift = 7
+        while True:
+            byte = view[offset]
+            offset += 1
+            n |= (byte & 0x7f) << shift
+            if byte < 0x80:
+                return n, offset
+            shift += 7
+
+    def _string(self, view, offset):
+        ref, offset = self._varint(view, offset)
+        if ref:
+            try:
+                return self._strings[ref - 1], offset
+            except IndexError:
+                raise CodecError('unknown string reference {}'.format(ref))
+
+        size, offset = self._varint(view, offset)
+        end = offset + size
+        if end > len(view):
+            raise CodecError('truncated string')
+        s = str(view[offset:end], 'utf-8')
+        self._strings.append(s)
+        return s, end
+
+    def _bytes(self, view, offset):
+        size, offset = self._varint(view, offset)
+        end = offset + size
+        if end > len(view):
+            raise CodecError('truncated bytes')
+        return view[offset:end], end
+
+    def _value(self, view, offset):
+        kind = view[offset]
+        offset += 1
+
+        if kind == _NONE:
+            return None, offset
+        if kind == _STR:
+            data, offset = self._bytes(view, offset)
+            return str(data, 'utf-8'), offset
+        if kind == _INT:
+            n, offset = self._varint(view, offset)
+            return (n >> 1 if not n & 1 else -(n >> 1) - 1), offset
+        if kind == _FLOAT:
+            return _FLOAT64.unpack_from(view, offset)[0], offset + 8
+        if kind == _TRUE:
+            return True, offset
+        if kind == _FALSE:
+            return False, offset
+        if kind == _BYTES:
+            data, offset = self._bytes(view, offset)
+            return (data if self.zero_copy else bytes(data)), offset
+        if kind == _TUPLE:
+            size, offset = self._varint(view, offset)
+            items = []
+            for _ in range(size):
+                item, offset = self._value(view, offset)
+                items.append(item)
+            return tuple(items), offset
+        if kind == _PROGRESS:
+            ratio, offset = self._value(view, offset)
+            meta, offset = self._value(view, offset)
+            return Progress(ratio, meta), offset
+        if kind == _OTHER:
+            data, offset = self._bytes(view, offset)
+            return self.payload_encoder.decode(data), offset
+
+        raise CodecError('unknown value kind {}'.format(kind))
+
+    def _seeds(self, view, offset):
+        kind = view[offset]
+        offset += 1
+
+        if kind == _SEEDS_OTHER:
+            return self._value(view, offset)
+        if kind != _SEEDS_MAP:
+            raise CodecError('unknown seeds kind {}'.format(kind))
+
+        size, offset = self._varint(view, offset)
+        items = []
+        for _ in range(size):
+            tag, offset = self._string(view, offset)
+            count, offset = self._varint(view, offset)
+            uids = []
+            for _ in range(count):
+                uid, offset = self._value(view, offset)
+                uids.append(uid)
+            items.append((tag, tuple(uids)))
+
+        # messages of a stream often share the same seeds: building the
+        # pyrsistent map is much slower than looking it up
+        key = tuple(items)
+        seeds = self._seeds_cache.get(key)
+        if seeds is None:
+            seeds = pmap({tag: pset(uids) for tag, uids in items})
+            if len(self._seeds_cache) >= SEEDS_CACHE_SIZE:
+                self._seeds_cache.clear()
+            self._seeds_cache[key] = seeds
+
+        return seeds, offset
+
+
+# -----------------------------------------------------------------------------
+# -----------------------------------------------------------------------------
+def encode(bm, payload_encoder=None):
+    """
+    Returns a self-contained binary encoding of the Bus Message *bm*.
+    """
+    return bytes(Encoder(payload_encoder).encode(bm))
+
+
+def decode(data, payload_encoder=None, zero_copy=False):
+    """
+    Returns the Bus Message encoded by encode() in *data*.
+    """
+    return Decoder(payload_encoder, zero_copy).decode(data)
+
+
+# -----------------------------------------------------------------------------
+def write_frame(stream, data):
+    """
+    Writes *data* to a binary file-like object, prefixed by its length.
+    """
+    stream.write(_FRAME_HEADER.pack(len(data)))
+    stream.write(data)
+
+
+def read_frames(stream):
+    """
+    Yields the frames written by write_frame() to a binary file-like object
+    (e.g. a file or socket.makefile('rb')), until the end of the stream.
+    """
+    size = _FRAME_HEADER.size
+    while True:
+        header = stream.read(size)
+        if not header:
+            return
+        if len(header) < size:
+            raise CodecError('truncated frame header')
+
+        length, = _FRAME_HEADER.unpack(header)
+        data = stream.read(length)
+        if len(data) < length:
+            raise CodecError('truncated frame')
+        yield data
+
+
+def iter_frames(buffer):
+    """
+    Yields memoryview slices of the frames stored in a bytes-like object
+    (e.g. a mmap), without copying them.
+    """
+    view = memoryview(buffer)
+    size = _FRAME_HEADER.size
+    offset = 0
+    end = len(view)
+    while offset < end:
+        if offset + size > end:
+            raise CodecError('truncated frame header')
+        length, = _FRAME_HEADER.unpack_from(view, offset)
+        offset += size
+        if offset + length > end:
+            raise CodecError('truncated frame')
+        yield view[offset:offset + length]
+        offset += length
@@ -4,4 +4,424 @@ Created on Sun Oct 29 12:51:32 2017
 @author: Jérémie Fache
 """
 
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from threading import (Event, Lock, RLock)
+import rx
 
+from moebius.bus.cache import (cache_key, handler_identity)
+from moebius.bus.messages import (READY, ready, processing)
+
+_MISSING = object()
+
+
+def _run_chunk(func, chunk, cancelled=None, cancellable=False):
+    """
+    Computes the items of the chunk until the *cancelled* event is set.
+
+    Returns the results of the computed items, the CPU time used to compute
+    them, the CPU time spent on an item interrupted by the cancellation and
+    the number of items left uncomputed (the interrupted one included).
+    """
+    results = []
+    start = time.thread_time()
+    for item in chunk:
+        if cancelled is not None and cancelled.is_set():
+            break
+        if not cancellable:
+            results.append(func(item))
+            continue
+
+        item_start = time.thread_time()
+        result = func(item, cancelled)
+        if cancelled.is_set():
+            # func may have returned before the end of its work
+            return (results, item_start - start,
+                    time.thread_time() - item_start,
+                    len(chunk) - len(results))
+        results.append(result)
+
+    return results, time.thread_time() - start, 0.0, len(chunk) - len(results)
+
+
+def _single_result(results):
+    return results[0]
+
+
+def _supersedes(seeds, other):
+    """
+    Tells whether an input with *seeds* supersedes an input with *other*
+    seeds, i.e. both were not identified or they have a tag in common with
+    different uids.
+    """
+    if not seeds and not other:
+        return True
+    for tag, uids in seeds.items():
+        previous = other.get(tag)
+        if previous is not None and previous != uids:
+            return True
+    return False
+
+
+class ComputeStats(object):
+    """
+    Statistics of the computations cancelled by a latest-wins ComputeStage.
+
+    - cancelled: number of input messages whose computation was cancelled.
+    - skipped_items: number of items that were never computed or whose
+      computation was interrupted.
+    - wasted_cpu_time: CPU time spent computing cancelled inputs.
+    - saved_cpu_time: estimation of the CPU time of the skipped items, from
+      the mean CPU time per computed item, less the time already spent on
+      the interrupted ones.
+    """
+    __slots__ = ('cancelled', 'skipped_items', 'wasted_cpu_time',
+                 'computed_items', 'cpu_time', 'interrupted_cpu_time')
+
+    def __init__(self):
+        self.cancelled = 0
+        self.skipped_items = 0
+        self.wasted_cpu_time = 0.0
+        self.computed_items = 0
+        self.cpu_time = 0.0
+        self.interrupted_cpu_time = 0.0
+
+    @property
+    def saved_cpu_time(self):
+        if not self.computed_items:
+            return 0.0
+        mean = self.cpu_time / self.computed_items
+        return max(0.0, self.skipped_items * mean - self.interrupted_cpu_time)
+
+    def __repr__(self):
+        return ('ComputeStats(cancelled={}, skipped_items={}, '
+                'saved_cpu_time={:.6f}, wasted_cpu_time={:.6f})'.format(
+                    self.cancelled, self.skipped_items,
+                    self.saved_cpu_time, self.wasted_cpu_time))
+
+
+# -----------------------------------------------------------------------------
+# -----------------------------------------------------------------------------
+class ComputeStage(object):
+    """
+    Runs a function on the payload of READY Bus Messages in a pool of
+    workers.
+
+    The stage is a function taking an rx.Observable of Bus Messages and
+    returning an rx.Observable. For each READY input message, the stage
+    emits processing(tag, ratio=(i, n)) messages as the work goes on,
+    followed by a ready(tag) message holding the result. Output messages
+    carry the seeds of the input message. Other statuses are ignored.
+
+    *func* is called with the input payload, or with each item of
+    split(payload) when *split* is given; the results of the items are then
+    gathered with merge(results) (a list by default). Items are submitted
+    to the pool by chunks of *chunksize* items and progress is reported
+    once per chunk.
+
+    With *ordered* True, READY results are emitted in the order of the input
+    messages, otherwise as soon as they are computed.
+
+    By default the work runs in a ProcessPoolExecutor of *workers* processes
+    (os.cpu_count() if None), so *func* and the payloads must be picklable.
+    Any concurrent.futures.Executor can be given instead with *executor*.
+
+    With *latest_wins* True, a READY input cancels the computations of the
+    previous inputs it supersedes, as told by their seeds: they have an
+    upstream tag in common with different uids (or no seeds at all). The
+    chunks of a cancelled computation that have not started are cancelled,
+    running chunks stop before their next item, and its PROCESSING and
+    READY outputs are suppressed. The counts and CPU times are reported in
+    the stage *stats*.
+
+    With *cancellable* True as well, *func* is called with a second
+    argument: an event set when the computation is cancelled, which a long
+    running *func* polls with is_set() to return (or raise) early; its
+    result is then discarded. The event is a threading.Event, or a
+    multiprocessing.Manager().Event() with a process pool, which costs a
+    round-trip to the manager process per is_set() call.
+
+    With a *cache* (a cache.ResultCache), results are memoized by a stable
+    key of the functions (see cache.handler_identity(), computed when the
+    stage is created), the input payload and the input seeds. On a hit,
+    the READY result is emitted right away, without PROCESSING messages.
+
+    >>> stage = ComputeStage(fft, 'SPECTRUM', split=frames, merge=np.stack)
+    >>> spectrum = stage(source.filter(oftype('FRAMES')))
+    """
+
+    def __init__(self, func, tag, workers=None, chunksize=1, ordered=True,
+                 split=None, merge=None, executor=None, latest_wins=False,
+                 cancellable=False, cache=None):
+        if chunksize < 1:
+            raise ValueError('chunksize must be >= 1, got {}'.format(
+                chunksize))
+
+        self.func = func
+        self.tag = tag
+        self.workers = workers
+        self.chunksize = chunksize
+        self.ordered = ordered
+        self.split = split
+        if merge is None:
+            merge = list if split is not None else _single_result
+        self.merge = merge
+        self.latest_wins = latest_wins
+        self.cancellable = cancellable
+        self.cache = cache
+        # computed once: the functions are not supposed to change
+        self._identity = None
+        if cache is not None:
+            self._identity = handler_identity((func, split, merge))
+        self.stats = ComputeStats()
+
+        self._executor = executor
+        self._own_executor = executor is None
+        self._manager = None
+        self._lock = Lock()
+
+    @property
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(self.workers)
+            return self._executor
+
+    def _cancel_event(self, executor):
+        """
+        Returns a new event to tell the workers of *executor* that a
+        computation is cancelled.
+        """
+        if not isinstance(executor, ProcessPoolExecutor):
+            return Event()
+        with self._lock:
+            if self._manager is None:
+                self._manager = multiprocessing.Manager()
+            return self._manager.Event()
+
+    def shutdown(self, wait=True):
+        """
+        Shuts down the pool created by the stage, if any.
+        """
+        with self._lock:
+            if self._own_executor and self._executor is not None:
+                self._executor.shutdown(wait)
+                self._executor = None
+            if self._manager is not None:
+                self._manager.shutdown()
+                self._manager = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+
+    def __call__(self, source):
+        def subscribe(observer):
+            return source.subscribe(_ComputeRun(self, observer))
+
+        return rx.Observable.create(subscribe)
+
+
+# -----------------------------------------------------------------------------
+class _Job(object):
+    __slots__ = ('bm', 'key', 'cached', 'results', 'n_items', 'done_items',
+                 'finished', 'cancelled', 'futures', 'event')
+
+    def __init__(self, bm, n_items, key=None, cached=_MISSING):
+        self.bm = bm
+        self.key = key
+        self.cached = cached
+        self.results = [None] * n_items
+        self.n_items = n_items
+        self.done_items = 0
+        self.finished = False
+        self.cancelled = False
+        # (future, number of items)
+        self.futures = []
+        # set when the job is cancelled, polled by the workers
+        self.event = None
+
+
+class _ComputeRun(object):
+    """
+    Observer of the source of a ComputeStage for one subscription.
+    """
+
+    def __init__(self, stage, observer):
+        self.stage = stage
+        self.observer = observer
+        # reentrant: cancelling a future runs its done callback right away
+        self.lock = RLock()
+        self.jobs = {}
+        self.next_seq = 0
+        self.next_emit = 0
+        self.source_completed = False
+        self.stopped = False
+
+    def on_next(self, bm):
+        if bm.status != READY:
+            return
+
+        stage = self.stage
+        key = None
+        cached = _MISSING
+        if stage.cache is not None:
+            key = cache_key((stage.func, stage.split, stage.merge),
+                            bm.payload, bm.seeds, stage._identity)
+            cached = stage.cache.get(key, _MISSING)
+
+        if cached is not _MISSING:
+            items = []
+        elif stage.split is None:
+            items = [bm.payload]
+        else:
+            items = list(stage.split(bm.payload))
+        job = _Job(bm, len(items), key, cached)
+
+        with self.lock:
+            if self.stopped:
+                return
+            if stage.latest_wins:
+                self._cancel_superseded(bm)
+            seq = self.next_seq
+            self.next_seq += 1
+            self.jobs[seq] = job
+            if not items:
+                job.finished = True
+                self._release()
+                return
+
+        executor = stage.executor
+        if stage.latest_wins:
+            job.event = stage._cancel_event(executor)
+            # the job may have been cancelled while creating the event
+            with self.lock:
+                if job.cancelled:
+                    job.event.set()
+        cancellable = stage.latest_wins and stage.cancellable
+        size = stage.chunksize
+        for start in range(0, len(items), size):
+            chunk = items[start:start + size]
+            future = executor.submit(_run_chunk, stage.func, chunk,
+                                     job.event, cancellable)
+            job.futures.append((future, len(chunk)))
+            future.add_done_callback(
+                lambda f, start=start: self._chunk_done(job, start, f))
+
+    def _cancel_superseded(self, bm):
+        """
+        Cancels the jobs superseded by the input *bm*. Called with the lock
+        held.
+        """
+        cancelled = [job for job in self.jobs.values()
+                     if not job.cancelled
+                     and _supersedes(bm.seeds, job.bm.seeds)]
+        if not cancelled:
+            return
+
+        stats = self.stage.stats
+        for job in cancelled:
+            job.cancelled = True
+            job.finished = True
+            stats.cancelled += 1
+            if job.event is not None:
+                job.event.set()
+            for future, n_items in job.futures:
+                if future.cancel():
+                    stats.skipped_items += n_items
+
+        self._release()
+
+    def _chunk_done(self, job, start, future):
+        with self.lock:
+            if self.stopped or future.cancelled():
+                return
+
+            error = future.exception()
+            if error is not None:
+                if job.cancelled:
+                    return
+                self.stopped = True
+                self.observer.on_error(error)
+                return
+
+            results, cpu_time, interrupted_cpu_time, n_skipped = \
+                future.result()
+            stats = self.stage.stats
+            stats.computed_items += len(results)
+            stats.cpu_time += cpu_time
+            if job.cancelled:
+                stats.wasted_cpu_time += cpu_time + interrupted_cpu_time
+                stats.interrupted_cpu_time += interrupted_cpu_time
+                stats.skipped_items += n_skipped
+                return
+
+            job.results[start:start + len(results)] = results
+            job.done_items += len(results)
+
+            tag = self.stage.tag
+            self.observer.on_next(processing(tag,
+                                             ratio=(job.done_items,
+                                                    job.n_items),
+                                             seeds=job.bm.seeds))
+
+            if job.done_items == job.n_items:
+                job.finished = True
+                self._release()
+
+    def _release(self):
+        """
+        Emits the results of finished jobs. Called with the lock held.
+        """
+        jobs = self.jobs
+        if self.stage.ordered:
+            finished = []
+            while self.next_emit in jobs and jobs[self.next_emit].finished:
+                finished.append(jobs.pop(self.next_emit))
+                self.next_emit += 1
+        else:
+            finished = [jobs.pop(seq) for seq in list(jobs)
+                        if jobs[seq].finished]
+
+        for job in finished:
+            if self.stopped:
+                return
+            if not job.cancelled:
+                self._emit_result(job)
+
+        self._check_completed()
+
+    def _emit_result(self, job):
+        stage = self.stage
+        if job.cached is not _MISSING:
+            payload = job.cached
+        else:
+            try:
+                payload = stage.merge(job.results)
+            except Exception as error:
+                self.stopped = True
+                self.observer.on_error(error)
+                return
+            if job.key is not None:
+                stage.cache.put(job.key, payload)
+
+        self.observer.on_next(ready(stage.tag, payload, seeds=job.bm.seeds))
+
+    def _check_completed(self):
+        if self.source_completed and not self.jobs and not self.stopped:
+            self.stopped = True
+            self.observer.on_completed()
+
+    def on_error(self, error):
+        with self.lock:
+            if not self.stopped:
+                self.stopped = True
+                self.observer.on_error(error)
+
+    def on_completed(self):
+        with self.lock:
+            self.source_completed = True
+            self._check_completed()
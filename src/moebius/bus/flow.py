@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 19:12:47 2026
+@author: Jérémie Fache
+"""
+
+from collections import deque
+from threading import (Condition, Thread)
+import rx
+from rx.disposables import AnonymousDisposable
+from moebius.bus.messages import PROCESSING
+
+# overflow policies
+BLOCK = 'BLOCK'
+DROP_OLDEST = 'DROP_OLDEST'
+DROP_NEWEST = 'DROP_NEWEST'
+DROP_PROCESSING = 'DROP_PROCESSING'
+
+POLICIES = (BLOCK, DROP_OLDEST, DROP_NEWEST, DROP_PROCESSING)
+
+
+class FlowStats(object):
+    """
+    Counters of a BoundedQueue, over all its subscriptions.
+
+    - depth: number of messages currently queued.
+    - max_depth: highest depth seen.
+    - received, delivered: number of messages entering and leaving.
+    - dropped: number of dropped messages per status.
+    - blocked: number of times a producer had to wait for room.
+    """
+    __slots__ = ('depth', 'max_depth', 'received', 'delivered', 'dropped',
+                 'blocked')
+
+    def __init__(self):
+        self.depth = 0
+        self.max_depth = 0
+        self.received = 0
+        self.delivered = 0
+        self.dropped = {}
+        self.blocked = 0
+
+    @property
+    def total_dropped(self):
+        return sum(self.dropped.values())
+
+    def __repr__(self):
+        return ('FlowStats(depth={}, max_depth={}, received={}, '
+                'delivered={}, dropped={}, blocked={})'.format(
+                    self.depth, self.max_depth, self.received,
+                    self.delivered, self.dropped, self.blocked))
+
+
+# -----------------------------------------------------------------------------
+# -----------------------------------------------------------------------------
+class BoundedQueue(object):
+    """
+    Bounded boundary between two stages, in place of
+    observe_on(EventLoopScheduler()).
+
+    The boundary is a function taking an rx.Observable of Bus Messages and
+    returning an rx.Observable. Each subscription gets a queue of at most
+    *maxsize* messages, delivered to the observer by a dedicated thread.
+    When the queue is full, *policy* tells what happens to a new message:
+
+    - BLOCK: the producer waits until there is room.
+    - DROP_OLDEST: the oldest queued message is dropped.
+    - DROP_NEWEST: the new message is dropped.
+    - DROP_PROCESSING: a new PROCESSING message is dropped, any other is
+      queued in place of the oldest queued PROCESSING message; the producer
+      waits when the queue only holds messages of other statuses, so that
+      READY messages are never dropped.
+
+    Completion and errors are queued after the pending messages and are
+    never dropped. Queue depth and drop counters are kept in *stats*.
+
+    >>> boundary = BoundedQueue(1000, DROP_PROCESSING)
+    >>> source.let(boundary).subscribe(slow_subscriber)
+    """
+
+    def __init__(self, maxsize=1024, policy=BLOCK):
+        if maxsize < 1:
+            raise ValueError('maxsize must be >= 1, got {}'.format(maxsize))
+        if policy not in POLICIES:
+            raise ValueError('unknown policy {!r}, expected one of {}'.format(
+                policy, ', '.join(POLICIES)))
+
+        self.maxsize = maxsize
+        self.policy = policy
+        self.stats = FlowStats()
+        # shared by the subscriptions as they update the same stats
+        self._condition = Condition()
+
+    def __call__(self, source):
+        def subscribe(observer):
+            run = _QueueRun(self, observer)
+            run.start()
+            subscription = source.subscribe(run)
+
+            def dispose():
+                subscription.dispose()
+                run.dispose()
+
+            return AnonymousDisposable(dispose)
+
+        return rx.Observable.create(subscribe)
+
+
+# -----------------------------------------------------------------------------
+# terminal notifications, queued after the messages
+_COMPLETED = object()
+
+
+class _Error(object):
+    __slots__ = ('error',)
+
+    def __init__(self, error):
+        self.error = error
+
+
+class _QueueRun(object):
+    """
+    Observer of the source of a BoundedQueue for one subscription, and
+    consumer thread delivering the queued messages.
+    """
+
+    def __init__(self, queue, observer):
+        self.queue = queue
+        self.observer = observer
+        self.condition = queue._condition
+        self.items = deque()
+        self.n_processing = 0
+        self.terminal = None
+        self.stopped = False
+        self.thread = Thread(target=self._deliver, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    # -------------------------------------------------------------------------
+    def _drop(self, bm):
+        dropped = self.queue.stats.dropped
+        dropped[bm.status] = dropped.get(bm.status, 0) + 1
+
+    def _remove_oldest_processing(self):
+        for index, bm in enumerate(self.items):
+            if bm.status == PROCESSING:
+                del self.items[index]
+                self.n_processing -= 1
+                return bm
+        return None
+
+    def _make_room(self, bm):
+        """
+        Applies the overflow policy for the new message *bm*. Returns True
+        if *bm* must be queued. Called with the condition held.
+        """
+        policy = self.queue.policy
+        stats = self.queue.stats
+        items = self.items
+
+        if policy == DROP_NEWEST:
+            self._drop(bm)
+            return False
+
+        if policy == DROP_OLDEST:
+            oldest = items.popleft()
+            if oldest.status == PROCESSING:
+                self.n_processing -= 1
+            stats.depth -= 1
+            self._drop(oldest)
+            return True
+
+        if policy == DROP_PROCESSING:
+            if bm.status == PROCESSING:
+                self._drop(bm)
+                return False
+            if self.n_processing:
+                self._drop(self._remove_oldest_processing())
+                stats.depth -= 1
+                return True
+
+        # block until the consumer makes room
+        stats.blocked += 1
+        while len(items) >= self.queue.maxsize and not self.stopped:
+            self.condition.wait()
+        return not self.stopped
+
+    def on_next(self, bm):
+        with self.condition:
+            if self.stopped or self.terminal is not None:
+                return
+
+            stats = self.queue.stats
+            stats.received += 1
+            if len(self.items) >= self.queue.maxsize:
+                if not self._make_room(bm):
+                    return
+
+            self.items.append(bm)
+            if bm.status == PROCESSING:
+                self.n_processing += 1
+            stats.depth += 1
+            if stats.depth > stats.max_depth:
+                stats.max_depth = stats.depth
+            self.condition.notify_all()
+
+    def _terminate(self, terminal):
+        with self.condition:
+            if self.stopped or self.terminal is not None:
+                return
+            self.terminal = terminal
+            self.condition.notify_all()
+
+    def on_error(self, error):
+        self._terminate(_Error(error))
+
+    def on_completed(self):
+        self._terminate(_COMPLETED)
+
+    def dispose(self):
+        with self.condition:
+            if self.stopped:
+                return
+            self.stopped = True
+            self.queue.stats.depth -= len(self.items)
+            self.items.clear()
+            self.condition.notify_all()
+
+    # -------------------------------------------------------------------------
+    def _deliver(self):
+        condition = self.condition
+        stats = self.queue.stats
+        while True:
+            with condition:
+                while (not self.items and self.terminal is None
+                       and not self.stopped):
+                    condition.wait()
+                if self.stopped:
+                    return
+                if not self.items:
+                    terminal = self.terminal
+                    self.stopped = True
+                    break
+
+                bm = self.items.popleft()
+                if bm.status == PROCESSING:
+                    self.n_processing -= 1
+                stats.depth -= 1
+                stats.delivered += 1
+                # wakes up a blocked producer
+                condition.notify_all()
+
+            self.observer.on_next(bm)
+
+        if terminal is _COMPLETED:
+            self.observer.on_completed()
+        else:
+            self.observer.on_error(terminal.error)
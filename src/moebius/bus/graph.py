@@ -0,0 +1,319 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Oct 21 14:22:37 2026
+@author: Jérémie Fache
+"""
+
+from collections import (ChainMap, namedtuple)
+from threading import RLock
+import rx
+from rx.disposables import AnonymousDisposable
+from moebius.bus.messages import (READY, ready, oftype, combine_seeds,
+                                  _split_tags)
+
+# what a push would do: tags of the nodes recomputed, reusing their last
+# output and waiting for inputs, in topological order
+Plan = namedtuple('Plan', 'recompute, reuse, waiting')
+
+
+class _Input(object):
+    __slots__ = ('selector', 'test', 'grouped', 'tag')
+
+    def __init__(self, selector):
+        exact, startswith = _split_tags(selector)
+        self.selector = selector
+        self.test = oftype(selector, READY)
+        # several tags may match: the node gets a {tag: payload} dict
+        self.grouped = bool(startswith) or len(exact) != 1
+        self.tag = None if self.grouped else exact[0]
+
+    def tags(self, tags):
+        if not self.grouped:
+            return {self.tag} if self.tag in tags else set()
+        return self.test.select_tags(tags)
+
+
+class _Node(object):
+    __slots__ = ('tag', 'func', 'inputs', 'seeds')
+
+    def __init__(self, tag, func, inputs):
+        self.tag = tag
+        self.func = func
+        self.inputs = [_Input(selector) for selector in inputs]
+        # combined seeds of the inputs of the last computation
+        self.seeds = None
+
+
+# -----------------------------------------------------------------------------
+# -----------------------------------------------------------------------------
+class Graph(object):
+    """
+    Incremental dataflow graph of Bus Messages.
+
+    Each node computes the payload of its READY output *tag* from the
+    payloads of the latest READY messages of its inputs, oftype() tag
+    selectors. An input naming one tag gives its payload; an input
+    matching several tags (ellipsis tags, tuples of tags) gives a
+    {tag: payload} dict of the matching tags.
+
+    push() takes a root message and recomputes only the nodes it
+    invalidates, build-system style: a node is recomputed when the
+    combination of the seeds of its inputs changed, i.e. when its lineage
+    holds a new uid. Other nodes keep their last output. Roots without
+    seeds are identified with a new uid ('TAG#n') so that each push is a
+    new version of its tag; a root pushed again with the same seeds
+    recomputes nothing.
+
+    dry_run() tells what push() would recompute, without computing.
+
+    >>> graph = Graph()
+    >>> graph.add('SPECTRUM', fft, 'SIGNAL')
+    >>> @graph.node('PEAKS', 'SPECTRUM', 'THRESHOLD')
+    ... def peaks(spectrum, threshold):
+    ...     return find_peaks(spectrum, threshold)
+    >>> graph.push(ready('THRESHOLD', 0.5))
+    >>> graph.push(ready('SIGNAL', signal))
+    """
+
+    def __init__(self):
+        self._nodes = {}
+        self._order = None
+        self._latest = {}
+        self._uids = {}
+        self.computed = 0
+        self.reused = 0
+
+    def add(self, tag, func, *inputs):
+        """
+        Adds the node computing *tag* with func(*payloads of inputs*).
+        """
+        if tag in self._nodes:
+            raise ValueError('node {!r} already exists'.format(tag))
+        if not inputs:
+            raise ValueError('node {!r} has no input'.format(tag))
+        self._nodes[tag] = _Node(tag, func, inputs)
+        self._order = None
+
+    def node(self, tag, *inputs):
+        """
+        Decorator version of add().
+        """
+        def decorator(func):
+            self.add(tag, func, *inputs)
+            return func
+
+        return decorator
+
+    @property
+    def order(self):
+        """
+        Tags of the nodes in topological order. Raises ValueError if the
+        nodes form a cycle.
+        """
+        if self._order is None:
+            self._order = self._sort()
+        return [node.tag for node in self._order]
+
+    def _sort(self):
+        nodes = list(self._nodes.values())
+        tags = set(self._nodes)
+        downstream = {node.tag: [] for node in nodes}
+        n_upstream = {}
+        for node in nodes:
+            upstream = set()
+            for node_input in node.inputs:
+                upstream.update(node_input.tags(tags))
+            for tag in upstream:
+                downstream[tag].append(node)
+            n_upstream[node.tag] = len(upstream)
+
+        # Kahn's algorithm, keeping the order of addition between
+        # independent nodes
+        order = [node for node in nodes if not n_upstream[node.tag]]
+        for node in order:
+            for child in downstream[node.tag]:
+                n_upstream[child.tag] -= 1
+                if not n_upstream[child.tag]:
+                    order.append(child)
+
+        if len(order) != len(nodes):
+            cycle = sorted(tag for tag, count in n_upstream.items() if count)
+            raise ValueError('nodes form a cycle: {}'.format(', '.join(cycle)))
+        return order
+
+    def latest(self, tag):
+        """
+        Returns the latest READY message of *tag*, root or node, or None.
+        """
+        return self._latest.get(tag)
+
+    # -------------------------------------------------------------------------
+    def _root(self, bm):
+        """
+        Returns the root message *bm*, identified with the next uid of its
+        tag if it has no seeds.
+        """
+        if bm.tag in self._nodes:
+            raise ValueError('{!r} is the output of a node, not a root'
+                             .format(bm.tag))
+        if bm.seeds:
+            return bm
+        count = self._uids.get(bm.tag, 0)
+        return bm.identify('{}#{}'.format(bm.tag, count))
+
+    def _plan(self, tag, seeds):
+        """
+        Walks the nodes after a root message of *tag* with *seeds*.
+        Returns (recompute, reuse, waiting) lists of (node, input seeds) or
+        nodes.
+        """
+        if self._order is None:
+            self._order = self._sort()
+
+        latest = self._latest
+        # seeds of the messages that would be replaced
+        changed = {tag: seeds}
+        if tag in latest and latest[tag].seeds == seeds:
+            changed = {}
+        present = set(latest).union(changed)
+
+        recompute, reuse, waiting = [], [], []
+        for node in self._order:
+            touched = any(node_input.tags(changed)
+                          for node_input in node.inputs)
+            if not touched and node.tag in latest:
+                reuse.append(node)
+                continue
+
+            seedss = []
+            for node_input in node.inputs:
+                tags = node_input.tags(present)
+                if not tags:
+                    break
+                seedss.extend(changed[t] if t in changed else latest[t].seeds
+                              for t in tags)
+            else:
+                combined = combine_seeds(*seedss)
+                if node.tag not in latest or combined != node.seeds:
+                    recompute.append((node, combined))
+                    changed[node.tag] = combined
+                    present.add(node.tag)
+                else:
+                    reuse.append(node)
+                continue
+
+            waiting.append(node)
+
+        return recompute, reuse, waiting
+
+    def dry_run(self, bm):
+        """
+        Returns the Plan of push(bm), leaving the graph unchanged.
+        """
+        if bm.status != READY:
+            return Plan([], [], [])
+        bm = self._root(bm)
+        recompute, reuse, waiting = self._plan(bm.tag, bm.seeds)
+        return Plan([node.tag for node, _ in recompute],
+                    [node.tag for node in reuse],
+                    [node.tag for node in waiting])
+
+    def _payloads(self, node, latest):
+        args = []
+        for node_input in node.inputs:
+            if node_input.grouped:
+                args.append({tag: latest[tag].payload
+                             for tag in node_input.tags(latest)})
+            else:
+                args.append(latest[node_input.tag].payload)
+        return args
+
+    def push(self, bm):
+        """
+        Updates the graph with the root message *bm*. Returns the emitted
+        messages: *bm* (identified if it had no seeds) followed by the new
+        outputs of the recomputed nodes, in topological order.
+
+        Messages that are not READY are returned as is.
+
+        If a node raises, the exception is propagated and the graph is left
+        as before the push, so that pushing the root again retries.
+        """
+        if bm.status != READY:
+            return [bm]
+
+        identified = self._root(bm)
+        recompute, reuse, _ = self._plan(identified.tag, identified.seeds)
+
+        # outputs are staged, then committed once all of them are computed
+        staged = {identified.tag: identified}
+        latest = ChainMap(staged, self._latest)
+        emitted = [identified]
+        for node, seeds in recompute:
+            output = ready(node.tag, node.func(*self._payloads(node, latest)),
+                           seeds=seeds)
+            staged[node.tag] = output
+            emitted.append(output)
+
+        if identified is not bm:
+            self._uids[bm.tag] = self._uids.get(bm.tag, 0) + 1
+        for node, seeds in recompute:
+            node.seeds = seeds
+        self._latest.update(staged)
+
+        self.computed += len(recompute)
+        self.reused += len(reuse)
+        return emitted
+
+    def __call__(self, source):
+        """
+        Operator pushing the messages of *source* and emitting what push()
+        returns.
+
+        >>> bus.let(graph).subscribe(print)
+        """
+        def subscribe(observer):
+            run = _GraphRun(self, observer)
+            subscription = source.subscribe(run)
+            return AnonymousDisposable(lambda: (run.dispose(),
+                                                subscription.dispose()))
+
+        return rx.Observable.create(subscribe)
+
+
+class _GraphRun(object):
+
+    def __init__(self, graph, observer):
+        self.graph = graph
+        self.observer = observer
+        self.lock = RLock()
+        self.stopped = False
+
+    def on_next(self, bm):
+        with self.lock:
+            if self.stopped:
+                return
+            try:
+                emitted = self.graph.push(bm)
+            except Exception as error:
+                self.stopped = True
+                self.observer.on_error(error)
+                return
+            for output in emitted:
+                self.observer.on_next(output)
+
+    def on_error(self, error):
+        with self.lock:
+            if not self.stopped:
+                self.stopped = True
+                self.observer.on_error(error)
+
+    def on_completed(self):
+        with self.lock:
+            if not self.stopped:
+                self.stopped = True
+                self.observer.on_completed()
+
+    def dispose(self):
+        with self.lock:
+            self.stopped = True
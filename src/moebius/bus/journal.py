@@ -0,0 +1,323 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 20:11:26 2026
+@author: Jérémie Fache
+"""
+
+import heapq
+import mmap
+import os
+import struct
+from moebius.bus import codec
+from moebius.bus.messages import (READY, oftype)
+
+# index entry: tag code, status code, offset and length of the record
+_ENTRY = struct.Struct('<IIQI')
+
+_SEGMENT_EXT = '.seg'
+_INDEX_EXT = '.idx'
+_STRINGS = 'strings.dat'
+
+
+def _map(path):
+    """
+    Returns a read-only mmap of the file at *path*, or an empty bytes
+    object for an empty file.
+    """
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b''
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+# -----------------------------------------------------------------------------
+# -----------------------------------------------------------------------------
+class Journal(object):
+    """
+    Append-only journal of Bus Messages, stored in a directory.
+
+    Messages are appended as length-prefixed codec records to segment files.
+    A new segment is started when the current one would exceed
+    *max_segment_bytes*. Each segment has a side index file of fixed-size
+    entries (tag code, status code, offset, length), tags and statuses
+    being stored once in a strings file. Index and segments are read
+    through mmap when the journal is reopened.
+
+    replay() takes the same tag/status selectors as oftype(); it looks up
+    the matching (tag, status) keys in the index and only reads the
+    matching records.
+
+    >>> with Journal('/tmp/journal') as journal:
+    ...     journal.append(bm)
+    ...     for bm in journal.replay('A...', READY):
+    ...         print(bm)
+    """
+
+    def __init__(self, directory, max_segment_bytes=64 * 1024 * 1024):
+        self.directory = directory
+        self.max_segment_bytes = max_segment_bytes
+        os.makedirs(directory, exist_ok=True)
+
+        self._strings = []
+        self._codes = {}
+        # (tag, status) -> list of (segment, offset, length)
+        self._index = {}
+        self._statuses_by_tag = {}
+        self._segments = []
+        self._maps = {}
+        self._size = 0
+
+        self._strings_file = None
+        self._segment_file = None
+        self._index_file = None
+        self._segment_bytes = 0
+
+        self._load()
+
+    # -------------------------------------------------------------------------
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _segment_path(self, segment, ext):
+        return self._path('{:08d}{}'.format(segment, ext))
+
+    def _load(self):
+        strings_path = self._path(_STRINGS)
+        if os.path.exists(strings_path):
+            self._load_strings(strings_path)
+
+        segments = sorted(int(name[:-len(_SEGMENT_EXT)])
+                          for name in os.listdir(self.directory)
+                          if name.endswith(_SEGMENT_EXT))
+
+        for segment in segments:
+            self._segments.append(segment)
+            segment_size = os.path.getsize(
+                self._segment_path(segment, _SEGMENT_EXT))
+            index_path = self._segment_path(segment, _INDEX_EXT)
+            if not os.path.exists(index_path):
+                continue
+
+            entries = _map(index_path)
+            size = len(entries)
+            end = 0
+            for i in range(size // _ENTRY.size):
+                tag_code, status_code, offset, length = \
+                    _ENTRY.unpack_from(entries, i * _ENTRY.size)
+                if (offset + length > segment_size
+                        or max(tag_code, status_code) >= len(self._strings)):
+                    # partially written record, or string
+                    break
+                self._add_entry(self._strings[tag_code],
+                                self._strings[status_code],
+                                segment, offset, length)
+                end += _ENTRY.size
+            if isinstance(entries, mmap.mmap):
+                entries.close()
+            if end < size:
+                # codes of the dropped entries may be given to new strings
+                with open(index_path, 'r+b') as f:
+                    f.truncate(end)
+
+        self._strings_file = open(strings_path, 'ab')
+
+    def _load_strings(self, path):
+        """
+        Loads the string table, truncating the file after its last complete
+        frame, e.g. if the process was killed while writing a string.
+        """
+        end = 0
+        with open(path, 'rb') as f:
+            try:
+                for frame in codec.read_frames(f):
+                    self._add_string(frame.decode('utf-8'))
+                    end += codec.FRAME_HEADER_SIZE + len(frame)
+            except codec.CodecError:
+                pass
+
+        if end < os.path.getsize(path):
+            with open(path, 'r+b') as f:
+                f.truncate(end)
+
+    def _add_string(self, s):
+        self._codes[s] = len(self._strings)
+        self._strings.append(s)
+
+    def _code(self, s):
+        code = self._codes.get(s)
+        if code is None:
+            code = len(self._strings)
+            self._add_string(s)
+            codec.write_frame(self._strings_file, s.encode('utf-8'))
+            self._strings_file.flush()
+        return code
+
+    def _add_entry(self, tag, status, segment, offset, length):
+        key = (tag, status)
+        entries = self._index.get(key)
+        if entries is None:
+            entries = self._index[key] = []
+            self._statuses_by_tag.setdefault(tag, set()).add(status)
+        entries.append((segment, offset, length))
+        self._size += 1
+
+    # -------------------------------------------------------------------------
+    def __len__(self):
+        return self._size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def segments(self):
+        return list(self._segments)
+
+    def _open_segment(self):
+        segment = self._segments[-1] + 1 if self._segments else 0
+        self._segments.append(segment)
+        self._segment_file = open(
+            self._segment_path(segment, _SEGMENT_EXT), 'ab')
+        self._index_file = open(self._segment_path(segment, _INDEX_EXT), 'ab')
+        self._segment_bytes = 0
+
+    def _close_segment(self):
+        if self._segment_file is not None:
+            self._segment_file.close()
+            self._index_file.close()
+            self._segment_file = None
+            self._index_file = None
+
+    def rotate(self):
+        """
+        Closes the current segment. The next message starts a new one.
+        """
+        self._close_segment()
+
+    def append(self, bm):
+        """
+        Appends the Bus Message *bm* to the journal.
+        """
+        record = codec.encode(bm)
+        frame_size = codec.FRAME_HEADER_SIZE + len(record)
+
+        if (self._segment_file is None
+                or (self._segment_bytes
+                    and self._segment_bytes + frame_size
+                    > self.max_segment_bytes)):
+            self._close_segment()
+            self._open_segment()
+
+        segment = self._segments[-1]
+        offset = self._segment_bytes + codec.FRAME_HEADER_SIZE
+        codec.write_frame(self._segment_file, record)
+        self._segment_bytes += frame_size
+
+        tag_code = self._code(bm.tag)
+        status_code = self._code(bm.status)
+        self._index_file.write(_ENTRY.pack(tag_code, status_code,
+                                           offset, len(record)))
+        self._add_entry(bm.tag, bm.status, segment, offset, len(record))
+
+        # the mapping of the segment does not cover the new record
+        self._unmap(segment)
+
+    def flush(self):
+        if self._segment_file is not None:
+            self._segment_file.flush()
+            self._index_file.flush()
+
+    def close(self):
+        self._close_segment()
+        for segment in list(self._maps):
+            self._unmap(segment)
+        if self._strings_file is not None:
+            self._strings_file.close()
+            self._strings_file = None
+
+    # -------------------------------------------------------------------------
+    def _unmap(self, segment):
+        mapped = self._maps.pop(segment, None)
+        if isinstance(mapped, mmap.mmap):
+            mapped.close()
+
+    def _segment_map(self, segment):
+        mapped = self._maps.get(segment)
+        if mapped is None:
+            if self._segments and segment == self._segments[-1]:
+                self.flush()
+            mapped = self._maps[segment] = _map(
+                self._segment_path(segment, _SEGMENT_EXT))
+        return mapped
+
+    def _locations(self, tag, status):
+        """
+        Returns the lists of index entries matching *tag* and *status*.
+        """
+        predicate = oftype(tag, status)
+        locations = []
+        for mtag in predicate.select_tags(self._statuses_by_tag):
+            statuses = predicate.select_status(self._statuses_by_tag[mtag])
+            for mstatus in statuses:
+                locations.append(self._index[(mtag, mstatus)])
+        return locations
+
+    def replay(self, tag=None, status=None):
+        """
+        Yields the messages matching *tag* and *status* (with oftype()
+        semantics), in the order they were appended.
+        """
+        # each list of entries is in journal order
+        for segment, offset, length in heapq.merge(
+                *self._locations(tag, status)):
+            mapped = self._segment_map(segment)
+            with memoryview(mapped) as view:
+                bm = codec.decode(view[offset:offset + length])
+            yield bm
+
+    def count(self, tag=None, status=None):
+        """
+        Returns the number of messages matching *tag* and *status*, from the
+        index only.
+        """
+        return sum(len(entries) for entries in self._locations(tag, status))
+
+    # -------------------------------------------------------------------------
+    def compact(self):
+        """
+        Rewrites the journal keeping only the last READY message of each
+        tag, in their original order.
+        """
+        last_ready = [self._index[(tag, READY)][-1]
+                      for tag, statuses in self._statuses_by_tag.items()
+                      if READY in statuses]
+        last_ready.sort()
+
+        kept = []
+        for segment, offset, length in last_ready:
+            mapped = self._segment_map(segment)
+            kept.append(bytes(mapped[offset:offset + length]))
+
+        old_segments = list(self._segments)
+        self._close_segment()
+        for segment in old_segments:
+            self._unmap(segment)
+
+        self._index = {}
+        self._statuses_by_tag = {}
+        self._size = 0
+
+        # new segments are numbered after the old ones, which are removed
+        # once the kept records are written
+        for record in kept:
+            self.append(codec.decode(record))
+        self.flush()
+
+        for segment in old_segments:
+            self._segments.remove(segment)
+            for ext in (_SEGMENT_EXT, _INDEX_EXT):
+                path = self._segment_path(segment, ext)
+                if os.path.exists(path):
+                    os.remove(path)
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Oct 22 09:41:26 2026
+@author: Jérémie Fache
+"""
+
+import time
+from collections import deque
+from threading import Lock
+from moebius.bus.messages import (READY, oftype)
+
+
+class _Entry(object):
+    __slots__ = ('seq', 'time', 'bm')
+
+    def __init__(self, seq, time, bm):
+        self.seq = seq
+        self.time = time
+        self.bm = bm
+
+
+class LineageIndex(object):
+    """
+    Inverted index of the lineage of Bus Messages.
+
+    The seeds of a message tell, for each root tag, the uids of the root
+    messages it derives from (see BM.identify() and combine_seeds()). The
+    index maps each (root tag, uid) to the retained messages holding it in
+    their seeds, so that both provenance queries are dictionary lookups:
+
+    - derived(tag, uid): the messages derived from the root (tag, uid).
+    - sources(bm): the retained root messages *bm* derives from.
+
+    Only the messages matching *tag* and *status* (oftype() selectors) are
+    retained. Memory is bounded by evicting the oldest messages beyond
+    *max_messages*, and those added more than *max_age* seconds ago.
+
+    >>> index = LineageIndex(max_messages=1000000, max_age=3600)
+    >>> bus.subscribe(index.add)
+    >>> index.derived('CAM1', 'frame-42', 'SPECTRUM...')
+    >>> index.sources(index.latest('REPORT'))
+    """
+
+    def __init__(self, tag=None, status=READY, max_messages=None,
+                 max_age=None, clock=time.monotonic):
+        self.test = oftype(tag, status)
+        self.max_messages = max_messages
+        self.max_age = max_age
+        self.clock = clock
+        self.evictions = 0
+
+        self._entries = deque()
+        self._seq = 0
+        # (root tag, uid) -> {seq: entry} in order of addition
+        self._derived = {}
+        # (root tag, uid) -> entry of the root message
+        self._roots = {}
+        # tag -> entry of the latest message
+        self._latest = {}
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        """
+        Tells if messages derived from the root (tag, uid) *key* are
+        retained.
+        """
+        return key in self._derived
+
+    # -------------------------------------------------------------------------
+    def add(self, bm):
+        """
+        Indexes *bm*, if it matches the selectors of the index.
+        """
+        if not self.test(bm):
+            return
+
+        with self._lock:
+            now = self.clock()
+            entry = _Entry(self._seq, now, bm)
+            self._seq += 1
+            self._entries.append(entry)
+
+            derived = self._derived
+            for tag, uids in bm.seeds.items():
+                for uid in uids:
+                    key = (tag, uid)
+                    entries = derived.get(key)
+                    if entries is None:
+                        entries = derived[key] = {}
+                    entries[entry.seq] = entry
+
+            uids = bm.seeds.get(bm.tag)
+            if uids is not None:
+                for uid in uids:
+                    self._roots[(bm.tag, uid)] = entry
+            self._latest[bm.tag] = entry
+
+            self._evict(now)
+
+    __call__ = add
+
+    def extend(self, bms):
+        for bm in bms:
+            self.add(bm)
+
+    def _evict(self, now):
+        """
+        Removes the entries beyond the bounds. Called with the lock held.
+        """
+        entries = self._entries
+        max_messages = self.max_messages
+        limit = None if self.max_age is None else now - self.max_age
+        while entries and (
+                (max_messages is not None and len(entries) > max_messages)
+                or (limit is not None and entries[0].time < limit)):
+            self._remove(entries.popleft())
+
+    def _remove(self, entry):
+        bm = entry.bm
+        derived = self._derived
+        for tag, uids in bm.seeds.items():
+            for uid in uids:
+                key = (tag, uid)
+                entries = derived.get(key)
+                if entries is not None:
+                    entries.pop(entry.seq, None)
+                    if not entries:
+                        del derived[key]
+                if self._roots.get(key) is entry:
+                    del self._roots[key]
+
+        if self._latest.get(bm.tag) is entry:
+            del self._latest[bm.tag]
+        self.evictions += 1
+
+    def expire(self):
+        """
+        Evicts the messages older than max_age seconds, which is otherwise
+        done when messages are added.
+        """
+        with self._lock:
+            self._evict(self.clock())
+
+    # -------------------------------------------------------------------------
+    def derived(self, tag, uid, selector=None, status=None):
+        """
+        Returns the retained messages derived from the root message of
+        *tag* identified by *uid*, oldest first (the root message included,
+        if retained). *selector* and *status* filter the messages as
+        oftype() does.
+        """
+        with self._lock:
+            entries = self._derived.get((tag, uid))
+            if not entries:
+                return []
+            bms = [entry.bm for entry in entries.values()]
+
+        if selector is None and status is None:
+            return bms
+        return oftype(selector, status).filter_many(bms)
+
+    def sources(self, bm):
+        """
+        Returns the retained root messages *bm* derives from. Roots that
+        are not retained (evicted or never added) are skipped; bm.seeds
+        holds the whole lineage.
+        """
+        if bm is None:
+            return []
+
+        roots = []
+        with self._lock:
+            for tag, uids in bm.seeds.items():
+                for uid in uids:
+                    entry = self._roots.get((tag, uid))
+                    if entry is not None:
+                        roots.append(entry.bm)
+        return roots
+
+    def latest(self, tag):
+        """
+        Returns the latest retained message of *tag*, or None.
+        """
+        entry = self._latest.get(tag)
+        return None if entry is None else entry.bm
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._derived.clear()
+            self._roots.clear()
+            self._latest.clear()
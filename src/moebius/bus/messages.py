@@ -6,20 +6,46 @@ Created on Sun Oct 29 12:51:21 2017
 
 from collections import namedtuple as _nt
 from collections.abc import Container
-from pyrsistent import (m as pm, s as se)
+from bisect import bisect_left
+from functools import (lru_cache, wraps)
+from itertools import islice
+from threading import Lock
+from pyrsistent import (m as pm, s as se, pmap)
+from moebius.bus.seeds import union
+
+
+_new = tuple.__new__
+
+# maximum number of seeds maps kept by BM.identify()
+SEEDS_CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=SEEDS_CACHE_SIZE)
+def _identity_seeds(tag, uid):
+    return pm(**{tag: se(uid)})
 
 
 class BM(_nt('_Bm', 'tag, status, payload, seeds')):
     __slots__ = ()
 
-    def identify(self, uid):
+    def identify(self, uid, factory=se):
         """
         Returns a new message with updated seeds.
         Previous seeds (if any) are removed and the provided unique id is
         stored in the appropriate structure (i.e. seeds dict).
+
+        *factory* builds the set of uids stored for the tag, e.g.
+        seeds.seedset for compact integer-interned seed sets.
+
+        With the default factory, the seeds of the recent (tag, uid) pairs
+        are shared (they are immutable) from a bounded LRU cache of
+        SEEDS_CACHE_SIZE entries.
         """
-        seeds = pm(**{self.tag: se(uid)})
-        return self._replace(seeds=seeds)
+        if factory is se:
+            seeds = _identity_seeds(self.tag, uid)
+        else:
+            seeds = pm(**{self.tag: factory(uid)})
+        return _new(type(self), (self.tag, self.status, self.payload, seeds))
 
 
 # alias for BusMessage
@@ -28,29 +54,91 @@ BusMessage = BM
 READY = 'READY'
 PROCESSING = 'PROCESSING'
 
+# maximum number of test functions kept by oftype()
+OFTYPE_CACHE_SIZE = 1024
+
+
+class Progress(_nt('_Progress', 'ratio, meta')):
+    """
+    Payload of PROCESSING messages: *ratio* and *meta* as given to
+    processing().
+
+    Immutable and without per-instance dict. For code written against the
+    former pmap payloads, fields can also be read as payload['ratio'] and
+    payload.get('meta'), and 'ratio' in payload is True. It is still a
+    tuple, though: iterating gives the values, and it does not compare
+    equal to pmap(ratio=..., meta=...).
+    """
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            if key not in self._fields:
+                raise KeyError(key)
+            return getattr(self, key)
+        return tuple.__getitem__(self, key)
+
+    def __contains__(self, key):
+        return key in self._fields
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        return self._fields
+
+
+_NO_PROGRESS = _new(Progress, (None, None))
+
+
 def ready(tag, payload=None, seeds=pm()):
     """
     Returns a bus message with a READY status.
     """
-    return BM(tag=tag,
-              status=READY,
-              payload=payload,
-              seeds=seeds)
+    return _new(BM, (tag, READY, payload, seeds))
 
 def processing(tag, ratio=None, meta=None, seeds=pm()):
     """
     Returns a bus message with a PROCESSING status.
 
     ratio must be None or a tuple of the step that has just been processed, and
-    the total number of steps.
+    the total number of steps. The payload is a Progress.
+    """
+    if ratio is None and meta is None:
+        payload = _NO_PROGRESS
+    else:
+        payload = _new(Progress, (ratio, meta))
+
+    return _new(BM, (tag, PROCESSING, payload, seeds))
+
+def ready_many(tag, payloads, seeds=pm(), uids=None):
+    """
+    Returns the list of READY messages of *tag*, one per payload.
+
+    With *uids* (one per payload), each message is identified with its uid
+    (see BM.identify()) instead of getting *seeds*.
+
+    >>> frames = ready_many('CAM1', images, uids=range(len(images)))
     """
-    payload = pm(ratio=ratio,
-                 meta=meta)
+    if uids is None:
+        return [_new(BM, (tag, READY, payload, seeds))
+                for payload in payloads]
 
-    return BM(tag=tag,
-              status=PROCESSING,
-              payload=payload,
-              seeds=seeds)
+    identity_seeds = _identity_seeds
+    return [_new(BM, (tag, READY, payload, identity_seeds(tag, uid)))
+            for payload, uid in zip(payloads, uids)]
+
+def processing_many(tag, ratios, meta=None, seeds=pm()):
+    """
+    Returns the list of PROCESSING messages of *tag*, one per ratio.
+
+    >>> steps = processing_many('FFT', [(i, 10) for i in range(1, 11)])
+    """
+    return [_new(BM, (tag, PROCESSING, _new(Progress, (ratio, meta)), seeds))
+            for ratio in ratios]
 
 # -----------------------------------------------------------------------------
 # -----------------------------------------------------------------------------
@@ -105,34 +193,122 @@ def oftype(tag=None, status=None):
     >>> rx.Observable.from_(messages).filter(oftype('C...')).subscribe(print)
     BM(tag='C', status='READY', payload=4, seeds={})
     BM(tag='CC', status='PROCESSING', payload=5, seeds={})
+
+    Batches of messages can be tested in one call. The returned function
+    provides:
+
+    - mask(messages): list of booleans, one per message.
+    - filter_many(messages): list of the messages that pass the test.
+    - mask_columns(tags, statuses): same as mask() for columns of tags and
+      statuses.
+    - select_tags(tags) and select_status(statuses): the subsets of the
+      given distinct values that pass the test.
+
+    Batch tests are evaluated once per distinct tag and status of the batch
+    (exact tags and status by set intersection, ellipsis tags by a range
+    search in the sorted distinct tags), then looked up for each message.
+
+    >>> oftype('C...').mask(messages)
+    [False, False, False, False, True, False, True]
+
+    Test functions are cached. Arguments are first canonicalized (order and
+    duplicates do not matter, tags covered by an ellipsis tag are dropped),
+    so that equivalent calls share the same function from a bounded LRU
+    cache of OFTYPE_CACHE_SIZE entries. oftype.cache_info() returns the
+    cache statistics and oftype.cache_clear() empties it.
+
+    >>> oftype(('AB...', 'A', 'A...')) is oftype('A...')
+    True
+    """
+
+    try:
+        return _cached_oftype(_canonical_tags(tag), _canonical_status(status))
+    except TypeError:
+        # unhashable status values, the predicate cannot be cached
+        return _build_oftype(_canonical_tags(tag), _to_tuple(status))
+
+
+def _build_oftype(ctags, cstatus):
     """
+    Builds the test function returned by oftype() from canonical arguments.
+    """
+    match_tag = _match_tag(ctags)
+    match_status = _match_status(cstatus)
 
-    mtags = tag
-    mstatus = status
+    def incompatible(bm):
+        etext = ("{} object to be tested against tags:{} status:{} is "
+                 "not compatible with the bus.BusMessage interface. "
+                 "Got type:{} object:{}"
+                 ).format('bus.oftype()',
+                          _describe_tags(ctags),
+                          cstatus,
+                          type(bm),
+                          bm)
 
-    match_tag = _match_tag(mtags)
-    match_status = _match_status(mstatus)
+        return TypeError(etext)
 
     def inner(bm):
         try:
             tag = bm.tag
             status = bm.status
         except AttributeError:
-            etext = ("{} object to be tested against tags:{} status:{} is "
-                     "not compatible with the bus.BusMessage interface. "
-                     "Got type:{} object:{}"
-                     ).format('bus.oftype()',
-                              mtags,
-                              mstatus,
-                              type(bm),
-                              bm)
-
-            raise TypeError(etext)
-
-        return match_tag(tag) and match_status(status)
+            raise incompatible(bm)
+
+        if match_tag is not None and not match_tag(tag):
+            return False
+        return match_status is None or match_status(status)
+
+    def select_tags(tags):
+        return _select_tags(ctags, tags)
+
+    def select_status(statuses):
+        return _select_status(cstatus, statuses)
+
+    def mask_columns(tags, statuses):
+        tags = list(tags)
+        statuses = list(statuses)
+        try:
+            ok_tags = select_tags(set(tags)).__contains__
+            ok_status = select_status(set(statuses)).__contains__
+        except TypeError:
+            # unhashable tags or status, tested one message at a time
+            ok_tags = match_tag or (lambda tag: True)
+            ok_status = match_status or (lambda status: True)
+
+        return [t and s for t, s in zip(map(ok_tags, tags),
+                                        map(ok_status, statuses))]
+
+    def mask(bms):
+        bms = list(bms)
+        try:
+            tags = [bm.tag for bm in bms]
+            statuses = [bm.status for bm in bms]
+        except AttributeError:
+            for bm in bms:
+                if not (hasattr(bm, 'tag') and hasattr(bm, 'status')):
+                    raise incompatible(bm)
+            raise
+
+        return mask_columns(tags, statuses)
+
+    def filter_many(bms):
+        bms = list(bms)
+        return [bm for bm, ok in zip(bms, mask(bms)) if ok]
+
+    inner.select_tags = select_tags
+    inner.select_status = select_status
+    inner.mask_columns = mask_columns
+    inner.mask = mask
+    inner.filter_many = filter_many
     return inner
 
 
+_cached_oftype = lru_cache(maxsize=OFTYPE_CACHE_SIZE)(_build_oftype)
+
+oftype.cache_info = _cached_oftype.cache_info
+oftype.cache_clear = _cached_oftype.cache_clear
+
+
 # -----------------------------------------------------------------------------
 def _to_tuple(x):
     if isinstance(x, Container) and not isinstance(x, str):
@@ -141,55 +317,169 @@ def _to_tuple(x):
 
 
 # -----------------------------------------------------------------------------
-def _match_tag(mtags):
-    if mtags is None:
-        return lambda tag: True
-
-    mtags = _to_tuple(mtags)
+def _split_tags(mtags):
+    """
+    Differentiates requested tags with ellipsis.
 
-    # differentiates requested tags with ellipsis
+    Returns a tuple (exact_mtags, startswith_mtags) of lists, the latter
+    holding the part of each ellipsis tag preceding the '...'.
+    """
     startswith_mtags = []
     exact_mtags = []
 
-    for tag in mtags:
+    for tag in _to_tuple(mtags):
         if tag.find('...') == -1:
             exact_mtags.append(tag)
         else:
             startswith_mtag = tag.split('...')[0]
             startswith_mtags.append(startswith_mtag)
 
-    def in_startswith_mtags(tag):
-        for mtag in startswith_mtags:
-            if tag.startswith(mtag):
-                return True
-        return False
+    return exact_mtags, startswith_mtags
+
+
+# -----------------------------------------------------------------------------
+def _canonical_tags(mtags):
+    """
+    Returns None or a tuple (exact_mtags, startswith_mtags) where exact_mtags
+    is a frozenset and startswith_mtags a sorted tuple of prefixes.
+
+    Prefixes starting with a shorter requested prefix are removed, as are
+    exact tags starting with a requested prefix, so that equivalent
+    arguments give equal results.
+    """
+    if mtags is None:
+        return None
+
+    exact_mtags, startswith_mtags = _split_tags(mtags)
+
+    prefixes = ()
+    for mtag in sorted(set(startswith_mtags), key=len):
+        if not mtag.startswith(prefixes):
+            prefixes += (mtag,)
+    prefixes = tuple(sorted(prefixes))
+
+    exact = frozenset(tag for tag in exact_mtags
+                      if not tag.startswith(prefixes))
 
-    return lambda tag: tag in exact_mtags or in_startswith_mtags(tag)
+    return exact, prefixes
 
 
 # -----------------------------------------------------------------------------
-def _match_status(mstatus):
+def _canonical_status(mstatus):
     if mstatus is None:
-        return lambda tag: True
+        return None
+    return frozenset(_to_tuple(mstatus))
+
+
+# -----------------------------------------------------------------------------
+def _describe_tags(ctags):
+    if ctags is None:
+        return None
+    exact, prefixes = ctags
+    return tuple(sorted(exact)) + tuple(p + '...' for p in prefixes)
 
-    exact_status = _to_tuple(mstatus)
 
-    return lambda sta: sta in exact_status
+# -----------------------------------------------------------------------------
+def _contains(values):
+    """
+    Returns the membership test of *values*, a set of exact tags or status.
+    Unhashable tested values are compared by equality, as in a tuple.
+    """
+    contains = values.__contains__
+
+    def inner(value):
+        try:
+            return contains(value)
+        except TypeError:
+            return any(value == v for v in values)
+    return inner
+
+
+# -----------------------------------------------------------------------------
+def _match_tag(ctags):
+    if ctags is None:
+        return None
+
+    exact, prefixes = ctags
+    in_exact = _contains(exact)
+
+    if not prefixes:
+        return in_exact
+
+    def startswith(tag):
+        # only str tags have prefixes
+        return isinstance(tag, str) and tag.startswith(prefixes)
+
+    if not exact:
+        return startswith
+    return lambda tag: in_exact(tag) or startswith(tag)
+
+
+# -----------------------------------------------------------------------------
+def _match_status(cstatus):
+    if cstatus is None:
+        return None
+    return _contains(cstatus)
+
+
+# -----------------------------------------------------------------------------
+def _select_tags(ctags, tags):
+    """
+    Returns the set of *tags* (distinct values) matching canonical *ctags*.
+    """
+    tags = set(tags)
+    if ctags is None:
+        return tags
+
+    exact, prefixes = ctags
+    selected = tags.intersection(exact)
+
+    if prefixes:
+        sorted_tags = sorted(tag for tag in tags if isinstance(tag, str))
+        for mtag in prefixes:
+            # tags starting with mtag are contiguous in sorted_tags
+            start = bisect_left(sorted_tags, mtag)
+            for tag in islice(sorted_tags, start, None):
+                if not tag.startswith(mtag):
+                    break
+                selected.add(tag)
+
+    return selected
+
+
+# -----------------------------------------------------------------------------
+def _select_status(cstatus, statuses):
+    """
+    Returns the set of *statuses* (distinct values) matching *cstatus*.
+    """
+    statuses = set(statuses)
+    if cstatus is None:
+        return statuses
+
+    return statuses.intersection(cstatus)
 
 
 # -----------------------------------------------------------------------------
 # -----------------------------------------------------------------------------
 def combine_seeds(*args):
     """Combines multiples seeds and returns a seeds map.
+
+    The sets of uids of each tag are united in one pass (see seeds.union),
+    which merges seeds.SeedSet bitmaps without intermediate sets.
     """
     seedss = args
-    result = pm()
+    vecs_by_tag = {}
 
     for seeds in seedss:
         if seeds is not None:
-            result = result.update_with(lambda vec, val: vec | val, seeds)
+            for tag, vec in seeds.items():
+                vecs = vecs_by_tag.get(tag)
+                if vecs is None:
+                    vecs_by_tag[tag] = [vec]
+                else:
+                    vecs.append(vec)
 
-    return result
+    return pmap({tag: union(vecs) for tag, vecs in vecs_by_tag.items()})
 
 
 # -----------------------------------------------------------------------------
@@ -206,11 +496,92 @@ def propagates_seeds():
     decorated function.
 
     Note: the decorated function must returns an rx.Observable of BusMessage.
+
+    The seeds of the latest READY message of each input stream are kept
+    and combined. Messages emitted by the decorated function are stamped
+    with this combination (combined with their own seeds, if any) at the
+    time they are emitted. When an input stream emits, only the tags of its
+    previous and new seeds are recombined.
+
+    >>> @propagates_seeds()
+    ... def add(a, b):
+    ...     return a.combine_latest(b, lambda x, y: ready('C', x.payload
+    ...                                                    + y.payload))
+    >>> c = add(stream_a, stream_b)
     """
-    def inner(*args, **kwargs):
-        pass
+    def decorator(func):
+
+        @wraps(func)
+        def inner(*streams):
+            combiner = _SeedsCombiner(len(streams))
+
+            def forward(index, stream):
+                return (stream
+                        .filter(_is_ready)
+                        .do_action(lambda bm: combiner.update(index, bm)))
+
+            ready_streams = [forward(index, stream)
+                             for index, stream in enumerate(streams)]
 
-    raise NotImplementedError
+            return func(*ready_streams).map(combiner.stamp)
 
+        return inner
 
+    return decorator
+
+
+def _is_ready(bm):
+    return bm.status == READY
+
+
+class _SeedsCombiner(object):
+    """
+    Keeps the latest seeds of each input stream and their combination.
+    """
 
+    def __init__(self, count):
+        self._latest = [pm()] * count
+        # tag -> indexes of the inputs whose latest seeds hold that tag
+        self._holders = {}
+        self._combined = pm()
+        self._lock = Lock()
+
+    @property
+    def combined(self):
+        return self._combined
+
+    def update(self, index, bm):
+        seeds = bm.seeds
+        if seeds is None:
+            seeds = pm()
+
+        with self._lock:
+            previous = self._latest[index]
+            if previous is seeds:
+                return
+            self._latest[index] = seeds
+
+            evolver = self._combined.evolver()
+            for tag in set(previous).union(seeds):
+                holders = self._holders.setdefault(tag, set())
+                if tag in seeds:
+                    holders.add(index)
+                else:
+                    holders.discard(index)
+
+                if not holders:
+                    del self._holders[tag]
+                    del evolver[tag]
+                    continue
+
+                latest = self._latest
+                evolver[tag] = union([latest[holder][tag]
+                                      for holder in holders])
+
+            self._combined = evolver.persistent()
+
+    def stamp(self, bm):
+        combined = self._combined
+        if bm.seeds:
+            combined = combine_seeds(bm.seeds, combined)
+        return bm._replace(seeds=combined)
@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 10:40:18 2026
+@author: Jérémie Fache
+"""
+
+import argparse
+import json
+import time
+from moebius.bus.messages import (READY, PROCESSING)
+
+# histograms have one bucket per power of 2 of microseconds, the last one
+# holding everything above 2**(N_BUCKETS - 2) us (about 35 minutes)
+N_BUCKETS = 33
+
+
+class Histogram(object):
+    """
+    Fixed-size histogram of durations with log2 buckets of microseconds.
+
+    Bucket i holds the durations d such that 2**(i-1) <= d < 2**i
+    microseconds (bucket 0 holds durations below 1 us).
+    """
+    __slots__ = ('buckets', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.buckets = [0] * N_BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        index = int(seconds * 1e6).bit_length()
+        if index >= N_BUCKETS:
+            index = N_BUCKETS - 1
+        self.buckets[index] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q):
+        """
+        Returns an upper bound of the *q* percentile (0 < q <= 100), in
+        seconds, or None if the histogram is empty.
+        """
+        if not self.count:
+            return None
+        rank = q / 100.0 * self.count
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank and index < N_BUCKETS - 1:
+                return min((1 << index) * 1e-6, self.max)
+        # the last bucket has no upper bound
+        return self.max
+
+    def snapshot(self):
+        return {'count': self.count,
+                'mean': self.total / self.count if self.count else None,
+                'p50': self.percentile(50),
+                'p90': self.percentile(90),
+                'p99': self.percentile(99),
+                'max': self.max,
+                'buckets': list(self.buckets)}
+
+
+# -----------------------------------------------------------------------------
+# -----------------------------------------------------------------------------
+class Probe(object):
+    """
+    Counts the messages going through a point of a stream, per tag and
+    status. Calling the probe with a message records it, so it can be
+    used with rx.Observable.do_action().
+    """
+    __slots__ = ('name', 'counts', 'start')
+
+    def __init__(self, name):
+        self.name = name
+        # tag -> status -> count, nested to avoid a key tuple per message
+        self.counts = {}
+        self.start = time.perf_counter()
+
+    def __call__(self, bm):
+        statuses = self.counts.get(bm.tag)
+        if statuses is None:
+            statuses = self.counts[bm.tag] = {}
+        statuses[bm.status] = statuses.get(bm.status, 0) + 1
+
+    def snapshot(self, now):
+        elapsed = now - self.start
+        counts = {tag: dict(statuses)
+                  for tag, statuses in self.counts.items()}
+        total = sum(sum(statuses.values()) for statuses in counts.values())
+        return {'elapsed': elapsed,
+                'total': total,
+                'rate': total / elapsed if elapsed > 0 else None,
+                'counts': counts}
+
+
+class StageTimer(object):
+    """
+    Measures the latencies of a stage from its input and output messages:
+
+    - ready_to_ready: from the latest READY input to each READY output.
+    - processing_to_ready: for each output tag, from the first PROCESSING
+      output following a READY output to the next READY output.
+    """
+    __slots__ = ('name', 'last_input_ready', 'processing_since',
+                 'ready_to_ready', 'processing_to_ready')
+
+    def __init__(self, name):
+        self.name = name
+        self.last_input_ready = None
+        self.processing_since = {}
+        self.ready_to_ready = Histogram()
+        self.processing_to_ready = Histogram()
+
+    def input(self, bm):
+        if bm.status == READY:
+            self.last_input_ready = time.perf_counter()
+
+    def output(self, bm):
+        status = bm.status
+        if status == PROCESSING:
+            if bm.tag not in self.processing_since:
+                self.processing_since[bm.tag] = time.perf_counter()
+        elif status == READY:
+            now = time.perf_counter()
+            if self.last_input_ready is not None:
+                self.ready_to_ready.record(now - self.last_input_ready)
+            since = self.processing_since.pop(bm.tag, None)
+            if since is not None:
+                self.processing_to_ready.record(now - since)
+
+    def snapshot(self):
+        return {'ready_to_ready': self.ready_to_ready.snapshot(),
+                'processing_to_ready': self.processing_to_ready.snapshot()}
+
+
+# -----------------------------------------------------------------------------
+# -----------------------------------------------------------------------------
+class Metrics(object):
+    """
+    Opt-in registry of probes and stage timers for Bus Message streams.
+
+    When the registry is disabled, instrument() and instrument_stage()
+    return their argument unchanged, so streams built while disabled have
+    no overhead at all. Enabling it only affects streams built afterwards.
+
+    >>> metrics = Metrics(enabled=True)
+    >>> source = metrics.instrument(source, 'source')
+    >>> stage = metrics.instrument_stage(ComputeStage(f, 'B'), 'compute B')
+    >>> metrics.snapshot()
+    >>> metrics.dump('stats.json')
+
+    `python -m moebius stats stats.json` prints a dumped snapshot.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.probes = {}
+        self.stages = {}
+
+    def probe(self, name):
+        probe = self.probes.get(name)
+        if probe is None:
+            probe = self.probes[name] = Probe(name)
+        return probe
+
+    def stage(self, name):
+        timer = self.stages.get(name)
+        if timer is None:
+            timer = self.stages[name] = StageTimer(name)
+        return timer
+
+    def instrument(self, observable, name):
+        """
+        Returns *observable* counting its messages in probe *name*.
+        """
+        if not self.enabled:
+            return observable
+        return observable.do_action(self.probe(name))
+
+    def instrument_stage(self, stage, name):
+        """
+        Returns the stage function *stage* (taking and returning an
+        rx.Observable) with its input and output timed by stage *name*, and
+        its output counted by probe *name*.
+        """
+        if not self.enabled:
+            return stage
+
+        timer = self.stage(name)
+        probe = self.probe(name)
+
+        def output(bm):
+            probe(bm)
+            timer.output(bm)
+
+        def instrumented(source):
+            return stage(source.do_action(timer.input)).do_action(output)
+
+        return instrumented
+
+    def snapshot(self):
+        now = time.perf_counter()
+        return {'probes': {name: probe.snapshot(now)
+                           for name, probe in self.probes.items()},
+                'stages': {name: timer.snapshot()
+                           for name, timer in self.stages.items()}}
+
+    def dump(self, path):
+        """
+        Saves a snapshot to a JSON file.
+        """
+        with open(path, 'w') as f:
+            json.dump(self.snapshot(), f, indent=2)
+
+    def reset(self):
+        self.probes.clear()
+        self.stages.clear()
+
+
+# default registry
+METRICS = Metrics()
+
+
+# -----------------------------------------------------------------------------
+# -----------------------------------------------------------------------------
+def _format_seconds(seconds):
+    if seconds is None:
+        return '-'
+    if seconds < 1e-3:
+        return '{:.1f}us'.format(seconds * 1e6)
+    if seconds < 1.0:
+        return '{:.1f}ms'.format(seconds * 1e3)
+    return '{:.2f}s'.format(seconds)
+
+
+def format_snapshot(snapshot):
+    """
+    Returns a snapshot as a human readable text.
+    """
+    lines = []
+    for name, probe in sorted(snapshot['probes'].items()):
+        rate = probe['rate']
+        lines.append('probe {}: {} messages, {} messages/s'.format(
+            name, probe['total'], '-' if rate is None else
+            '{:.1f}'.format(rate)))
+        for tag, statuses in sorted(probe['counts'].items(),
+                                    key=lambda item: -sum(item[1].values())):
+            for status, count in sorted(statuses.items()):
+                lines.append('    {:32s} {:12s} {:10d}'.format(
+                    tag, status, count))
+
+    for name, stage in sorted(snapshot['stages'].items()):
+        lines.append('stage {}:'.format(name))
+        for kind in ('ready_to_ready', 'processing_to_ready'):
+            hist = stage[kind]
+            lines.append('    {:20s} n={:<8d} mean={:>9s} p50={:>9s} '
+                         'p90={:>9s} p99={:>9s} max={:>9s}'.format(
+                             kind, hist['count'],
+                             _format_seconds(hist['mean']),
+                             _format_seconds(hist['p50']),
+                             _format_seconds(hist['p90']),
+                             _format_seconds(hist['p99']),
+                             _format_seconds(hist['max'])))
+    return '\n'.join(lines)
+
+
+def main(args=None):
+    """
+    Command line entry point of `python -m moebius stats`.
+    """
+    parser = argparse.ArgumentParser(
+        prog='moebius stats',
+        description='Prints a snapshot saved with Metrics.dump().')
+    parser.add_argument('path', help='JSON file written by Metrics.dump()')
+    options = parser.parse_args(args)
+
+    with open(options.path) as f:
+        print(format_snapshot(json.load(f)))
+    return 0
@@ -0,0 +1,313 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 14:06:37 2026
+@author: Jérémie Fache
+"""
+
+import math
+import sys
+from datetime import timedelta
+from threading import RLock
+import rx
+from rx.concurrency import timeout_scheduler
+from rx.disposables import (AnonymousDisposable, CompositeDisposable)
+from moebius.bus.messages import (READY, PROCESSING, oftype)
+
+
+def _fraction(payload):
+    """
+    Returns the ratio of a processing() payload as a float, or None if it
+    has no usable ratio.
+    """
+    try:
+        step, total = payload['ratio']
+        return step / total
+    except (KeyError, TypeError, ValueError, ZeroDivisionError):
+        return None
+
+
+def coalesce_processing(window=0.1, min_delta=None, scheduler=None):
+    """
+    Returns an operator (a function taking and returning an rx.Observable)
+    that coalesces the PROCESSING messages of each tag.
+
+    For each tag, the first PROCESSING message (after a READY one) and the
+    last one (ratio step == total) go straight through, as well as all the
+    other statuses. In between, a PROCESSING message is emitted when *window*
+    seconds have elapsed since the previous emitted one of the tag, or when
+    its ratio differs by at least *min_delta* (e.g. 0.01 for each percent)
+    from it. Otherwise it is kept until the end of the window, being replaced
+    by any newer one, and dropped if a READY message of the tag arrives
+    first. Pending messages are emitted when the source completes.
+
+    *window* or *min_delta* can be None to disable the corresponding rule.
+    Timers run on *scheduler* (rx timeout_scheduler by default).
+
+    >>> progress = coalesce_processing(window=0.05, min_delta=0.1)(source)
+    """
+    if window is None and min_delta is None:
+        raise ValueError('window and min_delta cannot both be None')
+
+    scheduler = scheduler or timeout_scheduler
+
+    def operator(source):
+        def subscribe(observer):
+            run = _CoalesceRun(window, min_delta, scheduler, observer)
+            subscription = source.subscribe(run)
+            return CompositeDisposable(subscription,
+                                       AnonymousDisposable(run.dispose))
+
+        return rx.Observable.create(subscribe)
+
+    return operator
+
+
+# -----------------------------------------------------------------------------
+class _TagState(object):
+    __slots__ = ('emitted_at', 'fraction', 'pending', 'timer')
+
+    def __init__(self, emitted_at, fraction):
+        self.emitted_at = emitted_at
+        self.fraction = fraction
+        self.pending = None
+        self.timer = None
+
+    def cancel_timer(self):
+        if self.timer is not None:
+            self.timer.dispose()
+            self.timer = None
+
+
+class _CoalesceRun(object):
+    """
+    Observer of the source of coalesce_processing() for one subscription.
+    """
+
+    def __init__(self, window, min_delta, scheduler, observer):
+        self.window = None if window is None else timedelta(seconds=window)
+        self.min_delta = min_delta
+        self.scheduler = scheduler
+        self.observer = observer
+        # reentrant: the observer may dispose the subscription while called
+        self.lock = RLock()
+        self.states = {}
+        self.stopped = False
+
+    def on_next(self, bm):
+        with self.lock:
+            if self.stopped:
+                return
+
+            if bm.status != PROCESSING:
+                state = self.states.pop(bm.tag, None)
+                if state is not None:
+                    state.cancel_timer()
+                self.observer.on_next(bm)
+                return
+
+            now = self.scheduler.now
+            fraction = _fraction(bm.payload)
+            state = self.states.get(bm.tag)
+
+            if state is None:
+                # first progress message of the tag
+                self.states[bm.tag] = _TagState(now, fraction)
+                self.observer.on_next(bm)
+                return
+
+            if fraction is not None and fraction >= 1.0:
+                # last progress message of the tag
+                state.cancel_timer()
+                del self.states[bm.tag]
+                self.observer.on_next(bm)
+                return
+
+            window = self.window
+            min_delta = self.min_delta
+            if ((window is not None and now - state.emitted_at >= window)
+                    or (min_delta is not None
+                        and fraction is not None
+                        and state.fraction is not None
+                        and abs(fraction - state.fraction) >= min_delta)):
+                self._emit(state, bm, now)
+                return
+
+            state.pending = bm
+            if state.timer is None and window is not None:
+                state.timer = self.scheduler.schedule_relative(
+                    state.emitted_at + window - now,
+                    lambda scheduler, _: self._flush(bm.tag, state))
+
+    def _emit(self, state, bm, now):
+        """
+        Emits a progress message of a tag. Called with the lock held.
+        """
+        state.cancel_timer()
+        state.pending = None
+        state.emitted_at = now
+        state.fraction = _fraction(bm.payload)
+        self.observer.on_next(bm)
+
+    def _flush(self, tag, state):
+        with self.lock:
+            if self.stopped or self.states.get(tag) is not state:
+                return
+            state.timer = None
+            if state.pending is not None:
+                self._emit(state, state.pending, self.scheduler.now)
+
+    def dispose(self):
+        with self.lock:
+            self.stopped = True
+            for state in self.states.values():
+                state.cancel_timer()
+            self.states.clear()
+
+    def on_error(self, error):
+        with self.lock:
+            if self.stopped:
+                return
+            self.stopped = True
+            for state in self.states.values():
+                state.cancel_timer()
+            self.observer.on_error(error)
+
+    def on_completed(self):
+        with self.lock:
+            if self.stopped:
+                return
+            self.stopped = True
+            for state in self.states.values():
+                state.cancel_timer()
+                if state.pending is not None:
+                    self.observer.on_next(state.pending)
+            self.observer.on_completed()
+
+
+# -----------------------------------------------------------------------------
+# -----------------------------------------------------------------------------
+class Deduplicate(object):
+    """
+    Operator (a function taking and returning an rx.Observable) dropping
+    the duplicates of Bus Messages, e.g. redelivered by an at-least-once
+    feed.
+
+    Two messages are duplicates when they have the same tag, status and
+    seeds (see BM.identify()); payloads are not compared. Only messages
+    matching *tag* and *status* (oftype() selectors) with non-empty seeds
+    are deduplicated, others go straight through.
+
+    Messages are remembered as fingerprints in two generations of at most
+    *max_messages* each: when the current generation is full, or older than
+    *window* seconds, it replaces the previous one, which is forgotten. A
+    message is thus remembered for at least *max_messages* messages (and
+    *window* seconds), and memory stays bounded whatever the traffic.
+    Fingerprints have just enough bits for a unique message to be taken
+    for a duplicate with probability at most *fp_rate*.
+
+    *dropped* and *passed* count the messages of all subscriptions. The
+    time is read from *scheduler* (rx timeout_scheduler by default).
+
+    >>> dedup = Deduplicate(max_messages=100000, window=60.0)
+    >>> source.let(dedup).subscribe(compute)
+    >>> dedup.dropped
+    """
+
+    def __init__(self, max_messages=10000, window=None, fp_rate=1e-9,
+                 tag=None, status=READY, scheduler=None):
+        if max_messages < 1:
+            raise ValueError('max_messages must be >= 1, got {}'.format(
+                max_messages))
+        if not 0.0 < fp_rate < 1.0:
+            raise ValueError('fp_rate must be in ]0, 1[, got {}'.format(
+                fp_rate))
+
+        self.max_messages = max_messages
+        self.window = window
+        self.fp_rate = fp_rate
+        self.test = oftype(tag, status)
+        self.scheduler = scheduler or timeout_scheduler
+        # a lookup is against at most 2 * max_messages fingerprints
+        self.bits = min(sys.hash_info.width, max(
+            1, math.ceil(math.log2(2 * max_messages / fp_rate))))
+        self.dropped = 0
+        self.passed = 0
+        self._lock = RLock()
+
+    def __call__(self, source):
+        def subscribe(observer):
+            run = _DedupRun(self, observer)
+            subscription = source.subscribe(run)
+            return CompositeDisposable(subscription,
+                                       AnonymousDisposable(run.dispose))
+
+        return rx.Observable.create(subscribe)
+
+
+class _DedupRun(object):
+    """
+    Observer of the source of a Deduplicate operator for one subscription.
+    """
+
+    def __init__(self, dedup, observer):
+        self.dedup = dedup
+        self.observer = observer
+        self.lock = dedup._lock
+        self.window = (None if dedup.window is None
+                       else timedelta(seconds=dedup.window))
+        self.mask = (1 << dedup.bits) - 1
+        self.current = set()
+        self.previous = set()
+        self.started = dedup.scheduler.now
+        self.stopped = False
+
+    def _rotate(self, now):
+        self.previous = self.current
+        self.current = set()
+        self.started = now
+
+    def on_next(self, bm):
+        dedup = self.dedup
+        with self.lock:
+            if self.stopped:
+                return
+
+            if bm.seeds and dedup.test(bm):
+                if self.window is not None:
+                    now = dedup.scheduler.now
+                    elapsed = now - self.started
+                    if elapsed >= self.window:
+                        self._rotate(now)
+                        if elapsed >= 2 * self.window:
+                            # the previous generation is too old as well
+                            self.previous = set()
+
+                fingerprint = hash((bm.tag, bm.status, bm.seeds)) & self.mask
+                if (fingerprint in self.current
+                        or fingerprint in self.previous):
+                    dedup.dropped += 1
+                    return
+
+                if len(self.current) >= dedup.max_messages:
+                    self._rotate(dedup.scheduler.now)
+                self.current.add(fingerprint)
+
+            dedup.passed += 1
+            self.observer.on_next(bm)
+
+    def dispose(self):
+        with self.lock:
+            self.stopped = True
+            self.current = self.previous = set()
+
+    def on_error(self, error):
+        with self.lock:
+            if not self.stopped:
+                self.stopped = True
+                self.observer.on_error(error)
+
+    def on_completed(self):
+        with self.lock:
+            if not self.stopped:
+                self.stopped = True
+                self.observer.on_completed()
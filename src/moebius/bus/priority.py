@@ -0,0 +1,287 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 09:34:16 2026
+@author: Jérémie Fache
+"""
+
+import heapq
+import time
+from collections import deque
+from threading import (Condition, Thread)
+import rx
+from rx.disposables import AnonymousDisposable
+from moebius.bus.messages import (READY, PROCESSING, oftype)
+
+# default rules: READY before anything else, PROCESSING last
+DEFAULT_RULES = ((None, READY, 0),
+                 (None, PROCESSING, 2))
+
+DEFAULT_PRIORITY = 1
+
+# maximum number of (tag, status) priorities kept by a PriorityBuffer
+PRIORITY_CACHE_SIZE = 4096
+
+
+class _TagQueue(object):
+    __slots__ = ('items', 'counts', 'version')
+
+    def __init__(self):
+        # (priority, seq, enqueue time, bm)
+        self.items = deque()
+        # priority -> number of queued messages
+        self.counts = {}
+        self.version = 0
+
+    def priority(self):
+        return min(self.counts)
+
+
+class PriorityBuffer(object):
+    """
+    Queue of Bus Messages ordered by priority, keeping the messages of a
+    same tag in order.
+
+    The priority of a message is given by the first of *rules* it matches,
+    a rule being a (tag, status, priority) tuple where tag and status are
+    oftype() selectors (ellipsis tags included) and lower priorities are
+    delivered first; messages matching no rule get *default_priority*.
+
+    Messages are queued per tag. A tag competes with the priority of its
+    most urgent queued message, so that a READY message queued behind
+    PROCESSING ones of its tag pulls them along (the tag order is never
+    broken). Between tags of the same priority, the oldest goes first.
+
+    Starvation protection: when the oldest queued message has waited more
+    than *max_delay* seconds, its tag is served first whatever its
+    priority.
+
+    >>> rules = (('ALERT...', None, -1),) + DEFAULT_RULES
+    >>> buffer = PriorityBuffer(rules)
+    >>> buffer.push(bm)
+    >>> buffer.pop()
+    """
+
+    def __init__(self, rules=DEFAULT_RULES, default_priority=DEFAULT_PRIORITY,
+                 max_delay=1.0, clock=time.perf_counter):
+        self.rules = [(oftype(tag, status), priority)
+                      for tag, status, priority in rules]
+        self.default_priority = default_priority
+        self.max_delay = max_delay
+        self.clock = clock
+
+        self._priorities = {}
+        self._tags = {}
+        self._seq = 0
+        self._size = 0
+        # lazy heaps of (priority, head seq, version, tag) and
+        # (head seq, version, tag), stale entries are skipped when popping
+        self._by_priority = []
+        self._by_age = []
+
+    def __len__(self):
+        return self._size
+
+    def priority(self, bm):
+        key = (bm.tag, bm.status)
+        priority = self._priorities.get(key)
+        if priority is None:
+            priority = self.default_priority
+            for predicate, rule_priority in self.rules:
+                if predicate(bm):
+                    priority = rule_priority
+                    break
+            if len(self._priorities) >= PRIORITY_CACHE_SIZE:
+                self._priorities.clear()
+            self._priorities[key] = priority
+        return priority
+
+    def _schedule(self, tag, queue):
+        queue.version += 1
+        if queue.items:
+            head_seq = queue.items[0][1]
+            heapq.heappush(self._by_priority,
+                           (queue.priority(), head_seq, queue.version, tag))
+            heapq.heappush(self._by_age, (head_seq, queue.version, tag))
+        else:
+            del self._tags[tag]
+
+    def push(self, bm):
+        priority = self.priority(bm)
+        queue = self._tags.get(bm.tag)
+        if queue is None:
+            queue = self._tags[bm.tag] = _TagQueue()
+
+        previous = queue.priority() if queue.items else None
+        queue.items.append((priority, self._seq, self.clock(), bm))
+        queue.counts[priority] = queue.counts.get(priority, 0) + 1
+        self._seq += 1
+        self._size += 1
+
+        # the entries of the tag only change with its head or its priority
+        if previous is None or priority < previous:
+            self._schedule(bm.tag, queue)
+
+    def _top(self, heap, version_index):
+        while heap:
+            entry = heap[0]
+            tag = entry[-1]
+            queue = self._tags.get(tag)
+            if queue is not None and queue.version == entry[version_index]:
+                return tag
+            heapq.heappop(heap)
+        return None
+
+    def pop(self):
+        """
+        Removes and returns the next message to deliver. Raises IndexError
+        if the buffer is empty.
+        """
+        if not self._size:
+            raise IndexError('pop from an empty PriorityBuffer')
+
+        tag = self._top(self._by_age, 1)
+        queue = self._tags[tag]
+        if self.clock() - queue.items[0][2] <= self.max_delay:
+            tag = self._top(self._by_priority, 2)
+            queue = self._tags[tag]
+
+        priority, _, _, bm = queue.items.popleft()
+        count = queue.counts[priority] - 1
+        if count:
+            queue.counts[priority] = count
+        else:
+            del queue.counts[priority]
+        self._size -= 1
+        self._schedule(tag, queue)
+        return bm
+
+
+# -----------------------------------------------------------------------------
+# -----------------------------------------------------------------------------
+class PriorityDelivery(object):
+    """
+    Delivery boundary between two stages, delivering the messages by
+    priority from a dedicated thread.
+
+    The boundary is a function taking an rx.Observable of Bus Messages and
+    returning an rx.Observable. Each subscription gets a PriorityBuffer
+    built with *rules*, *default_priority* and *max_delay*, filled by the
+    producer and drained by a thread calling the observer. With *maxsize*,
+    the producer waits while the buffer holds *maxsize* messages.
+
+    Completion and errors are delivered once the buffer is empty.
+
+    >>> delivery = PriorityDelivery(max_delay=0.5)
+    >>> source.let(delivery).subscribe(slow_subscriber)
+    """
+
+    def __init__(self, rules=DEFAULT_RULES, default_priority=DEFAULT_PRIORITY,
+                 max_delay=1.0, maxsize=None):
+        if maxsize is not None and maxsize < 1:
+            raise ValueError('maxsize must be >= 1, got {}'.format(maxsize))
+
+        self.rules = rules
+        self.default_priority = default_priority
+        self.max_delay = max_delay
+        self.maxsize = maxsize
+
+    def __call__(self, source):
+        def subscribe(observer):
+            run = _DeliveryRun(self, observer)
+            run.start()
+            subscription = source.subscribe(run)
+
+            def dispose():
+                subscription.dispose()
+                run.dispose()
+
+            return AnonymousDisposable(dispose)
+
+        return rx.Observable.create(subscribe)
+
+
+# terminal notifications, delivered after the messages
+_COMPLETED = object()
+
+
+class _Error(object):
+    __slots__ = ('error',)
+
+    def __init__(self, error):
+        self.error = error
+
+
+class _DeliveryRun(object):
+    """
+    Observer of the source of a PriorityDelivery for one subscription, and
+    consumer thread delivering the buffered messages.
+    """
+
+    def __init__(self, delivery, observer):
+        self.delivery = delivery
+        self.observer = observer
+        self.buffer = PriorityBuffer(delivery.rules,
+                                     delivery.default_priority,
+                                     delivery.max_delay)
+        self.condition = Condition()
+        self.terminal = None
+        self.stopped = False
+        self.thread = Thread(target=self._deliver, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def on_next(self, bm):
+        maxsize = self.delivery.maxsize
+        with self.condition:
+            while (maxsize is not None and len(self.buffer) >= maxsize
+                   and not self.stopped):
+                self.condition.wait()
+            if self.stopped or self.terminal is not None:
+                return
+            self.buffer.push(bm)
+            self.condition.notify_all()
+
+    def _terminate(self, terminal):
+        with self.condition:
+            if self.stopped or self.terminal is not None:
+                return
+            self.terminal = terminal
+            self.condition.notify_all()
+
+    def on_error(self, error):
+        self._terminate(_Error(error))
+
+    def on_completed(self):
+        self._terminate(_COMPLETED)
+
+    def dispose(self):
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
+
+    def _deliver(self):
+        condition = self.condition
+        buffer = self.buffer
+        while True:
+            with condition:
+                while (not buffer and self.terminal is None
+                       and not self.stopped):
+                    condition.wait()
+                if self.stopped:
+                    return
+                if not buffer:
+                    terminal = self.terminal
+                    self.stopped = True
+                    break
+
+                bm = buffer.pop()
+                # wakes up a blocked producer
+                condition.notify_all()
+
+            self.observer.on_next(bm)
+
+        if terminal is _COMPLETED:
+            self.observer.on_completed()
+        else:
+            self.observer.on_error(terminal.error)
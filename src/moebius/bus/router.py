@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 10:02:11 2026
+@author: Jérémie Fache
+"""
+
+from moebius.bus.messages import (_split_tags, _to_tuple)
+
+
+class _Entry(object):
+    """
+    Registrations attached to a tag (exact, prefix or any tag), indexed by
+    status.
+    """
+    __slots__ = ('any_status', 'by_status')
+
+    def __init__(self):
+        self.any_status = []
+        self.by_status = {}
+
+    def add(self, rid, mstatus):
+        if mstatus is None:
+            self.any_status.append(rid)
+            return
+
+        for status in _to_tuple(mstatus):
+            self.by_status.setdefault(status, []).append(rid)
+
+    def remove(self, rid, mstatus):
+        if mstatus is None:
+            self.any_status.remove(rid)
+            return
+
+        for status in _to_tuple(mstatus):
+            rids = self.by_status[status]
+            rids.remove(rid)
+            if not rids:
+                del self.by_status[status]
+
+    def __bool__(self):
+        return bool(self.any_status or self.by_status)
+
+    def collect(self, status, out):
+        out.extend(self.any_status)
+        rids = _lookup(self.by_status, status)
+        if rids:
+            out.extend(rids)
+
+
+def _lookup(mapping, key):
+    """
+    Returns mapping.get(*key*). Unhashable keys match nothing, as in
+    oftype().
+    """
+    try:
+        return mapping.get(key)
+    except TypeError:
+        return None
+
+
+class _Node(object):
+    """
+    Node of the prefix trie used for tags with ellipsis.
+    """
+    __slots__ = ('children', 'entry')
+
+    def __init__(self):
+        self.children = {}
+        self.entry = None
+
+
+# -----------------------------------------------------------------------------
+# -----------------------------------------------------------------------------
+class MessageRouter(object):
+    """
+    Dispatches Bus Messages to many handlers through a single index.
+
+    Each registration takes the same *tag* and *status* arguments as
+    messages.oftype() (None, single value or iterable, ellipsis for
+    'startswith' tags). Instead of testing every registered filter in turn,
+    the router looks up exact tags in a dict, walks a prefix trie along the
+    tag of the message for ellipsis tags and looks up the status in each
+    matching entry. Dispatching a message thus depends on the length of its
+    tag and on the number of matching handlers, not on the number of
+    registrations.
+
+    A handler registered with overlapping tags (e.g. ('ab...', 'abc')) is
+    called once per message. Handlers are called in registration order.
+
+    The router is callable and can directly be subscribed to an rx.Observable:
+
+    >>> router = MessageRouter()
+    >>> router.register(print, tag='A...', status='READY')
+    >>> rx.Observable.from_(messages).subscribe(router)
+    """
+
+    def __init__(self):
+        self._handlers = {}
+        # rid -> (status, exact tags, startswith tags), None for any tag
+        self._registrations = {}
+        self._next_rid = 0
+        self._any_tag = _Entry()
+        self._exact = {}
+        self._trie = _Node()
+
+    def __len__(self):
+        return len(self._handlers)
+
+    def register(self, handler, tag=None, status=None):
+        """
+        Registers *handler* for messages matching *tag* and *status*, with
+        oftype() semantics. Returns a registration id to be used with
+        unregister().
+        """
+        rid = self._next_rid
+        self._next_rid += 1
+        self._handlers[rid] = handler
+
+        if tag is None:
+            self._any_tag.add(rid, status)
+            self._registrations[rid] = (status, None, None)
+            return rid
+
+        exact_mtags, startswith_mtags = _split_tags(tag)
+        self._registrations[rid] = (status, exact_mtags, startswith_mtags)
+
+        for mtag in exact_mtags:
+            entry = self._exact.get(mtag)
+            if entry is None:
+                entry = self._exact[mtag] = _Entry()
+            entry.add(rid, status)
+
+        for mtag in startswith_mtags:
+            node = self._trie
+            for char in mtag:
+                child = node.children.get(char)
+                if child is None:
+                    child = node.children[char] = _Node()
+                node = child
+            if node.entry is None:
+                node.entry = _Entry()
+            node.entry.add(rid, status)
+
+        return rid
+
+    def unregister(self, rid):
+        """
+        Removes a registration, and the index entries and trie nodes left
+        empty, so that dispatching does not depend on past registrations.
+        """
+        del self._handlers[rid]
+        status, exact_mtags, startswith_mtags = self._registrations.pop(rid)
+
+        if exact_mtags is None:
+            self._any_tag.remove(rid, status)
+            return
+
+        for mtag in exact_mtags:
+            entry = self._exact[mtag]
+            entry.remove(rid, status)
+            if not entry:
+                del self._exact[mtag]
+
+        for mtag in startswith_mtags:
+            path = [self._trie]
+            for char in mtag:
+                path.append(path[-1].children[char])
+            node = path[-1]
+            node.entry.remove(rid, status)
+            if not node.entry:
+                node.entry = None
+            # prunes the nodes left without entry nor children, leaf first
+            for char, parent in zip(reversed(mtag), reversed(path[:-1])):
+                if node.entry is not None or node.children:
+                    break
+                del parent.children[char]
+                node = parent
+
+    def match(self, bm):
+        """
+        Returns the list of handlers matching the Bus Message *bm*.
+
+        Raises TypeError if *bm* does not implement the BusMessage interface,
+        as oftype() does.
+        """
+        try:
+            tag = bm.tag
+            status = bm.status
+        except AttributeError:
+            etext = ("{} object to be routed is not compatible with the "
+                     "bus.BusMessage interface. Got type:{} object:{}"
+                     ).format('bus.MessageRouter', type(bm), bm)
+
+            raise TypeError(etext)
+
+        rids = []
+        self._any_tag.collect(status, rids)
+
+        entry = _lookup(self._exact, tag)
+        if entry is not None:
+            entry.collect(status, rids)
+
+        # only str tags have prefixes, the empty one included
+        if isinstance(tag, str):
+            node = self._trie
+            if node.entry is not None:
+                node.entry.collect(status, rids)
+            children = node.children
+            for char in tag:
+                node = children.get(char)
+                if node is None:
+                    break
+                if node.entry is not None:
+                    node.entry.collect(status, rids)
+                children = node.children
+
+        if len(rids) > 1:
+            rids = sorted(set(rids))
+
+        handlers = self._handlers
+        return [handlers[rid] for rid in rids]
+
+    def dispatch(self, bm):
+        """
+        Calls every handler matching *bm* with *bm* as argument and returns
+        the number of called handlers.
+        """
+        handlers = self.match(bm)
+        for handler in handlers:
+            handler(bm)
+        return len(handlers)
+
+    __call__ = dispatch
@@ -0,0 +1,276 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 14:41:52 2026
+@author: Jérémie Fache
+"""
+
+from bisect import bisect_left
+from collections.abc import Set
+from threading import Lock
+from pyrsistent import pmap
+
+# codes per bitmap block of a seed set
+BLOCK_BITS = 10
+BLOCK_MASK = (1 << BLOCK_BITS) - 1
+# codes interned in the default table before it is replaced by a new one
+TABLE_SIZE = 1 << 20
+
+
+class UidTable(object):
+    """
+    Interns unique ids to consecutive integer codes.
+
+    A table only grows. Its memory is reclaimed with the last seed set
+    using it: tables can be created per pipeline (see seedset()), and the
+    default table is replaced every TABLE_SIZE uids (see default_table()).
+    """
+
+    def __init__(self):
+        self._codes = {}
+        self._uids = []
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._uids)
+
+    def code(self, uid):
+        """
+        Returns the code of *uid*, interning it if needed.
+        """
+        code = self._codes.get(uid)
+        if code is None:
+            with self._lock:
+                code = self._codes.get(uid)
+                if code is None:
+                    code = len(self._uids)
+                    self._uids.append(uid)
+                    self._codes[uid] = code
+        return code
+
+    def find(self, uid):
+        """
+        Returns the code of *uid*, or None if it has not been interned.
+        """
+        return self._codes.get(uid)
+
+    def uid(self, code):
+        return self._uids[code]
+
+    def seedset(self, *uids):
+        """
+        Returns a SeedSet of *uids* interned in this table.
+
+        Can be used as the *factory* argument of BusMessage.identify().
+        """
+        return SeedSet(uids, table=self)
+
+
+_default_table = UidTable()
+_default_lock = Lock()
+
+
+def default_table():
+    """
+    Returns the table of the seed sets created without table.
+
+    Once it holds TABLE_SIZE uids, the table is replaced by an empty one.
+    Seed sets keep their own table, which is freed when the last of them
+    is. Sets of different tables are united and compared through their
+    uids.
+    """
+    global _default_table
+    table = _default_table
+    if len(table) >= TABLE_SIZE:
+        with _default_lock:
+            if _default_table is table:
+                _default_table = UidTable()
+            table = _default_table
+    return table
+
+
+# -----------------------------------------------------------------------------
+# -----------------------------------------------------------------------------
+class SeedSet(Set):
+    """
+    Immutable set of unique ids stored as a compressed bitmap of interned
+    codes.
+
+    Codes are grouped in blocks of 2**BLOCK_BITS codes: the set holds the
+    sorted keys of its non-empty blocks and, for each of them, a python int
+    bitmap of its codes. The size of a set thus depends on the number and
+    spread of its uids, not on the size of the table, and unions of seed
+    sets are block-wise integer or-operations that do not allocate per uid.
+
+    Seed sets compare equal to sets holding the same uids and hash equal to
+    pyrsistent sets, so they can be mixed with them in seeds maps,
+    combine_seeds() and BusMessage equality.
+
+    >>> seeds = pm(A=seedset('uid0', 'uid1'))
+    >>> combine_seeds(seeds, pm(A=seedset('uid2')))
+    pmap({'A': seedset(['uid0', 'uid1', 'uid2'])})
+    """
+    __slots__ = ('_keys', '_words', '_table', '_hash')
+
+    def __init__(self, uids=(), table=None):
+        if table is None:
+            table = default_table()
+        blocks = {}
+        for uid in uids:
+            code = table.code(uid)
+            key = code >> BLOCK_BITS
+            blocks[key] = blocks.get(key, 0) | 1 << (code & BLOCK_MASK)
+
+        keys = sorted(blocks)
+        self._keys = tuple(keys)
+        self._words = tuple([blocks[key] for key in keys])
+        self._table = table
+        self._hash = None
+
+    @classmethod
+    def _from_blocks(cls, keys, words, table):
+        self = cls.__new__(cls)
+        self._keys = keys
+        self._words = words
+        self._table = table
+        self._hash = None
+        return self
+
+    @classmethod
+    def _from_iterable(cls, uids):
+        return cls(uids)
+
+    def codes(self):
+        """
+        Yields the interned codes of the uids, in increasing order.
+        """
+        for key, bits in zip(self._keys, self._words):
+            base = key << BLOCK_BITS
+            while bits:
+                low = bits & -bits
+                yield base + low.bit_length() - 1
+                bits ^= low
+
+    def __iter__(self):
+        uid = self._table.uid
+        for code in self.codes():
+            yield uid(code)
+
+    def __len__(self):
+        return sum([bits.bit_count() for bits in self._words])
+
+    def __contains__(self, uid):
+        code = self._table.find(uid)
+        if code is None:
+            return False
+        key = code >> BLOCK_BITS
+        keys = self._keys
+        index = bisect_left(keys, key)
+        if index == len(keys) or keys[index] != key:
+            return False
+        return bool(self._words[index] >> (code & BLOCK_MASK) & 1)
+
+    def _same_table(self, other):
+        return isinstance(other, SeedSet) and other._table is self._table
+
+    def __or__(self, other):
+        if self._same_table(other):
+            return union_all(self, other)
+        return Set.__or__(self, other)
+
+    __ror__ = __or__
+
+    def __eq__(self, other):
+        if self._same_table(other):
+            return self._keys == other._keys and self._words == other._words
+        return Set.__eq__(self, other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        if self._hash is None:
+            # same hash as a pyrsistent set holding the same uids
+            self._hash = hash(frozenset((uid, True) for uid in self))
+        return self._hash
+
+    def __reduce__(self):
+        # codes are only meaningful in this process: pickle the uids
+        return (seedset, tuple(self))
+
+    def __repr__(self):
+        return 'seedset({!r})'.format(list(self))
+
+
+# -----------------------------------------------------------------------------
+def seedset(*uids):
+    """
+    Returns a SeedSet of *uids*, interned in the default table.
+
+    Can be used as the *factory* argument of BusMessage.identify(). A
+    pipeline can rather intern its uids in its own table with
+    UidTable().seedset, so that they are freed with its messages.
+    """
+    return SeedSet(uids)
+
+
+# -----------------------------------------------------------------------------
+def union_all(*sets):
+    """
+    Returns the union of seed sets sharing the same table, in one pass.
+    """
+    table = sets[0]._table if sets else None
+    sets = [s for s in sets if s._keys]
+    if not sets:
+        return SeedSet(table=table)
+    if len(sets) == 1:
+        return sets[0]
+
+    first = sets[0]
+    keys = first._keys
+    if all(s._keys == keys for s in sets):
+        # usual case: uids of the same blocks
+        words = list(first._words)
+        for s in sets[1:]:
+            words = [a | b for a, b in zip(words, s._words)]
+        return SeedSet._from_blocks(keys, tuple(words), first._table)
+
+    blocks = {}
+    for s in sets:
+        for key, bits in zip(s._keys, s._words):
+            blocks[key] = blocks.get(key, 0) | bits
+    keys = sorted(blocks)
+    return SeedSet._from_blocks(tuple(keys),
+                                tuple([blocks[key] for key in keys]),
+                                first._table)
+
+
+# -----------------------------------------------------------------------------
+def union(vecs):
+    """
+    Returns the union of a sequence of seed values (SeedSet, pyrsistent sets
+    or any set implementing |). Seed sets sharing the same table are merged
+    in one pass.
+    """
+    if len(vecs) == 1:
+        return vecs[0]
+
+    first = vecs[0]
+    if isinstance(first, SeedSet):
+        table = first._table
+        if all(isinstance(vec, SeedSet) and vec._table is table
+               for vec in vecs):
+            return union_all(*vecs)
+
+    result = first
+    for vec in vecs[1:]:
+        result = result | vec
+    return result
+
+
+# -----------------------------------------------------------------------------
+def compact(seeds):
+    """
+    Returns a seeds map whose values are converted to SeedSets.
+    """
+    return pmap({tag: vec if isinstance(vec, SeedSet) else SeedSet(vec)
+                 for tag, vec in seeds.items()})
@@ -0,0 +1,376 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 13:08:52 2026
+@author: Jérémie Fache
+"""
+
+import argparse
+import importlib
+import multiprocessing
+import sys
+import threading
+import time
+import traceback
+import zlib
+from moebius.bus.messages import _split_tags
+from moebius.bus.router import MessageRouter
+
+# number of messages whose counters are flushed at once by a worker
+_COUNTS_BATCH = 64
+
+
+def shard_of(tag, n_shards, prefixes=()):
+    """
+    Returns the index of the shard owning *tag*.
+
+    Tags are hashed with crc32, which is stable across processes (unlike
+    hash() on str). A tag starting with one of *prefixes* (tags with
+    ellipsis, e.g. 'CAM...') is hashed as the prefix, so that all the tags
+    under a prefix are owned by the same shard. The longest prefix wins.
+    """
+    key = tag
+    for prefix in prefixes:
+        if tag.startswith(prefix):
+            key = prefix
+            break
+    return zlib.crc32(key.encode('utf-8')) % n_shards
+
+
+def _canonical_prefixes(prefixes):
+    """
+    Returns the prefixes of ellipsis tags, longest first.
+    """
+    exact, startswith = _split_tags(prefixes)
+    if exact:
+        raise ValueError('prefixes must be tags with ellipsis, got {}'.format(
+            ', '.join(exact)))
+    return tuple(sorted(set(startswith), key=len, reverse=True))
+
+
+def _load(path):
+    """
+    Returns the object named by 'package.module:name'.
+    """
+    module_name, _, name = path.partition(':')
+    if not name:
+        raise ValueError('expected package.module:name, got {!r}'.format(path))
+    return getattr(importlib.import_module(module_name), name)
+
+
+class HandlerError(object):
+    """
+    Error raised by a handler of a ShardedBus: the handled message, the
+    index of the worker (None for the parent process) and the formatted
+    traceback, as exceptions may not be picklable.
+    """
+    __slots__ = ('bm', 'worker', 'traceback')
+
+    def __init__(self, bm, worker, traceback):
+        self.bm = bm
+        self.worker = worker
+        self.traceback = traceback
+
+    def __reduce__(self):
+        return (HandlerError, (self.bm, self.worker, self.traceback))
+
+    def __repr__(self):
+        return 'HandlerError(worker={}, bm={!r})'.format(self.worker, self.bm)
+
+
+def _dispatch(router, bm, worker):
+    """
+    Calls the handlers matching *bm*, even if one of them raises. Returns
+    the list of the HandlerErrors.
+    """
+    errors = []
+    for handler in router.match(bm):
+        try:
+            handler(bm)
+        except Exception:
+            errors.append(HandlerError(bm, worker, traceback.format_exc()))
+    return errors
+
+
+# -----------------------------------------------------------------------------
+# -----------------------------------------------------------------------------
+class _Publisher(object):
+    """
+    Sends messages to their owner shard and to the parent process when they
+    match one of its subscriptions. One instance lives in each process.
+    """
+
+    def __init__(self, inboxes, prefixes, exports, outbox, pending):
+        self.inboxes = inboxes
+        self.prefixes = prefixes
+        self.outbox = outbox
+        self.pending = pending
+        self.exports = MessageRouter()
+        for tag, status in exports:
+            self.exports.register(None, tag, status)
+
+    def __call__(self, bm):
+        exported = bool(self.exports.match(bm))
+        # counts the deliveries to come, decremented once they are handled
+        with self.pending.get_lock():
+            self.pending.value += 2 if exported else 1
+        shard = shard_of(bm.tag, len(self.inboxes), self.prefixes)
+        self.inboxes[shard].put(bm)
+        if exported:
+            self.outbox.put(bm)
+
+
+def _run_worker(index, setup, publisher, counts):
+    router = MessageRouter()
+    setup(router, publisher, index)
+
+    inbox = publisher.inboxes[index]
+    pending = publisher.pending
+    done = 0
+    while True:
+        bm = inbox.get()
+        if bm is None:
+            break
+        errors = _dispatch(router, bm, index)
+        done += 1
+        # decremented after the handlers published their own messages and
+        # once the errors to report are counted
+        with pending.get_lock():
+            pending.value += len(errors) - 1
+        for error in errors:
+            publisher.outbox.put(error)
+        if done == _COUNTS_BATCH:
+            with counts.get_lock():
+                counts[index] += done
+            done = 0
+
+    with counts.get_lock():
+        counts[index] += done
+
+
+class ShardedBus(object):
+    """
+    Bus partitioning Bus Messages by tag across worker processes.
+
+    Each message is dispatched in the worker owning its tag (see shard_of(),
+    *prefixes* being tags with ellipsis whose tags stay together), so the
+    messages of a tag published by a process are handled in order, by a
+    single worker.
+
+    Every worker calls setup(router, publish, index) with its own
+    MessageRouter, where it registers its handlers; they are called for the
+    messages of the tags owned by the worker. publish(bm) sends a message
+    to the worker owning its tag, wherever it runs, so a handler subscribed
+    to a tag owned by another shard receives it transparently. *setup* must
+    be picklable (a module-level function).
+
+    subscribe() registers handlers in the parent process, before start();
+    the messages matching them are also forwarded to the parent, where the
+    handlers are called from a receiver thread.
+
+    A handler raising an exception does not stop the bus: a HandlerError is
+    appended to *errors* in the parent process, and passed to *on_error*
+    if given (from the receiver thread). wait() raises RuntimeError if a
+    worker process exited, e.g. because *setup* raised.
+
+    >>> with ShardedBus(setup, workers=8, prefixes=('CAM...',)) as bus:
+    ...     bus.subscribe(print, 'RESULT...', READY)
+    ...     bus.start()
+    ...     bus.publish(ready('CAM1', frame))
+    ...     bus.wait()
+    """
+
+    def __init__(self, setup, workers=None, prefixes=(), context=None,
+                 on_error=None):
+        self.setup = setup
+        self.on_error = on_error
+        self.errors = []
+        self.workers = workers or multiprocessing.cpu_count()
+        self.prefixes = _canonical_prefixes(prefixes)
+        self._context = context or multiprocessing.get_context()
+        self._router = MessageRouter()
+        self._exports = []
+        self._processes = []
+        self._publisher = None
+        self._receiver = None
+        self._counts = None
+
+    def subscribe(self, handler, tag=None, status=None):
+        """
+        Registers *handler* in the parent process for the messages matching
+        *tag* and *status* (oftype() selectors).
+        """
+        if self._processes:
+            raise RuntimeError('subscribe() must be called before start()')
+        self._exports.append((tag, status))
+        return self._router.register(handler, tag, status)
+
+    def shard_of(self, tag):
+        return shard_of(tag, self.workers, self.prefixes)
+
+    def start(self):
+        if self._processes:
+            raise RuntimeError('the bus is already started')
+
+        context = self._context
+        inboxes = [context.Queue() for _ in range(self.workers)]
+        outbox = context.Queue()
+        pending = context.Value('q', 0)
+        self._counts = context.Array('q', self.workers)
+        self._publisher = _Publisher(inboxes, self.prefixes, self._exports,
+                                     outbox, pending)
+
+        for index in range(self.workers):
+            process = context.Process(target=_run_worker,
+                                      args=(index, self.setup,
+                                            self._publisher, self._counts),
+                                      daemon=True)
+            process.start()
+            self._processes.append(process)
+
+        self._receiver = threading.Thread(target=self._receive, daemon=True)
+        self._receiver.start()
+
+    def _receive(self):
+        outbox = self._publisher.outbox
+        pending = self._publisher.pending
+        while True:
+            bm = outbox.get()
+            if bm is None:
+                return
+            if isinstance(bm, HandlerError):
+                errors = [bm]
+            else:
+                errors = _dispatch(self._router, bm, None)
+            for error in errors:
+                self.errors.append(error)
+                if self.on_error is not None:
+                    try:
+                        self.on_error(error)
+                    except Exception:
+                        traceback.print_exc()
+            with pending.get_lock():
+                pending.value -= 1
+
+    def publish(self, bm):
+        """
+        Publishes *bm* from the parent process.
+        """
+        self._publisher(bm)
+
+    def wait(self, timeout=None, interval=0.001):
+        """
+        Waits until every published message has been handled, by the
+        workers and by the subscribers of the parent process. Returns False
+        if *timeout* expired before.
+
+        Raises RuntimeError if a worker process is no longer alive, as its
+        messages will never be handled.
+        """
+        pending = self._publisher.pending
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while pending.value:
+            self._check_workers()
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(interval)
+        return True
+
+    def _check_workers(self):
+        for index, process in enumerate(self._processes):
+            if not process.is_alive():
+                raise RuntimeError('worker {} exited with code {}'.format(
+                    index, process.exitcode))
+
+    @property
+    def counts(self):
+        """
+        Numbers of messages handled by each worker (updated by batches while
+        running, exact after stop()).
+        """
+        return list(self._counts) if self._counts is not None else []
+
+    def stop(self, timeout=None):
+        """
+        Stops the workers once every published message has been handled
+        (see wait()), so that no message published by a handler is sent to
+        a stopped worker. *timeout* bounds the wait, then the join of each
+        worker.
+        """
+        if not self._processes:
+            return
+
+        try:
+            self.wait(timeout)
+        except RuntimeError:
+            # a worker exited: its messages are lost, the others stop
+            pass
+        for inbox in self._publisher.inboxes:
+            inbox.put(None)
+        for process in self._processes:
+            process.join(timeout)
+        self._processes = []
+
+        self._publisher.outbox.put(None)
+        self._receiver.join(timeout)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+# -----------------------------------------------------------------------------
+# -----------------------------------------------------------------------------
+def main(args=None):
+    """
+    Command line entry point of `python -m moebius shard`.
+    """
+    parser = argparse.ArgumentParser(
+        prog='moebius shard',
+        description='Runs a pipeline on a bus sharded by tag across worker '
+        'processes.')
+    parser.add_argument('setup', metavar='MODULE:SETUP',
+                        help='function called by each worker with '
+                        '(router, publish, index)')
+    parser.add_argument('-w', '--workers', type=int,
+                        default=multiprocessing.cpu_count(),
+                        help='number of worker processes (default: number '
+                        'of CPUs)')
+    parser.add_argument('-p', '--prefix', action='append', default=[],
+                        metavar='TAG...',
+                        help='tags starting with this prefix are owned by '
+                        'the same worker (repeatable)')
+    parser.add_argument('-s', '--source', metavar='MODULE:SOURCE',
+                        help='function returning the messages published '
+                        'by the main process')
+    options = parser.parse_args(args)
+
+    if options.workers < 1:
+        parser.error('--workers must be >= 1')
+
+    setup = _load(options.setup)
+    source = _load(options.source) if options.source else None
+
+    start = time.perf_counter()
+    with ShardedBus(setup, options.workers, options.prefix) as bus:
+        bus.start()
+        try:
+            if source is not None:
+                for bm in source():
+                    bus.publish(bm)
+            bus.wait()
+        except RuntimeError as error:
+            print('error: {}'.format(error), file=sys.stderr)
+            return 1
+    duration = time.perf_counter() - start
+
+    for error in bus.errors:
+        print('handler error on {!r} in worker {}:\n{}'.format(
+            error.bm, error.worker, error.traceback), file=sys.stderr)
+
+    total = sum(bus.counts)
+    for index, count in enumerate(bus.counts):
+        print('worker {:3d}: {:10d} messages'.format(index, count))
+    print('total: {} messages in {:.3f} s'.format(total, duration))
+    return 1 if bus.errors else 0
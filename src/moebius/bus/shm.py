@@ -0,0 +1,314 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 16:45:03 2026
+@author: Jérémie Fache
+"""
+
+import multiprocessing
+import queue
+import time
+from collections import (deque, namedtuple)
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# slots start on multiples of ALIGNMENT bytes
+ALIGNMENT = 64
+
+
+class RingFull(Exception):
+    """
+    Raised when a payload does not fit in the free space of a SharedRing.
+    """
+
+
+# payload of an envelope message: the payload bytes are in the slot of the
+# shared memory *name*, with *dtype* and *shape* for numpy arrays (None
+# otherwise)
+PayloadHandle = namedtuple('PayloadHandle',
+                           'name, slot, offset, length, dtype, shape')
+
+
+def _as_bytes(payload):
+    """
+    Returns the payload as a flat memoryview of bytes, with its numpy dtype
+    and shape (None for other buffers).
+    """
+    if numpy is not None and isinstance(payload, numpy.ndarray):
+        array = numpy.ascontiguousarray(payload)
+        return (memoryview(array).cast('B'), array.dtype.str,
+                array.shape)
+    view = memoryview(payload)
+    if not view.c_contiguous:
+        raise ValueError('payload buffer must be C-contiguous')
+    return view.cast('B'), None, None
+
+
+def _array(view, handle):
+    if numpy is None:
+        raise RuntimeError('numpy is required to view payloads as arrays')
+    if handle.dtype is None:
+        return numpy.frombuffer(view, numpy.uint8)
+    return numpy.frombuffer(view, handle.dtype).reshape(handle.shape)
+
+
+def _slot_size(length):
+    """
+    Returns the bytes taken in a ring by a payload of *length* bytes.
+    """
+    return max(ALIGNMENT, -(-length // ALIGNMENT) * ALIGNMENT)
+
+
+class _Slot(object):
+    __slots__ = ('id', 'offset', 'end', 'refs')
+
+    def __init__(self, slot_id, offset, end, refs):
+        self.id = slot_id
+        self.offset = offset
+        self.end = end
+        self.refs = refs
+
+
+# -----------------------------------------------------------------------------
+# -----------------------------------------------------------------------------
+class SharedRing(object):
+    """
+    Ring buffer of payloads in a multiprocessing.shared_memory block, owned
+    by the producer process.
+
+    put() copies a payload in the next free slot and returns its handle.
+    Each slot has a reference count, the number of subscribers that must
+    acknowledge it; acknowledgements come back through *acks*, a
+    multiprocessing queue of slot ids. Slots are reclaimed in allocation
+    order, once the oldest one is released.
+    """
+
+    def __init__(self, size, context=None):
+        context = context or multiprocessing.get_context()
+        self.size = size
+        self.shm = shared_memory.SharedMemory(create=True, size=size)
+        self.acks = context.Queue()
+        self._slots = deque()
+        self._by_id = {}
+        self._next_id = 0
+        self._head = 0
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def __len__(self):
+        """
+        Number of slots not reclaimed yet.
+        """
+        return len(self._slots)
+
+    def _allocate(self, size):
+        if not self._slots:
+            self._head = 0
+            return 0 if size <= self.size else None
+
+        head = self._head
+        tail = self._slots[0].offset
+        if head > tail:
+            if head + size <= self.size:
+                return head
+            if size <= tail:
+                return 0
+        elif head < tail and head + size <= tail:
+            return head
+        return None
+
+    def put(self, payload, refs, timeout=0.0):
+        """
+        Copies *payload* (a bytes-like object or a numpy array) to a slot
+        released after *refs* acknowledgements and returns its handle.
+
+        Waits up to *timeout* seconds (None for ever) for acknowledgements
+        when the ring is full, then raises RingFull.
+        """
+        view, dtype, shape = _as_bytes(payload)
+        length = len(view)
+        size = _slot_size(length)
+        if size > self.size:
+            # would never fit, even in an empty ring
+            raise RingFull('payload of {} bytes ({} aligned) larger than the '
+                           'ring ({} bytes)'.format(length, size, self.size))
+
+        self.collect()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        offset = self._allocate(size)
+        while offset is None:
+            remaining = (None if deadline is None
+                         else deadline - time.monotonic())
+            if remaining is not None and remaining <= 0:
+                raise RingFull('no room for {} bytes ({} slots in use)'
+                               .format(length, len(self._slots)))
+            self.collect(block=True, timeout=remaining)
+            offset = self._allocate(size)
+
+        end = offset + size
+        self.shm.buf[offset:offset + length] = view
+        slot = _Slot(self._next_id, offset, end, refs)
+        self._next_id += 1
+        self._head = end
+        self._slots.append(slot)
+        self._by_id[slot.id] = slot
+        if refs <= 0:
+            self.release(slot.id)
+
+        return PayloadHandle(self.name, slot.id, offset, length, dtype, shape)
+
+    def release(self, slot_id):
+        """
+        Decrements the reference count of a slot and reclaims the released
+        slots at the start of the ring.
+        """
+        slot = self._by_id.get(slot_id)
+        if slot is None:
+            return
+        slot.refs -= 1
+
+        slots = self._slots
+        while slots and slots[0].refs <= 0:
+            del self._by_id[slots.popleft().id]
+
+    def collect(self, block=False, timeout=None):
+        """
+        Applies the acknowledgements received so far. With *block* True,
+        waits up to *timeout* seconds for at least one of them.
+        """
+        acks = self.acks
+        try:
+            if block:
+                self.release(acks.get(timeout=timeout))
+            while True:
+                self.release(acks.get_nowait())
+        except queue.Empty:
+            pass
+
+    def close(self):
+        """
+        Releases the shared memory block. The subscribers must have closed
+        their views.
+        """
+        self.shm.close()
+        self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# -----------------------------------------------------------------------------
+# -----------------------------------------------------------------------------
+class ShmPublisher(object):
+    """
+    Sends Bus Messages to subscriber processes, their bytes-like or numpy
+    payloads going through a SharedRing.
+
+    Only a small envelope (the message with a PayloadHandle payload) is put
+    in the control queue of each subscriber; other payloads are sent as is.
+
+    >>> ring = SharedRing(256 * 1024 * 1024)
+    >>> publisher = ShmPublisher(ring, [queue1, queue2])
+    >>> publisher.publish(ready('FRAME', frame))
+    """
+
+    def __init__(self, ring, queues, timeout=None):
+        self.ring = ring
+        self.queues = queues
+        self.timeout = timeout
+
+    def publish(self, bm):
+        payload = bm.payload
+        if (isinstance(payload, (bytes, bytearray, memoryview))
+                or (numpy is not None and isinstance(payload, numpy.ndarray))):
+            handle = self.ring.put(payload, len(self.queues), self.timeout)
+            bm = bm._replace(payload=handle)
+        for control in self.queues:
+            control.put(bm)
+
+    __call__ = publish
+
+
+class ShmSubscriber(object):
+    """
+    Receives the messages of a ShmPublisher from its control queue, in
+    another process.
+
+    The payloads of envelopes are read in place: payload(bm) gives a
+    memoryview (or a numpy array for numpy payloads) on the shared memory,
+    valid until the slot is acknowledged.
+
+    >>> subscriber = ShmSubscriber(queue1, ring.acks)
+    >>> bm = subscriber.get()
+    >>> with subscriber.payload(bm) as frame:
+    ...     process(frame)
+    """
+
+    def __init__(self, control, acks):
+        self.control = control
+        self.acks = acks
+        self._blocks = {}
+
+    def get(self, timeout=None):
+        return self.control.get(timeout=timeout)
+
+    def _block(self, name):
+        block = self._blocks.get(name)
+        if block is None:
+            block = self._blocks[name] = shared_memory.SharedMemory(name=name)
+        return block
+
+    def view(self, handle):
+        """
+        Returns a memoryview on the bytes of the payload.
+        """
+        buf = self._block(handle.name).buf
+        return buf[handle.offset:handle.offset + handle.length]
+
+    def array(self, handle):
+        """
+        Returns a numpy array sharing the memory of the payload.
+        """
+        return _array(self.view(handle), handle)
+
+    def ack(self, handle):
+        """
+        Tells the publisher that this subscriber is done with the payload.
+        """
+        self.acks.put(handle.slot)
+
+    @contextmanager
+    def payload(self, bm):
+        """
+        Context manager giving the payload of *bm*, read in place for
+        envelopes, and acknowledging it on exit.
+        """
+        handle = bm.payload
+        if not isinstance(handle, PayloadHandle):
+            yield handle
+            return
+
+        view = self.view(handle)
+        try:
+            yield view if handle.dtype is None else _array(view, handle)
+        finally:
+            try:
+                view.release()
+            except BufferError:
+                # still exported to a numpy array
+                pass
+            self.ack(handle)
+
+    def close(self):
+        for block in self._blocks.values():
+            block.close()
+        self._blocks.clear()
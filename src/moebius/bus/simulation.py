@@ -0,0 +1,523 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Oct 22 14:10:39 2026
+@author: Jérémie Fache
+"""
+
+import bisect
+import heapq
+import random
+import time
+from collections import (OrderedDict, deque)
+from collections.abc import Mapping
+from datetime import (datetime, timedelta)
+import rx
+from rx.concurrency.virtualtimescheduler import VirtualTimeScheduler
+from rx.disposables import (AnonymousDisposable, CompositeDisposable)
+from moebius.bus.messages import (ready, processing)
+from moebius.bus.metrics import _format_seconds
+
+_EPOCH = datetime.fromtimestamp(0)
+
+
+def _microseconds(seconds):
+    return int(round(seconds * 1e6))
+
+
+class _ScheduleQueue(object):
+    """
+    Queue of the scheduled items of a VirtualScheduler, by due time then
+    scheduling order, compared as tuples rather than by the rich
+    comparisons of ScheduledItem.
+    """
+
+    def __init__(self):
+        self.items = []
+        self.count = 0
+        self.last = None
+
+    def __len__(self):
+        return len(self.items)
+
+    def enqueue(self, item):
+        last = self.last
+        self.last = None
+        if last is not None and last[2] is item:
+            # put back by advance_to(), not due yet: keeps its turn
+            heapq.heappush(self.items, last)
+            return
+        heapq.heappush(self.items, (item.duetime, self.count, item))
+        self.count += 1
+
+    def dequeue(self):
+        self.last = heapq.heappop(self.items)
+        return self.last[2]
+
+
+class VirtualScheduler(VirtualTimeScheduler):
+    """
+    Virtual time scheduler with a clock in microseconds.
+
+    Unlike rx.testing.TestScheduler (millisecond ticks, actions never run
+    at the current tick), sub-millisecond delays are kept and actions
+    scheduled for the same time run in the order they were scheduled, so
+    that a run only depends on what is scheduled. Integers given to rx
+    operators are milliseconds, as for the other rx schedulers.
+
+    >>> scheduler = VirtualScheduler()
+    >>> scheduler.schedule_relative(timedelta(microseconds=250), action)
+    >>> scheduler.start()
+    """
+
+    def __init__(self):
+        super(VirtualScheduler, self).__init__(0)
+        self.queue = _ScheduleQueue()
+
+    @property
+    def seconds(self):
+        """
+        Current virtual time, in seconds.
+        """
+        return self.clock * 1e-6
+
+    @staticmethod
+    def add(absolute, relative):
+        return absolute + relative
+
+    def to_relative(self, timespan):
+        """
+        Converts a datetime, timedelta or milliseconds to microseconds.
+        """
+        if isinstance(timespan, datetime):
+            timespan = timespan - _EPOCH
+        if isinstance(timespan, timedelta):
+            return (timespan.days * 86400 + timespan.seconds) * 1000000 \
+                + timespan.microseconds
+        return int(round(timespan * 1000))
+
+    def to_datetime(self, duetime):
+        if isinstance(duetime, datetime):
+            return duetime
+        if isinstance(duetime, timedelta):
+            return _EPOCH + duetime
+        return _EPOCH + timedelta(microseconds=duetime)
+
+    def schedule_absolute(self, duetime, action, state=None):
+        if not isinstance(duetime, int):
+            duetime = self.to_relative(duetime)
+        return super(VirtualScheduler, self).schedule_absolute(
+            duetime, action, state)
+
+    def run_until(self, seconds):
+        """
+        Runs the actions due up to *seconds* of virtual time.
+        """
+        self.advance_to(_microseconds(seconds))
+
+
+# -----------------------------------------------------------------------------
+# -----------------------------------------------------------------------------
+class LoadGenerator(object):
+    """
+    Deterministic synthetic traffic of Bus Messages.
+
+    Jobs arrive as a Poisson process of *rate* jobs per second, each for a
+    tag drawn from *tags*: a sequence of equally likely tags, or a mapping
+    of tags to their weights. A job is identified by a uid ('TAG#n') and
+    emits *steps* PROCESSING messages spread over *job_time* seconds, then
+    a READY message whose payload is its index.
+
+    Bursts: every *burst_period* seconds, the rate is multiplied by
+    *burst_factor* during *burst_duration* seconds.
+
+    The same *seed* always gives the same messages at the same times.
+
+    >>> load = LoadGenerator({'CAM1': 3, 'CAM2': 1}, rate=500, steps=10,
+    ...                      job_time=0.02, burst_period=1.0,
+    ...                      burst_duration=0.1, burst_factor=5)
+    >>> load.events(10.0)[:2]
+    """
+
+    def __init__(self, tags, rate, steps=0, job_time=0.0, burst_period=None,
+                 burst_duration=0.0, burst_factor=1.0, seed=0):
+        if rate <= 0:
+            raise ValueError('rate must be > 0, got {}'.format(rate))
+        if isinstance(tags, Mapping):
+            self.tags = list(tags)
+            weights = [tags[tag] for tag in self.tags]
+        else:
+            self.tags = list(tags)
+            weights = [1] * len(self.tags)
+        if not self.tags:
+            raise ValueError('no tags')
+
+        total = float(sum(weights))
+        self._cumulative = []
+        cumulated = 0.0
+        for weight in weights:
+            cumulated += weight / total
+            self._cumulative.append(cumulated)
+
+        self.rate = rate
+        self.steps = steps
+        self.job_time = job_time
+        self.burst_period = burst_period
+        self.burst_duration = burst_duration
+        self.burst_factor = burst_factor
+        self.seed = seed
+
+    def rate_at(self, t):
+        """
+        Arrival rate of the jobs at *t* seconds.
+        """
+        if (self.burst_period is not None
+                and t % self.burst_period < self.burst_duration):
+            return self.rate * self.burst_factor
+        return self.rate
+
+    def arrivals(self, duration):
+        """
+        Yields the (time, tag) of the jobs arriving before *duration*
+        seconds.
+        """
+        rnd = random.Random(self.seed)
+        max_rate = self.rate * max(1.0, self.burst_factor)
+        cumulative = self._cumulative
+        last = len(cumulative) - 1
+        t = 0.0
+        while True:
+            # thinning of a process at the maximum rate
+            t += rnd.expovariate(max_rate)
+            if t >= duration:
+                return
+            accept = rnd.random() * max_rate < self.rate_at(t)
+            index = bisect.bisect_left(cumulative, rnd.random())
+            if accept:
+                yield t, self.tags[min(index, last)]
+
+    def events(self, duration):
+        """
+        Returns the list of (time, bm) of the messages of the jobs arriving
+        before *duration* seconds, by time.
+        """
+        steps = self.steps
+        job_time = self.job_time
+        heap = []
+        counts = {}
+        for index, (t, tag) in enumerate(self.arrivals(duration)):
+            count = counts.get(tag, 0)
+            counts[tag] = count + 1
+            seeds = ready(tag).identify('{}#{}'.format(tag, count)).seeds
+            # (time, job, order in the job, bm) keeps the order of a job
+            for step in range(1, steps + 1):
+                heapq.heappush(heap, (t + job_time * step / steps, index,
+                                      step, processing(tag, (step, steps),
+                                                       seeds=seeds)))
+            heapq.heappush(heap, (t + job_time, index, steps + 1,
+                                  ready(tag, index, seeds=seeds)))
+
+        return [(t, bm) for t, _, _, bm in
+                (heapq.heappop(heap) for _ in range(len(heap)))]
+
+
+# -----------------------------------------------------------------------------
+# -----------------------------------------------------------------------------
+class _StageStats(object):
+    __slots__ = ('received', 'emitted', 'dropped', 'depth', 'max_depth',
+                 'area', 'changed_at', 'latencies')
+
+    def __init__(self):
+        self.received = 0
+        self.emitted = 0
+        self.dropped = 0
+        self.depth = 0
+        self.max_depth = 0
+        # integral of the depth over virtual time, for the mean depth
+        self.area = 0.0
+        self.changed_at = 0.0
+        self.latencies = []
+
+    def set_depth(self, depth, now):
+        self.area += self.depth * (now - self.changed_at)
+        self.changed_at = now
+        self.depth = depth
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+
+def _percentile(ordered, q):
+    """
+    Nearest-rank *q* percentile of a sorted list, or None if empty.
+    """
+    if not ordered:
+        return None
+    rank = max(1, int(-(-q * len(ordered) // 100)))
+    return ordered[rank - 1]
+
+
+class Simulation(object):
+    """
+    Runs pipelines of rx operators in virtual time, faster than real time
+    and deterministically.
+
+    source() turns a LoadGenerator into an rx.Observable emitting its
+    messages at their virtual times. stage() returns an operator that
+    models the cost of a stage: each message occupies one of *workers*
+    servers for service_time seconds of virtual time (a number, or a
+    function of the message) and is then passed to *handler*. Other
+    operators taking a scheduler (coalesce_processing(), Deduplicate, ...)
+    must be given the scheduler of the simulation.
+
+    run() runs the scheduler and returns the report of the stages:
+    received, emitted and dropped messages, throughput (emitted messages
+    per virtual second), maximum and time-averaged queue depth, and
+    latency percentiles (time from arrival in the stage to emission).
+
+    >>> sim = Simulation()
+    >>> load = LoadGenerator(['A', 'B'], rate=1000, seed=1)
+    >>> (sim.source(load, duration=60.0)
+    ...  .let(sim.stage('decode', 0.0004))
+    ...  .let(sim.stage('fft', 0.0008, workers=2, maxsize=100))
+    ...  .subscribe())
+    >>> print(format_report(sim.run()))
+    """
+
+    def __init__(self):
+        self.scheduler = VirtualScheduler()
+        self.stages = OrderedDict()
+        self.wall_time = 0.0
+
+    @property
+    def now(self):
+        return self.scheduler.seconds
+
+    def source(self, generator, duration):
+        """
+        Returns an rx.Observable emitting the messages of *generator* for
+        *duration* seconds of virtual time, then completing.
+        """
+        events = generator.events(duration)
+        scheduler = self.scheduler
+        end = _microseconds(duration)
+
+        def subscribe(observer):
+            # one pending action at a time, for the messages due next
+            state = {'index': 0, 'stopped': False}
+
+            def emit(_, __):
+                index = state['index']
+                due = _microseconds(events[index][0])
+                while (index < len(events) and not state['stopped']
+                       and _microseconds(events[index][0]) == due):
+                    observer.on_next(events[index][1])
+                    index += 1
+                state['index'] = index
+                schedule_next()
+
+            def complete(_, __):
+                if not state['stopped']:
+                    observer.on_completed()
+
+            def schedule_next():
+                if state['stopped']:
+                    return
+                index = state['index']
+                if index < len(events):
+                    scheduler.schedule_absolute(
+                        _microseconds(events[index][0]), emit)
+                else:
+                    scheduler.schedule_absolute(end, complete)
+
+            def dispose():
+                state['stopped'] = True
+
+            schedule_next()
+            return AnonymousDisposable(dispose)
+
+        return rx.Observable.create(subscribe)
+
+    def stage(self, name, service_time=0.0, handler=None, workers=1,
+              maxsize=None):
+        """
+        Returns the operator of a stage named *name*. *handler* takes a
+        message and returns the message to emit, a list of messages, or
+        None; without handler, messages are emitted as is. With *maxsize*,
+        messages arriving when *maxsize* messages are waiting are dropped.
+        """
+        if name in self.stages:
+            raise ValueError('stage {!r} already exists'.format(name))
+        stats = self.stages[name] = _StageStats()
+
+        def operator(source):
+            def subscribe(observer):
+                run = _StageRun(self, stats, service_time, handler, workers,
+                                maxsize, observer)
+                subscription = source.subscribe(run)
+                return CompositeDisposable(subscription,
+                                           AnonymousDisposable(run.dispose))
+
+            return rx.Observable.create(subscribe)
+
+        return operator
+
+    def run(self, until=None):
+        """
+        Runs the scheduled actions, all of them or up to *until* seconds of
+        virtual time, and returns the report.
+        """
+        start = time.perf_counter()
+        if until is None:
+            self.scheduler.start()
+        else:
+            self.scheduler.run_until(until)
+        self.wall_time += time.perf_counter() - start
+        return self.report()
+
+    def report(self):
+        """
+        Returns the counters of the stages as a dict (see format_report()).
+        """
+        now = self.now
+        stages = OrderedDict()
+        for name, stats in self.stages.items():
+            latencies = sorted(stats.latencies)
+            area = stats.area + stats.depth * (now - stats.changed_at)
+            stages[name] = {
+                'received': stats.received,
+                'emitted': stats.emitted,
+                'dropped': stats.dropped,
+                'throughput': stats.emitted / now if now else None,
+                'max_depth': stats.max_depth,
+                'mean_depth': area / now if now else None,
+                'latency': {
+                    'count': len(latencies),
+                    'mean': (sum(latencies) / len(latencies)
+                             if latencies else None),
+                    'p50': _percentile(latencies, 50),
+                    'p90': _percentile(latencies, 90),
+                    'p99': _percentile(latencies, 99),
+                    'max': latencies[-1] if latencies else None}}
+
+        return {'duration': now,
+                'wall_time': self.wall_time,
+                'stages': stages}
+
+
+class _StageRun(object):
+    """
+    Observer of the source of a simulated stage for one subscription.
+    Everything runs on the virtual scheduler, hence without lock.
+    """
+
+    def __init__(self, simulation, stats, service_time, handler, workers,
+                 maxsize, observer):
+        self.simulation = simulation
+        self.scheduler = simulation.scheduler
+        self.stats = stats
+        self.service_time = service_time
+        self.handler = handler
+        self.workers = workers
+        self.maxsize = maxsize
+        self.observer = observer
+        # (arrival time, bm)
+        self.waiting = deque()
+        self.busy = 0
+        self.completed = False
+        self.stopped = False
+
+    def on_next(self, bm):
+        if self.stopped:
+            return
+        stats = self.stats
+        now = self.simulation.now
+        stats.received += 1
+        if self.maxsize is not None and len(self.waiting) >= self.maxsize:
+            stats.dropped += 1
+            return
+        self.waiting.append((now, bm))
+        stats.set_depth(len(self.waiting), now)
+        self._serve()
+
+    def _serve(self):
+        waiting = self.waiting
+        while waiting and self.busy < self.workers:
+            arrival, bm = waiting.popleft()
+            self.stats.set_depth(len(waiting), self.simulation.now)
+            self.busy += 1
+            cost = self.service_time
+            if callable(cost):
+                cost = cost(bm)
+            self.scheduler.schedule_relative(
+                timedelta(seconds=cost),
+                lambda _, item: self._done(*item), (arrival, bm))
+
+    def _done(self, arrival, bm):
+        if self.stopped:
+            return
+        self.busy -= 1
+        stats = self.stats
+
+        outputs = bm if self.handler is None else self.handler(bm)
+        if outputs is not None:
+            if not isinstance(outputs, list):
+                outputs = [outputs]
+            stats.latencies.append(self.simulation.now - arrival)
+            for output in outputs:
+                stats.emitted += 1
+                self.observer.on_next(output)
+
+        self._serve()
+        self._complete_if_idle()
+
+    def _complete_if_idle(self):
+        if self.completed and not self.busy and not self.waiting:
+            self.stopped = True
+            self.observer.on_completed()
+
+    def on_error(self, error):
+        if not self.stopped:
+            self.stopped = True
+            self.observer.on_error(error)
+
+    def on_completed(self):
+        if not self.stopped:
+            self.completed = True
+            self._complete_if_idle()
+
+    def dispose(self):
+        self.stopped = True
+        self.waiting.clear()
+
+
+# -----------------------------------------------------------------------------
+def format_report(report):
+    """
+    Returns a report of Simulation.run() as a human readable text.
+    """
+    duration = report['duration']
+    wall_time = report['wall_time']
+    lines = ['{} of virtual time in {} ({})'.format(
+        _format_seconds(duration), _format_seconds(wall_time),
+        'x{:.0f}'.format(duration / wall_time) if wall_time else '-')]
+    for name, stage in report['stages'].items():
+        latency = stage['latency']
+        throughput = stage['throughput']
+        mean_depth = stage['mean_depth']
+        lines.append('stage {}: {} in, {} out, {} dropped, {} messages/s, '
+                     'depth max={} mean={}'.format(
+                         name, stage['received'], stage['emitted'],
+                         stage['dropped'],
+                         '-' if throughput is None else
+                         '{:.1f}'.format(throughput),
+                         stage['max_depth'],
+                         '-' if mean_depth is None else
+                         '{:.2f}'.format(mean_depth)))
+        lines.append('    latency n={:<8d} mean={:>9s} p50={:>9s} '
+                     'p90={:>9s} p99={:>9s} max={:>9s}'.format(
+                         latency['count'],
+                         _format_seconds(latency['mean']),
+                         _format_seconds(latency['p50']),
+                         _format_seconds(latency['p90']),
+                         _format_seconds(latency['p99']),
+                         _format_seconds(latency['max'])))
+    return '\n'.join(lines)
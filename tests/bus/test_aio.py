@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 17:30:22 2026
+@author: Jérémie Fache
+"""
+
+import asyncio
+import threading
+import pytest
+import rx
+from moebius.bus import messages
+from moebius.bus.aio import (AsyncStream, AsyncSubject, merge,
+                             from_observable, to_observable)
+
+
+def from_list(items):
+    async def iterate():
+        for item in items:
+            await asyncio.sleep(0)
+            yield item
+    return AsyncStream(iterate)
+
+
+# -----------------------------------------------------------------------------
+def test_filter_map_scan():
+    bms = [messages.ready('A', 1),
+           messages.processing('A', ratio=(1, 2)),
+           messages.ready('AB', 2),
+           messages.ready('B', 3)]
+
+    stream = (from_list(bms)
+              .filter(messages.oftype('A...', messages.READY))
+              .map(lambda bm: bm.payload)
+              .scan(lambda acc, x: acc + x, seed=0))
+
+    assert(asyncio.run(stream.to_list()) == [1, 3])
+
+
+# -----------------------------------------------------------------------------
+def test_merge():
+    merged = merge(from_list([1, 2, 3]), from_list(['a', 'b']))
+    items = asyncio.run(merged.to_list())
+
+    assert(sorted(items, key=str) == [1, 2, 3, 'a', 'b'])
+    assert([i for i in items if isinstance(i, int)] == [1, 2, 3])
+
+
+# -----------------------------------------------------------------------------
+def test_merge_forwards_errors():
+    async def failing():
+        yield 1
+        raise ValueError('failure')
+
+    merged = from_list([1, 2]).merge(AsyncStream(failing))
+    with pytest.raises(ValueError):
+        asyncio.run(merged.to_list())
+
+
+# -----------------------------------------------------------------------------
+def test_subject_broadcasts_to_all_subscribers():
+    async def main():
+        subject = AsyncSubject()
+        first = []
+        second = []
+        tasks = [subject.subscribe(first.append),
+                 subject.filter(lambda x: x % 2).subscribe(second.append)]
+        await asyncio.sleep(0)
+
+        for i in range(5):
+            subject.on_next(i)
+        subject.on_completed()
+        await asyncio.gather(*tasks)
+        return first, second
+
+    first, second = asyncio.run(main())
+    assert(first == [0, 1, 2, 3, 4])
+    assert(second == [1, 3])
+
+
+# -----------------------------------------------------------------------------
+def test_subject_error():
+    async def main():
+        subject = AsyncSubject()
+        errors = []
+        task = subject.subscribe(on_error=errors.append)
+        await asyncio.sleep(0)
+        subject.on_error(ValueError('failure'))
+        await task
+        return errors
+
+    errors = asyncio.run(main())
+    assert(isinstance(errors[0], ValueError))
+
+
+# -----------------------------------------------------------------------------
+def test_from_observable_with_items_from_another_thread():
+    subject = rx.subjects.Subject()
+
+    def produce():
+        for i in range(100):
+            subject.on_next(i)
+        subject.on_completed()
+
+    async def main():
+        stream = from_observable(subject)
+        iterator = stream.__aiter__()
+        thread = threading.Thread(target=produce)
+        thread.start()
+        items = [item async for item in iterator]
+        thread.join()
+        return items
+
+    assert(asyncio.run(main()) == list(range(100)))
+
+
+# -----------------------------------------------------------------------------
+def test_to_observable():
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever)
+    thread.start()
+    try:
+        received = []
+        done = threading.Event()
+        to_observable(from_list([1, 2, 3]), loop).subscribe(
+            received.append, on_completed=done.set)
+        assert(done.wait(5.0))
+        assert(received == [1, 2, 3])
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 12:55:14 2026
+@author: Jérémie Fache
+"""
+
+import pytest
+from pyrsistent import (m as pm, s as ps, freeze)
+from moebius.bus import messages
+from moebius.bus.batch import (MessageBatch, MessageView)
+
+
+def create_messages():
+    seeds_a = freeze({'root': ps('id#0')})
+    seeds_b = freeze({'root': ps('id#1'), 'other': ps('id#2')})
+    return [messages.ready('A', payload=0, seeds=seeds_a),
+            messages.processing('A', ratio=(1, 2), seeds=seeds_a),
+            messages.ready('B', payload=[1, 2], seeds=seeds_b),
+            messages.ready('AB', payload=None, seeds=pm()),
+            messages.BusMessage('C', 'FOO', 'payload', {'unhashable': 0}),
+            ]
+
+
+# -----------------------------------------------------------------------------
+def test_lossless_round_trip():
+    bms = create_messages()
+    batch = MessageBatch.from_messages(bms)
+
+    assert(len(batch) == len(bms))
+    assert(batch.to_messages() == bms)
+    assert(MessageBatch.from_messages([]).to_messages() == [])
+
+
+# -----------------------------------------------------------------------------
+def test_tags_statuses_and_seeds_are_interned():
+    seeds = [freeze({'root': ps('id#0')}) for _ in range(3)]
+    bms = [messages.ready('A', payload=i, seeds=seeds[i]) for i in range(3)]
+    batch = MessageBatch.from_messages(bms * 100)
+
+    assert(batch.tag_table == ('A',))
+    assert(batch.status_table == (messages.READY,))
+    assert(len(batch.seeds_table) == 1)
+    assert(batch.tag_codes.itemsize == 1)
+
+
+# -----------------------------------------------------------------------------
+def test_code_arrays_widen_with_table_size():
+    bms = [messages.ready('tag{}'.format(i)) for i in range(300)]
+    batch = MessageBatch.from_messages(bms)
+
+    assert(batch.tag_codes.itemsize == 2)
+    assert(batch.to_messages() == bms)
+
+
+# -----------------------------------------------------------------------------
+def test_views_implement_bus_message_interface():
+    bms = create_messages()
+    batch = MessageBatch.from_messages(bms)
+
+    for view, bm in zip(batch, bms):
+        assert(isinstance(view, MessageView))
+        assert(view.tag == bm.tag)
+        assert(view.status == bm.status)
+        assert(view.payload is bm.payload)
+        assert(view.seeds == bm.seeds)
+        assert(view.to_message() == bm)
+
+    assert(batch[-1].to_message() == bms[-1])
+    with pytest.raises(IndexError):
+        batch[len(bms)]
+
+    filt = messages.oftype('A...', messages.READY)
+    assert([filt(view) for view in batch] == [filt(bm) for bm in bms])
+
+
+# -----------------------------------------------------------------------------
+def test_mask_and_filter():
+    bms = create_messages()
+    batch = MessageBatch.from_messages(bms)
+    filt = messages.oftype('A...', messages.READY)
+
+    assert(batch.mask(filt) == [True, False, False, True, False])
+
+    filtered = batch.filter(filt)
+    assert(filtered.to_messages() == [bms[0], bms[3]])
+    assert(filtered.tag_table is batch.tag_table)
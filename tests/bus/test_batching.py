@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 17:58:30 2026
+@author: Jérémie Fache
+"""
+
+import time
+import pytest
+import rx
+from rx.subjects import Subject
+from rx.testing import TestScheduler
+from pyrsistent import (s as ps, freeze)
+from moebius.bus import messages
+from moebius.bus.batching import BatchStage
+
+
+def create_run(stage):
+    source = Subject()
+    results = []
+    errors = []
+    completed = []
+    stage(source).subscribe(results.append, errors.append,
+                            lambda: completed.append(True))
+    return source, results, errors, completed
+
+
+class BatchSquare(object):
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, payloads):
+        self.calls.append(list(payloads))
+        return [x * x for x in payloads]
+
+
+# -----------------------------------------------------------------------------
+def test_batches_up_to_max_size_with_input_seeds():
+    handler = BatchSquare()
+    stage = BatchStage(handler, 'OUT', max_size=3, target_latency=None,
+                       scheduler=TestScheduler())
+    bms = [messages.ready('IN', payload=i,
+                          seeds=freeze({'IN': ps('id{}'.format(i))}))
+           for i in range(7)]
+    source, results, _, completed = create_run(stage)
+
+    for bm in bms[:6]:
+        source.on_next(bm)
+    source.on_next(messages.processing('IN', ratio=(1, 2)))
+    assert(handler.calls == [[0, 1, 2], [3, 4, 5]])
+
+    source.on_next(bms[6])
+    source.on_completed()
+    assert(handler.calls[-1] == [6])
+    assert(results == [messages.ready('OUT', i * i, seeds=bm.seeds)
+                       for i, bm in enumerate(bms)])
+    assert(completed == [True])
+
+
+# -----------------------------------------------------------------------------
+def test_max_wait():
+    handler = BatchSquare()
+    scheduler = TestScheduler()
+    stage = BatchStage(handler, 'OUT', max_size=10, max_wait=0.5,
+                       target_latency=None, scheduler=scheduler)
+    source, results, _, _ = create_run(stage)
+
+    source.on_next(messages.ready('IN', payload=1))
+    scheduler.advance_to(200)
+    source.on_next(messages.ready('IN', payload=2))
+    assert(handler.calls == [])
+
+    scheduler.advance_to(600)
+    assert(handler.calls == [[1, 2]])
+    assert([bm.payload for bm in results] == [1, 4])
+
+
+# -----------------------------------------------------------------------------
+def test_buffers_per_selector():
+    handler = BatchSquare()
+    stage = BatchStage(handler, 'OUT', max_size=2, target_latency=None,
+                       selectors=[messages.oftype('A...'),
+                                  messages.oftype('B')],
+                       scheduler=TestScheduler())
+    source, results, _, _ = create_run(stage)
+
+    for tag, payload in (('A1', 1), ('B', 2), ('C', 3), ('A2', 4), ('B', 5)):
+        source.on_next(messages.ready(tag, payload=payload))
+
+    assert(handler.calls == [[1, 4], [2, 5]])
+
+
+# -----------------------------------------------------------------------------
+def test_batch_size_adapts_to_handler_latency():
+    def handler(payloads):
+        time.sleep(0.001 * len(payloads))
+        return payloads
+
+    stage = BatchStage(handler, 'OUT', max_size=1000, target_latency=0.02)
+    rx.Observable.from_([messages.ready('IN', payload=i)
+                         for i in range(1000)]).let(stage).subscribe()
+
+    assert(5 <= stage.batch_size <= 20)
+
+
+# -----------------------------------------------------------------------------
+def test_handler_errors_are_forwarded():
+    stage = BatchStage(lambda payloads: payloads[:-1], 'OUT', max_size=2,
+                       scheduler=TestScheduler())
+    source, results, errors, _ = create_run(stage)
+    source.on_next(messages.ready('IN', payload=1))
+    source.on_next(messages.ready('IN', payload=2))
+
+    assert(results == [])
+    assert(isinstance(errors[0], ValueError))
+
+
+# -----------------------------------------------------------------------------
+def test_max_size_must_be_positive():
+    with pytest.raises(ValueError):
+        BatchStage(list, 'OUT', max_size=0)
+
+
+# -----------------------------------------------------------------------------
+def test_batch_size_with_constant_time_handler():
+    calls = []
+
+    def handler(payloads):
+        calls.append(len(payloads))
+        time.sleep(0.02)
+        return payloads
+
+    stage = BatchStage(handler, 'OUT', max_size=100, target_latency=0.01)
+    rx.Observable.from_([messages.ready('IN', payload=i)
+                         for i in range(400)]).let(stage).subscribe()
+
+    # a single halving until the fixed cost is known, then the latency
+    # target cannot be met: batches stay as large as possible
+    assert(len(calls) == 5)
+    assert(calls[0] == calls[2] == calls[3] == 100)
+    assert(stage.batch_size == 100)
+    assert(stage.fixed_cost == pytest.approx(0.02, rel=0.5))
+
+
+# -----------------------------------------------------------------------------
+def test_batch_size_with_fixed_and_item_costs():
+    def handler(payloads):
+        time.sleep(0.005 + 0.0005 * len(payloads))
+        return payloads
+
+    stage = BatchStage(handler, 'OUT', max_size=1000, target_latency=0.02)
+    rx.Observable.from_([messages.ready('IN', payload=i)
+                         for i in range(2000)]).let(stage).subscribe()
+
+    # (0.02 - 0.005) / 0.0005
+    assert(20 <= stage.batch_size <= 40)
+
+
+# -----------------------------------------------------------------------------
+def test_batch_size_recovers_after_a_quiet_period():
+    stage = BatchStage(list, 'OUT', max_size=100, target_latency=0.01)
+    # quiet: single messages flushed by the timer
+    for _ in range(10):
+        stage._observe(1, 0.002, full=False)
+    assert(stage.batch_size == 100)
+
+    # single-message batches flushed when full
+    for _ in range(10):
+        stage._observe(1, 0.002)
+    assert(stage.batch_size > 1)
+
+    # load: mostly fixed cost
+    for _ in range(50):
+        n = stage.batch_size
+        stage._observe(n, 0.002 + 1e-5 * n)
+    assert(stage.fixed_cost == pytest.approx(0.002, rel=0.01))
+    assert(stage.item_cost == pytest.approx(1e-5, rel=0.01))
+    assert(stage.batch_size == 100)
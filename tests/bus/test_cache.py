@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Oct 21 10:02:19 2026
+@author: Jérémie Fache
+"""
+
+import operator
+import os
+import subprocess
+import sys
+import threading
+from functools import partial
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from pyrsistent import (s as ps, freeze)
+from moebius.bus import messages
+from moebius.bus.cache import (ResultCache, cache_key, handler_identity)
+from moebius.bus.compute import ComputeStage
+from bus.test_compute import run
+
+
+class CountingSquare(object):
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, x):
+        self.calls += 1
+        return x * x
+
+
+# -----------------------------------------------------------------------------
+def test_cache_key_is_stable_across_processes():
+    seeds = freeze({'root': ps(*('uid{}'.format(i) for i in range(20)))})
+    payload = {'b': [1, 2.5, None], 'a': ('x', b'y', True)}
+    key = cache_key(CountingSquare, payload, seeds)
+
+    code = ('from pyrsistent import (s as ps, freeze);'
+            'from moebius.bus.cache import cache_key;'
+            'from bus.test_cache import CountingSquare;'
+            "seeds = freeze({'root': ps(*('uid{}'.format(i) "
+            "for i in range(20)))});"
+            "payload = {'a': ('x', b'y', True), 'b': [1, 2.5, None]};"
+            'print(cache_key(CountingSquare, payload, seeds))')
+    for hash_seed in ('1', '2'):
+        output = subprocess.check_output(
+            [sys.executable, '-c', code],
+            env=dict(os.environ, PYTHONHASHSEED=hash_seed,
+                     PYTHONPATH=os.pathsep.join(sys.path)),
+            universal_newlines=True)
+        assert(output.strip() == key)
+
+    assert(cache_key(CountingSquare, payload, freeze({})) != key)
+    assert(cache_key(CountingSquare, 1, seeds) != cache_key(CountingSquare,
+                                                            1.0, seeds))
+
+
+# -----------------------------------------------------------------------------
+def test_cache_key_tells_handlers_of_the_same_name_apart():
+    assert(cache_key(lambda x: x * 2, 1, {}) != cache_key(lambda x: x + 1, 1,
+                                                         {}))
+    assert(cache_key(lambda x: x * 2, 1, {}) == cache_key(lambda x: x * 2, 1,
+                                                         {}))
+    assert(cache_key(partial(operator.mul, 2), 1, {})
+           != cache_key(partial(operator.add, 1), 1, {}))
+    assert(cache_key(partial(operator.mul, 2), 1, {})
+           != cache_key(partial(operator.mul, 3), 1, {}))
+
+    def scale(factor):
+        return lambda x: x * factor
+
+    assert(handler_identity(scale(2)) != handler_identity(scale(3)))
+    assert(handler_identity(scale(2)) == handler_identity(scale(2)))
+    # state of callable objects and bound methods
+    used = CountingSquare()
+    used.calls = 1
+    assert(handler_identity(used) != handler_identity(CountingSquare()))
+    assert(handler_identity(used.__call__)
+           != handler_identity(CountingSquare().__call__))
+
+
+# -----------------------------------------------------------------------------
+def test_unidentifiable_handler_needs_cache_version():
+    lock = threading.Lock()
+
+    def locked(x):
+        with lock:
+            return x
+
+    with pytest.raises(TypeError):
+        handler_identity(locked)
+    with pytest.raises(TypeError):
+        ComputeStage(locked, 'OUT', cache=ResultCache())
+
+    locked.cache_version = 2
+    assert(handler_identity(locked).endswith('locked@2'))
+
+
+# -----------------------------------------------------------------------------
+def test_lru_eviction_by_size():
+    cache = ResultCache(max_bytes=300)
+    for i in range(3):
+        cache.put('key{}'.format(i), b'x' * 80)
+    assert(cache.get('key0') == b'x' * 80)
+
+    cache.put('key3', b'x' * 80)
+    assert(cache.evictions == 1)
+    assert(cache.get('key1') is None)
+    assert(cache.get('key0') == b'x' * 80)
+    assert(cache.nbytes <= 300)
+
+    # results larger than the cache are not kept in memory
+    cache.put('big', b'x' * 1000)
+    assert(cache.get('big') is None)
+    assert((cache.hits, cache.misses) == (2, 2))
+
+
+# -----------------------------------------------------------------------------
+def test_disk_tier(tmp_path):
+    cache = ResultCache(max_bytes=100, directory=str(tmp_path))
+    cache.put('key0', [1, 2, 3])
+    cache.put('key1', b'x' * 200)
+
+    cache = ResultCache(directory=str(tmp_path))
+    assert(cache.get('key0') == [1, 2, 3])
+    assert(cache.get('key1') == b'x' * 200)
+    assert(cache.disk_hits == 2)
+    assert(len(cache) == 2)
+
+    cache.clear()
+    assert(cache.get('key0') is None)
+
+
+# -----------------------------------------------------------------------------
+def test_compute_stage_hits_skip_processing():
+    seeds = freeze({'IN': ps('uid0')})
+    other_seeds = freeze({'IN': ps('uid1')})
+    bms = [messages.ready('IN', payload=[1, 2, 3], seeds=seeds),
+           messages.ready('IN', payload=[1, 2, 3], seeds=other_seeds),
+           messages.ready('IN', payload=[1, 2, 3], seeds=seeds)]
+    func = CountingSquare()
+    cache = ResultCache()
+
+    with ThreadPoolExecutor(1) as executor:
+        stage = ComputeStage(func, 'OUT', split=list, executor=executor,
+                             cache=cache)
+        outputs, errors = run(stage, bms[:2])
+        assert(errors == [])
+        assert(func.calls == 6)
+
+        outputs, errors = run(stage, bms[2:])
+
+    assert(errors == [])
+    assert(func.calls == 6)
+    assert(outputs == [messages.ready('OUT', [1, 4, 9], seeds=seeds)])
+    assert(cache.hits == 1)
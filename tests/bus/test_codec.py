@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 19:02:51 2026
+@author: Jérémie Fache
+"""
+
+import io
+import threading
+import pytest
+from pyrsistent import (m as pm, s as ps, freeze)
+from moebius.bus import messages
+from moebius.bus import codec
+
+
+def create_messages():
+    seeds = freeze({'root': ps('id#0', 'id#1'), 'other': ps(3)})
+    return [messages.ready('A', payload=None),
+            messages.ready('tag é', payload='payload', seeds=seeds),
+            messages.processing('A', ratio=(1, 10), meta='meta', seeds=seeds),
+            messages.processing('A'),
+            messages.ready('B', payload=(1, -2.5, True, False, b'raw')),
+            messages.ready('B', payload=[1, {'x': 2}]),
+            messages.ready('B', payload=-(1 << 70)),
+            messages.BusMessage('C', 'FOO', 'payload', 'not a map'),
+            ]
+
+
+# -----------------------------------------------------------------------------
+def test_round_trip():
+    for bm in create_messages():
+        data = codec.encode(bm)
+        assert(codec.decode(data) == bm)
+        assert(codec.decode(memoryview(data)) == bm)
+
+
+# -----------------------------------------------------------------------------
+def test_processing_payload_is_compact():
+    bm = messages.processing('A', ratio=(1, 10), meta=None)
+    assert(len(codec.encode(bm)) < 40)
+
+
+# -----------------------------------------------------------------------------
+def test_stream_encoder_reuses_string_table():
+    bms = create_messages()
+    encoder = codec.Encoder()
+    decoder = codec.Decoder()
+
+    first = encoder.encode(bms[1])
+    second = encoder.encode(bms[1])
+    assert(len(second) < len(first))
+
+    assert(decoder.decode(first) == bms[1])
+    assert(decoder.decode(second) == bms[1])
+
+
+# -----------------------------------------------------------------------------
+def test_stream_encoder_after_a_failed_encode():
+    encoder = codec.Encoder()
+    decoder = codec.Decoder()
+    assert(decoder.decode(encoder.encode(messages.ready('A', 0))) ==
+           messages.ready('A', 0))
+
+    with pytest.raises(Exception):
+        encoder.encode(messages.ready('X', threading.Lock()))
+
+    for bm in [messages.ready('Y', 1), messages.processing('X'),
+               messages.ready('A', 2, seeds=freeze({'Z': ps('z')}))]:
+        assert(decoder.decode(encoder.encode(bm)) == bm)
+
+
+# -----------------------------------------------------------------------------
+def test_stream_string_table_does_not_grow_with_uids():
+    encoder = codec.Encoder()
+    decoder = codec.Decoder()
+    for i in range(1000):
+        bm = messages.ready('A', 'payload{}'.format(i)).identify(
+            'uid{}'.format(i))
+        assert(decoder.decode(encoder.encode(bm)) == bm)
+
+    # 'A' and 'READY'
+    assert(len(encoder._strings) == 2)
+    assert(len(decoder._strings) == 2)
+
+
+# -----------------------------------------------------------------------------
+def test_framed_file_round_trip():
+    bms = create_messages()
+    stream = io.BytesIO()
+    encoder = codec.Encoder()
+    for bm in bms:
+        encoder.write(stream, bm)
+
+    stream.seek(0)
+    assert(list(codec.Decoder().read(stream)) == bms)
+
+    decoder = codec.Decoder()
+    frames = codec.iter_frames(stream.getvalue())
+    assert([decoder.decode(frame) for frame in frames] == bms)
+
+
+# -----------------------------------------------------------------------------
+def test_zero_copy_bytes_payload():
+    data = codec.encode(messages.ready('A', payload=b'0123456789'))
+    buffer = bytearray(data)
+
+    bm = codec.decode(buffer, zero_copy=True)
+    assert(isinstance(bm.payload, memoryview))
+    assert(bm.payload == b'0123456789')
+
+    buffer[-12] = ord('X')
+    assert(bytes(bm.payload) == b'X123456789')
+
+
+# -----------------------------------------------------------------------------
+def test_pluggable_payload_encoder():
+    class ReprEncoder(object):
+        def encode(self, payload):
+            return repr(payload).encode()
+
+        def decode(self, view):
+            return eval(bytes(view).decode())
+
+    bm = messages.ready('A', payload=[1, 2, 3])
+    data = codec.encode(bm, payload_encoder=ReprEncoder())
+
+    assert(b'[1, 2, 3]' in data)
+    assert(codec.decode(data, payload_encoder=ReprEncoder()) == bm)
+
+
+# -----------------------------------------------------------------------------
+def test_malformed_data():
+    data = codec.encode(create_messages()[1])
+
+    with pytest.raises(codec.CodecError):
+        codec.decode(data[:-3])
+    with pytest.raises(codec.CodecError):
+        codec.decode(data + b'\x00')
+    with pytest.raises(codec.CodecError):
+        codec.decode(b'\x7f' + data[1:])
+    with pytest.raises(codec.CodecError):
+        list(codec.read_frames(io.BytesIO(b'\x10\x00\x00\x00abc')))
+
+
+# -----------------------------------------------------------------------------
+def test_decoder_shares_equal_seeds():
+    seeds = freeze({'root': ps('id#0')})
+    encoder = codec.Encoder()
+    decoder = codec.Decoder()
+
+    first = decoder.decode(encoder.encode(messages.ready('A', seeds=seeds)))
+    second = decoder.decode(encoder.encode(messages.ready('B', seeds=seeds)))
+    assert(first.seeds == seeds)
+    assert(second.seeds is first.seeds)
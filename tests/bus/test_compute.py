@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 16:05:48 2026
+@author: Jérémie Fache
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+import rx
+from pyrsistent import (s as ps, freeze)
+from moebius.bus import messages
+from moebius.bus.compute import ComputeStage
+
+
+def square(x):
+    return x * x
+
+
+def sleep_and_return(x):
+    time.sleep(x)
+    return x
+
+
+def spin_until_cancelled(duration, cancelled):
+    """
+    Burns CPU for *duration* seconds, or until *cancelled* is set.
+    """
+    end = time.thread_time() + duration
+    while time.thread_time() < end:
+        if cancelled.is_set():
+            return None
+    return duration
+
+
+def fail(x):
+    raise ValueError(x)
+
+
+def run(stage, bms, timeout=10.0):
+    outputs = []
+    errors = []
+    done = threading.Event()
+
+    def on_error(error):
+        errors.append(error)
+        done.set()
+
+    if not isinstance(bms, rx.Observable):
+        bms = rx.Observable.from_(bms)
+    stage(bms).subscribe(outputs.append,
+                                              on_error,
+                                              done.set)
+    assert(done.wait(timeout))
+    return outputs, errors
+
+
+# -----------------------------------------------------------------------------
+def test_progress_then_ready_with_input_seeds():
+    seeds = freeze({'root': ps('uid0')})
+    bms = [messages.processing('IN', ratio=(1, 2)),
+           messages.ready('IN', payload=[1, 2, 3, 4, 5], seeds=seeds)]
+
+    with ThreadPoolExecutor(2) as executor:
+        stage = ComputeStage(square, 'OUT', chunksize=2, split=list,
+                             executor=executor)
+        outputs, errors = run(stage, bms)
+
+    assert(errors == [])
+    assert([bm.status for bm in outputs]
+           == [messages.PROCESSING] * 3 + [messages.READY])
+    assert(sorted(bm.payload.ratio for bm in outputs[:3])
+           == [(2, 5), (4, 5), (5, 5)])
+    assert(outputs[-1] == messages.ready('OUT', [1, 4, 9, 16, 25],
+                                         seeds=seeds))
+    assert(all(bm.seeds == seeds and bm.tag == 'OUT' for bm in outputs))
+
+
+# -----------------------------------------------------------------------------
+def test_ordered_results():
+    bms = [messages.ready('IN', payload=delay)
+           for delay in (0.2, 0.0, 0.1)]
+
+    with ThreadPoolExecutor(3) as executor:
+        stage = ComputeStage(sleep_and_return, 'OUT', executor=executor)
+        outputs, _ = run(stage, bms)
+
+    results = [bm.payload for bm in outputs if bm.status == messages.READY]
+    assert(results == [0.2, 0.0, 0.1])
+
+
+# -----------------------------------------------------------------------------
+def test_unordered_results():
+    bms = [messages.ready('IN', payload=delay)
+           for delay in (0.3, 0.0, 0.15)]
+
+    with ThreadPoolExecutor(3) as executor:
+        stage = ComputeStage(sleep_and_return, 'OUT', ordered=False,
+                             executor=executor)
+        outputs, _ = run(stage, bms)
+
+    results = [bm.payload for bm in outputs if bm.status == messages.READY]
+    assert(results == [0.0, 0.15, 0.3])
+
+
+# -----------------------------------------------------------------------------
+def test_empty_split_gives_merged_empty_result():
+    with ThreadPoolExecutor(1) as executor:
+        stage = ComputeStage(square, 'OUT', split=list, merge=sum,
+                             executor=executor)
+        outputs, _ = run(stage, [messages.ready('IN', payload=[])])
+
+    assert(outputs == [messages.ready('OUT', 0)])
+
+
+# -----------------------------------------------------------------------------
+def test_errors_are_forwarded():
+    with ThreadPoolExecutor(1) as executor:
+        stage = ComputeStage(fail, 'OUT', executor=executor)
+        outputs, errors = run(stage, [messages.ready('IN', payload=1)])
+
+    assert(outputs == [])
+    assert(isinstance(errors[0], ValueError))
+
+
+# -----------------------------------------------------------------------------
+def test_process_pool():
+    bms = [messages.ready('IN', payload=list(range(i, i + 10)))
+           for i in range(4)]
+
+    with ComputeStage(square, 'OUT', workers=2, chunksize=3, split=list,
+                      merge=sum) as stage:
+        outputs, errors = run(stage, bms, timeout=60.0)
+
+    assert(errors == [])
+    results = [bm.payload for bm in outputs if bm.status == messages.READY]
+    assert(results == [sum(x * x for x in range(i, i + 10))
+                       for i in range(4)])
+
+
+# -----------------------------------------------------------------------------
+def test_chunksize_must_be_positive():
+    with pytest.raises(ValueError):
+        ComputeStage(square, 'OUT', chunksize=0)
+
+
+# -----------------------------------------------------------------------------
+def test_latest_wins_cancels_superseded_inputs():
+    bms = [messages.ready('IN', payload=[0.05] * 4) for _ in range(3)]
+    bms[-1] = messages.ready('IN', payload=[0.0] * 4)
+
+    with ThreadPoolExecutor(1) as executor:
+        stage = ComputeStage(sleep_and_return, 'OUT', split=list, merge=sum,
+                             executor=executor, latest_wins=True)
+        outputs, errors = run(stage, bms)
+
+    assert(errors == [])
+    assert(outputs[-1] == messages.ready('OUT', 0.0))
+    assert([bm.payload.ratio for bm in outputs[:-1]]
+           == [(i, 4) for i in range(1, 5)])
+
+    stats = stage.stats
+    assert(stats.cancelled == 2)
+    # only the first chunk of the first input may have started
+    assert(stats.skipped_items >= 7)
+    assert(stats.saved_cpu_time >= 0.0)
+
+
+# -----------------------------------------------------------------------------
+def test_latest_wins_uses_seeds():
+    bms = [messages.ready('IN', payload=0.1, seeds=freeze({'A': ps('a1')})),
+           messages.ready('IN', payload=0.0, seeds=freeze({'B': ps('b1')})),
+           messages.ready('IN', payload=0.0, seeds=freeze({'A': ps('a2')}))]
+
+    with ThreadPoolExecutor(2) as executor:
+        stage = ComputeStage(sleep_and_return, 'OUT', executor=executor,
+                             latest_wins=True)
+        outputs, _ = run(stage, bms)
+
+    results = [bm.seeds for bm in outputs if bm.status == messages.READY]
+    assert(results == [bms[1].seeds, bms[2].seeds])
+    assert(all(bm.seeds != bms[0].seeds for bm in outputs))
+    assert(stage.stats.cancelled == 1)
+
+
+# -----------------------------------------------------------------------------
+def test_latest_wins_interrupts_running_computations():
+    bms = [messages.ready('IN', payload=5.0),
+           messages.ready('IN', payload=0.05)]
+
+    def source(observer):
+        observer.on_next(bms[0])
+        # the first computation is running when the second input arrives
+        time.sleep(0.2)
+        observer.on_next(bms[1])
+        observer.on_completed()
+
+    with ThreadPoolExecutor(1) as executor:
+        stage = ComputeStage(spin_until_cancelled, 'OUT', executor=executor,
+                             latest_wins=True, cancellable=True)
+        start = time.perf_counter()
+        outputs, errors = run(stage, rx.Observable.create(source))
+        duration = time.perf_counter() - start
+
+    assert(errors == [])
+    assert(outputs[-1] == messages.ready('OUT', 0.05))
+    assert(duration < 2.0)
+
+    stats = stage.stats
+    assert(stats.cancelled == 1)
+    assert(stats.skipped_items == 1)
+    assert(stats.computed_items == 1)
+    # about 0.2 s spent on the first computation, out of an estimated 0.05
+    assert(stats.wasted_cpu_time > 0.1)
+    assert(stats.saved_cpu_time == 0.0)
+
+
+# -----------------------------------------------------------------------------
+def test_latest_wins_stops_running_chunks_between_items():
+    bms = [messages.ready('IN', payload=[0.05] * 10),
+           messages.ready('IN', payload=[0.0])]
+
+    with ThreadPoolExecutor(1) as executor:
+        stage = ComputeStage(sleep_and_return, 'OUT', split=list, merge=sum,
+                             chunksize=10, executor=executor,
+                             latest_wins=True)
+        outputs, errors = run(stage, bms)
+
+    assert(errors == [])
+    assert(outputs == [messages.processing('OUT', ratio=(1, 1)),
+                       messages.ready('OUT', 0.0)])
+    # the first chunk stopped after its first item
+    assert(stage.stats.skipped_items >= 9)
+
+
+# -----------------------------------------------------------------------------
+def test_latest_wins_interrupts_process_pool_computations():
+    bms = [messages.ready('IN', payload=5.0),
+           messages.ready('IN', payload=0.0)]
+
+    def source(observer):
+        observer.on_next(bms[0])
+        time.sleep(0.5)
+        observer.on_next(bms[1])
+        observer.on_completed()
+
+    with ComputeStage(spin_until_cancelled, 'OUT', workers=1,
+                      latest_wins=True, cancellable=True) as stage:
+        start = time.perf_counter()
+        outputs, errors = run(stage, rx.Observable.create(source),
+                              timeout=60.0)
+        duration = time.perf_counter() - start
+
+    assert(errors == [])
+    assert(outputs[-1] == messages.ready('OUT', 0.0))
+    assert(duration < 4.0)
+    assert(stage.stats.cancelled == 1)
+    assert(stage.stats.skipped_items == 1)
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 19:55:09 2026
+@author: Jérémie Fache
+"""
+
+import threading
+import pytest
+from rx.subjects import Subject
+from moebius.bus import messages
+from moebius.bus.flow import (BoundedQueue, BLOCK, DROP_OLDEST, DROP_NEWEST,
+                              DROP_PROCESSING)
+
+
+class GatedObserver(object):
+    """
+    Observer blocking on its first message until the gate is opened.
+    """
+
+    def __init__(self):
+        self.gate = threading.Event()
+        self.first = threading.Event()
+        self.done = threading.Event()
+        self.results = []
+
+    def on_next(self, bm):
+        self.results.append(bm)
+        self.first.set()
+        assert(self.gate.wait(10.0))
+
+    def on_error(self, error):
+        self.done.set()
+
+    def on_completed(self):
+        self.done.set()
+
+
+def fill(policy, bms, maxsize=3):
+    """
+    Sends *bms* to a boundary whose consumer is blocked on the first one,
+    then opens the gate and returns the delivered messages and the stats.
+    """
+    boundary = BoundedQueue(maxsize, policy)
+    source = Subject()
+    observer = GatedObserver()
+    source.let(boundary).subscribe(observer)
+
+    source.on_next(bms[0])
+    assert(observer.first.wait(10.0))
+    for bm in bms[1:]:
+        source.on_next(bm)
+    assert(boundary.stats.depth <= maxsize)
+
+    observer.gate.set()
+    source.on_completed()
+    assert(observer.done.wait(10.0))
+    return observer.results, boundary.stats
+
+
+def create_messages():
+    return [messages.ready('A', payload=0),
+            messages.processing('A', ratio=(1, 3)),
+            messages.ready('B', payload=1),
+            messages.processing('A', ratio=(2, 3)),
+            messages.ready('C', payload=2),
+            messages.processing('A', ratio=(3, 3))]
+
+
+# -----------------------------------------------------------------------------
+def test_drop_newest():
+    bms = create_messages()
+    results, stats = fill(DROP_NEWEST, bms)
+    assert(results == bms[:4])
+    assert(stats.dropped == {messages.READY: 1, messages.PROCESSING: 1})
+    assert(stats.total_dropped == 2)
+    assert(stats.depth == 0)
+    assert(stats.max_depth == 3)
+
+
+# -----------------------------------------------------------------------------
+def test_drop_oldest():
+    bms = create_messages()
+    results, stats = fill(DROP_OLDEST, bms)
+    assert(results == [bms[0]] + bms[3:])
+    assert(stats.total_dropped == 2)
+    assert(stats.received == 6 and stats.delivered == 4)
+
+
+# -----------------------------------------------------------------------------
+def test_drop_processing_never_drops_ready():
+    bms = create_messages()
+    results, stats = fill(DROP_PROCESSING, bms)
+    # the READY message of C takes the place of the oldest PROCESSING one
+    assert(results == [bms[0], bms[2], bms[3], bms[4]])
+    assert(stats.dropped == {messages.PROCESSING: 2})
+
+
+# -----------------------------------------------------------------------------
+def test_drop_processing_blocks_when_full_of_ready():
+    boundary = BoundedQueue(2, DROP_PROCESSING)
+    source = Subject()
+    observer = GatedObserver()
+    source.let(boundary).subscribe(observer)
+
+    bms = [messages.ready('A', payload=i) for i in range(5)]
+
+    def produce():
+        for bm in bms:
+            source.on_next(bm)
+        source.on_completed()
+
+    producer = threading.Thread(target=produce)
+    producer.start()
+    assert(observer.first.wait(10.0))
+    producer.join(0.2)
+    assert(producer.is_alive())
+
+    observer.gate.set()
+    producer.join(10.0)
+    assert(observer.done.wait(10.0))
+    assert(observer.results == bms)
+    assert(boundary.stats.blocked >= 1)
+    assert(boundary.stats.total_dropped == 0)
+
+
+# -----------------------------------------------------------------------------
+def test_block_keeps_everything():
+    boundary = BoundedQueue(4, BLOCK)
+    bms = [messages.ready('A', payload=i) for i in range(1000)]
+    results = []
+    done = threading.Event()
+    source = Subject()
+    source.let(boundary).subscribe(results.append, on_completed=done.set)
+    for bm in bms:
+        source.on_next(bm)
+    source.on_completed()
+
+    assert(done.wait(10.0))
+    assert(results == bms)
+    assert(boundary.stats.max_depth <= 4)
+
+
+# -----------------------------------------------------------------------------
+def test_invalid_arguments():
+    with pytest.raises(ValueError):
+        BoundedQueue(0)
+    with pytest.raises(ValueError):
+        BoundedQueue(10, 'DROP_EVERYTHING')
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Oct 21 15:03:11 2026
+@author: Jérémie Fache
+"""
+
+import pytest
+from pyrsistent import (m, s)
+from rx.subjects import Subject
+from moebius.bus import messages
+from moebius.bus.graph import Graph
+
+
+def create_graph():
+    """
+    A ─> SUM <─ B ─> DOUBLE
+          │
+          v
+        TOTAL <─ 'X...'
+    """
+    calls = []
+    graph = Graph()
+
+    @graph.node('SUM', 'A', 'B')
+    def add(a, b):
+        calls.append('SUM')
+        return a + b
+
+    @graph.node('DOUBLE', 'B')
+    def double(b):
+        calls.append('DOUBLE')
+        return 2 * b
+
+    @graph.node('TOTAL', 'SUM', 'X...')
+    def total(total, xs):
+        calls.append('TOTAL')
+        return total + sum(xs.values())
+
+    return graph, calls
+
+
+# -----------------------------------------------------------------------------
+def test_order_and_waiting_nodes():
+    graph, calls = create_graph()
+    assert(graph.order == ['SUM', 'DOUBLE', 'TOTAL'])
+
+    emitted = graph.push(messages.ready('A', 1))
+    assert(emitted[0].seeds == m(A=s('A#0')))
+    assert(len(emitted) == 1)
+    assert(graph.dry_run(messages.ready('B', 2)).waiting == ['TOTAL'])
+
+    emitted = graph.push(messages.ready('B', 2))
+    assert([bm.tag for bm in emitted] == ['B', 'SUM', 'DOUBLE'])
+    assert(graph.latest('SUM') == messages.ready(
+        'SUM', 3, seeds=m(A=s('A#0'), B=s('B#0'))))
+
+    emitted = graph.push(messages.ready('X1', 10))
+    assert([bm.tag for bm in emitted] == ['X1', 'TOTAL'])
+    assert(emitted[-1].payload == 13)
+    assert(calls == ['SUM', 'DOUBLE', 'TOTAL'])
+
+
+# -----------------------------------------------------------------------------
+def test_only_affected_nodes_are_recomputed():
+    graph, calls = create_graph()
+    for tag, value in (('A', 1), ('B', 2), ('X1', 10)):
+        graph.push(messages.ready(tag, value))
+    del calls[:]
+
+    # DOUBLE does not depend on A
+    emitted = graph.push(messages.ready('A', 5))
+    assert([bm.tag for bm in emitted] == ['A', 'SUM', 'TOTAL'])
+    assert(calls == ['SUM', 'TOTAL'])
+    assert(graph.latest('DOUBLE').payload == 4)
+    assert(graph.latest('TOTAL').payload == 17)
+
+    # a new tag matching the ellipsis input
+    del calls[:]
+    emitted = graph.push(messages.ready('X2', 100))
+    assert(calls == ['TOTAL'])
+    assert(emitted[-1].payload == 117)
+    assert(emitted[-1].seeds['X2'] == s('X2#0'))
+
+
+# -----------------------------------------------------------------------------
+def test_same_seeds_recompute_nothing():
+    graph, calls = create_graph()
+    a = messages.ready('A', 1).identify(7)
+    graph.push(a)
+    graph.push(messages.ready('B', 2))
+    graph.push(messages.ready('X1', 10))
+    del calls[:]
+
+    # an already seen root (e.g. delivered twice)
+    assert(graph.dry_run(a).recompute == [])
+    assert(graph.push(a) == [a])
+    assert(calls == [])
+
+
+# -----------------------------------------------------------------------------
+def test_dry_run_matches_push():
+    graph, calls = create_graph()
+    for tag, value in (('A', 1), ('B', 2), ('X1', 10), ('B', 3)):
+        bm = messages.ready(tag, value)
+        plan = graph.dry_run(bm)
+        del calls[:]
+        before = graph.computed
+        graph.push(bm)
+        assert(plan.recompute == calls)
+        assert(graph.computed - before == len(plan.recompute))
+
+    plan = graph.dry_run(messages.ready('A', 2))
+    assert(plan.recompute == ['SUM', 'TOTAL'])
+    assert(plan.reuse == ['DOUBLE'])
+    assert(plan.waiting == [])
+    # the dry run changed nothing
+    assert(graph.latest('A').payload == 1)
+    assert(graph.dry_run(messages.ready('A', 2)) == plan)
+
+
+# -----------------------------------------------------------------------------
+def test_invalid_graphs():
+    graph = Graph()
+    graph.add('B', abs, 'A')
+    with pytest.raises(ValueError):
+        graph.add('B', abs, 'C')
+    with pytest.raises(ValueError):
+        graph.push(messages.ready('B', 1))
+
+    graph.add('C', abs, 'B...')
+    graph.add('BB', abs, 'C')
+    with pytest.raises(ValueError):
+        graph.order
+
+
+# -----------------------------------------------------------------------------
+def test_operator():
+    graph, _ = create_graph()
+    source = Subject()
+    results = []
+    errors = []
+    graph(source).subscribe(results.append, errors.append)
+
+    source.on_next(messages.ready('A', 1))
+    source.on_next(messages.processing('B', ratio=(0, 1)))
+    source.on_next(messages.ready('B', 2))
+    assert([(bm.tag, bm.status) for bm in results] == [
+        ('A', messages.READY), ('B', messages.PROCESSING),
+        ('B', messages.READY), ('SUM', messages.READY),
+        ('DOUBLE', messages.READY)])
+
+    source.on_next(messages.ready('X1', 'not a number'))
+    assert(len(errors) == 1)
+    assert(isinstance(errors[0], TypeError))
+
+
+# -----------------------------------------------------------------------------
+def test_failed_push_leaves_the_graph_unchanged():
+    graph = Graph()
+    fail = [False]
+
+    def b(a):
+        if fail[0]:
+            raise ValueError(a)
+        return a + 1
+
+    graph.add('B', b, 'A')
+    graph.add('C', lambda b: 2 * b, 'B')
+    graph.push(messages.ready('A', 1).identify('a1'))
+
+    fail[0] = True
+    a2 = messages.ready('A', 2).identify('a2')
+    with pytest.raises(ValueError):
+        graph.push(a2)
+    assert(graph.latest('A').seeds == m(A=s('a1')))
+    assert(graph.latest('B').seeds == m(A=s('a1')))
+    assert(graph.dry_run(a2).recompute == ['B', 'C'])
+
+    # the same root is recomputed once the node works again
+    fail[0] = False
+    emitted = graph.push(a2)
+    assert([bm.payload for bm in emitted] == [2, 3, 6])
+    assert(graph.latest('C').seeds == m(A=s('a2')))
+
+    # unidentified roots get the uid of the failed push back
+    fail[0] = True
+    with pytest.raises(ValueError):
+        graph.push(messages.ready('A', 3))
+    fail[0] = False
+    assert(graph.push(messages.ready('A', 3))[0].seeds == m(A=s('A#0')))
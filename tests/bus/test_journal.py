@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 20:58:40 2026
+@author: Jérémie Fache
+"""
+
+import os
+import pytest
+from pyrsistent import (s as ps, freeze)
+from moebius.bus import messages
+from moebius.bus.journal import Journal
+
+
+def create_messages():
+    seeds = freeze({'root': ps('id#0')})
+    return [messages.ready('A', payload=0, seeds=seeds),
+            messages.processing('A', ratio=(1, 2), seeds=seeds),
+            messages.ready('AB', payload=1),
+            messages.ready('B', payload=2),
+            messages.ready('A', payload=3, seeds=seeds),
+            messages.processing('B', ratio=(1, 2)),
+            messages.ready('B', payload=4),
+            ]
+
+
+# -----------------------------------------------------------------------------
+def test_replay_with_oftype_selectors(tmp_path):
+    bms = create_messages()
+    with Journal(str(tmp_path)) as journal:
+        for bm in bms:
+            journal.append(bm)
+
+        assert(len(journal) == len(bms))
+        assert(list(journal.replay()) == bms)
+
+        for tag, status in ((None, None),
+                            ('A', None),
+                            ('A...', messages.READY),
+                            (('B', 'AB'), None),
+                            (None, messages.PROCESSING),
+                            ('X...', None)):
+            filt = messages.oftype(tag, status)
+            expected = [bm for bm in bms if filt(bm)]
+            assert(list(journal.replay(tag, status)) == expected)
+            assert(journal.count(tag, status) == len(expected))
+
+
+# -----------------------------------------------------------------------------
+def test_reopen(tmp_path):
+    bms = create_messages()
+    with Journal(str(tmp_path)) as journal:
+        for bm in bms[:4]:
+            journal.append(bm)
+
+    with Journal(str(tmp_path)) as journal:
+        assert(list(journal.replay()) == bms[:4])
+        for bm in bms[4:]:
+            journal.append(bm)
+        assert(list(journal.replay('A')) == [bms[0], bms[1], bms[4]])
+
+    with Journal(str(tmp_path)) as journal:
+        assert(list(journal.replay()) == bms)
+
+
+# -----------------------------------------------------------------------------
+def test_partially_written_record_is_ignored(tmp_path):
+    bms = create_messages()
+    with Journal(str(tmp_path)) as journal:
+        for bm in bms:
+            journal.append(bm)
+        segment = journal.segments[-1]
+
+    path = os.path.join(str(tmp_path), '{:08d}.seg'.format(segment))
+    with open(path, 'r+b') as f:
+        f.truncate(os.path.getsize(path) - 3)
+
+    with Journal(str(tmp_path)) as journal:
+        assert(list(journal.replay()) == bms[:-1])
+
+
+# -----------------------------------------------------------------------------
+def test_partially_written_string_is_ignored(tmp_path):
+    bms = create_messages()
+    with Journal(str(tmp_path)) as journal:
+        for bm in bms:
+            journal.append(bm)
+
+    # 'B', the last interned string, is torn
+    path = os.path.join(str(tmp_path), 'strings.dat')
+    with open(path, 'r+b') as f:
+        f.truncate(os.path.getsize(path) - 2)
+
+    with Journal(str(tmp_path)) as journal:
+        assert(list(journal.replay()) == bms[:3])
+        journal.append(messages.ready('C', payload=5))
+
+    # the code of 'B' went to 'C', the entries of 'B' are not read as 'C'
+    with Journal(str(tmp_path)) as journal:
+        assert(list(journal.replay()) == bms[:3] + [
+            messages.ready('C', payload=5)])
+
+
+# -----------------------------------------------------------------------------
+def test_segment_rotation(tmp_path):
+    bms = [messages.ready('T{}'.format(i % 3), payload='x' * 100)
+           for i in range(30)]
+    with Journal(str(tmp_path), max_segment_bytes=500) as journal:
+        for bm in bms:
+            journal.append(bm)
+
+        assert(len(journal.segments) > 5)
+        assert(list(journal.replay()) == bms)
+        assert(list(journal.replay('T1')) == bms[1::3])
+
+    with Journal(str(tmp_path)) as journal:
+        assert(list(journal.replay()) == bms)
+
+
+# -----------------------------------------------------------------------------
+def test_compaction_keeps_last_ready_per_tag(tmp_path):
+    bms = create_messages()
+    with Journal(str(tmp_path), max_segment_bytes=100) as journal:
+        for bm in bms:
+            journal.append(bm)
+        journal.compact()
+
+        expected = [bms[2], bms[4], bms[6]]
+        assert(list(journal.replay()) == expected)
+        assert(len(journal) == 3)
+
+        journal.append(bms[0])
+        assert(list(journal.replay('A')) == [bms[4], bms[0]])
+
+    with Journal(str(tmp_path)) as journal:
+        assert(list(journal.replay()) == expected + [bms[0]])
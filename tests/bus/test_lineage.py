@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Oct 22 10:27:53 2026
+@author: Jérémie Fache
+"""
+
+from pyrsistent import (m, s)
+from moebius.bus import messages
+from moebius.bus.lineage import LineageIndex
+
+
+def pipeline(index, n_frames):
+    """
+    Adds to *index* the messages of frames A#i, each giving a SPECTRUM
+    combined with the calibration C#0 into a REPORT.
+    """
+    calibration = messages.ready('C', 'calibration').identify('C#0')
+    index.add(calibration)
+    for i in range(n_frames):
+        frame = messages.ready('A', i).identify('A#{}'.format(i))
+        spectrum = messages.ready('SPECTRUM', i, seeds=frame.seeds)
+        index.add(frame)
+        index.add(messages.processing('SPECTRUM', ratio=(0, 1),
+                                      seeds=frame.seeds))
+        index.add(spectrum)
+        index.add(messages.ready('REPORT', i, seeds=messages.combine_seeds(
+            spectrum.seeds, calibration.seeds)))
+    return calibration
+
+
+# -----------------------------------------------------------------------------
+def test_forward_and_backward_queries():
+    index = LineageIndex()
+    calibration = pipeline(index, 3)
+    # PROCESSING messages are not retained by default
+    assert(len(index) == 1 + 3 * 3)
+
+    derived = index.derived('A', 'A#1')
+    assert([(bm.tag, bm.payload) for bm in derived] == [
+        ('A', 1), ('SPECTRUM', 1), ('REPORT', 1)])
+    assert(index.derived('A', 'A#1', 'REP...') == derived[-1:])
+    assert(len(index.derived('C', 'C#0', 'REPORT')) == 3)
+    assert(index.derived('A', 'A#9') == [])
+    assert(('A', 'A#2') in index)
+
+    report = index.latest('REPORT')
+    assert(report.payload == 2)
+    sources = index.sources(report)
+    assert(len(sources) == 2)
+    assert(calibration in sources)
+    assert(index.latest('A') in sources)
+    assert(index.sources(None) == [])
+
+
+# -----------------------------------------------------------------------------
+def test_selectors():
+    index = LineageIndex(tag='SPECTRUM', status=None)
+    pipeline(index, 2)
+    assert(len(index) == 4)
+    assert([bm.status for bm in index.derived('A', 'A#0')] == [
+        messages.PROCESSING, messages.READY])
+    assert(index.derived('A', 'A#0', status=messages.READY) == [
+        messages.ready('SPECTRUM', 0, seeds=m(A=s('A#0')))])
+
+
+# -----------------------------------------------------------------------------
+def test_count_eviction():
+    index = LineageIndex(max_messages=4)
+    calibration = pipeline(index, 3)
+    assert(len(index) == 4)
+    assert(index.evictions == 6)
+
+    # the calibration and the first frames are gone
+    assert(index.sources(index.latest('REPORT')) == [index.latest('A')])
+    assert(('A', 'A#0') not in index)
+    assert([bm.payload for bm in index.derived('C', 'C#0')] == [1, 2])
+    assert(calibration not in index.derived('C', 'C#0'))
+
+
+# -----------------------------------------------------------------------------
+def test_age_eviction():
+    now = [0.0]
+    index = LineageIndex(max_age=10.0, clock=lambda: now[0])
+    index.add(messages.ready('A', 0).identify('A#0'))
+    now[0] = 5.0
+    index.add(messages.ready('A', 1).identify('A#1'))
+
+    now[0] = 12.0
+    index.expire()
+    assert(len(index) == 1)
+    assert(index.latest('A').payload == 1)
+    assert(('A', 'A#0') not in index)
+
+    now[0] = 20.0
+    index.add(messages.ready('B', 0).identify('B#0'))
+    assert(len(index) == 1)
+    assert(index.latest('A') is None)
@@ -50,3 +50,12 @@ def test_identify_with_non_alphanumeric_tag_status_uid():
     mc = messages.BusMessage(tag=tag, status=status, payload=0, seeds=seeds_c)
     assert(m1 == mc)
 
+
+
+def test_identify_shares_seeds():
+    m0 = messages.BusMessage(tag='tag', status='status', payload=0, seeds=m())
+    m1 = m0.identify('UID')
+    m2 = m0._replace(payload=1).identify('UID')
+    assert(m1.seeds is m2.seeds)
+    assert(m1.payload == 0)
+    assert(m2.payload == 1)
@@ -38,3 +38,44 @@ def test_processing_message():
     assert(bm_r.status == status)
     assert(bm_r.payload.ratio == ratio)
     assert(bm_r.payload.meta == meta)
+
+
+def test_processing_payload():
+    bm = messages.processing('tag', ratio=(1, 10), meta='meta')
+    assert(isinstance(bm.payload, messages.Progress))
+    assert(bm.payload == messages.Progress((1, 10), 'meta'))
+    assert(bm.payload['ratio'] == (1, 10))
+    assert(bm.payload.get('meta') == 'meta')
+    assert(bm.payload.get('other') is None)
+    with pytest.raises(KeyError):
+        bm.payload['other']
+    # tuple methods are not fields
+    with pytest.raises(KeyError):
+        bm.payload['count']
+    assert(bm.payload.get('index', 0) == 0)
+    assert('ratio' in bm.payload)
+    assert('count' not in bm.payload)
+    assert(bm.payload[0] == (1, 10))
+    with pytest.raises(AttributeError):
+        bm.payload.ratio = None
+
+    # payloads without ratio nor meta are shared
+    assert(messages.processing('A').payload
+           is messages.processing('B').payload)
+
+
+def test_ready_many():
+    seeds = freeze({'root': ps('id#0')})
+    bms = messages.ready_many('tag', range(3), seeds=seeds)
+    assert(bms == [messages.ready('tag', i, seeds=seeds) for i in range(3)])
+
+    bms = messages.ready_many('tag', 'ab', uids=['u0', 'u1'])
+    assert(bms == [messages.ready('tag', 'a').identify('u0'),
+                   messages.ready('tag', 'b').identify('u1')])
+
+
+def test_processing_many():
+    ratios = [(i, 3) for i in range(1, 4)]
+    bms = messages.processing_many('tag', ratios, meta='meta')
+    assert(bms == [messages.processing('tag', ratio, 'meta')
+                   for ratio in ratios])
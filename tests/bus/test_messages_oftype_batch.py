@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 11:12:45 2026
+@author: Jérémie Fache
+"""
+
+import random
+import pytest
+from collections import namedtuple
+from moebius.bus import messages
+
+
+def create_message(tag, status):
+    return messages.BusMessage(tag=tag,
+                               status=status,
+                               payload=tag,
+                               seeds=tag)
+
+
+# -----------------------------------------------------------------------------
+def test_raise_TypeError_when_no_tag_or_status_attrib():
+    filt = messages.oftype('abc...', 'stat0')
+
+    with pytest.raises(TypeError):
+        filt.mask([create_message('abc', 'stat0'),
+                   namedtuple('M', 'tag, foo')(tag='abc', foo='cde')])
+
+    with pytest.raises(TypeError):
+        filt.filter_many([namedtuple('M', 'bar')(bar='abc')])
+
+
+# -----------------------------------------------------------------------------
+def test_mask_and_filter_many():
+    m = [create_message('A', 'STARTED'),
+         create_message('A', 'PROCESSING'),
+         create_message('B', 'STARTED'),
+         create_message('C', 'READY'),
+         create_message('CC', 'PROCESSING'),
+         create_message('', 'PROCESSING'),
+         ]
+
+    filt = messages.oftype(('A', 'C...'), 'PROCESSING')
+
+    assert(filt.mask(m) == [False, True, False, False, True, False])
+    assert(filt.filter_many(m) == [m[1], m[4]])
+    assert(filt.mask([]) == [])
+
+
+# -----------------------------------------------------------------------------
+def test_mask_columns():
+    filt = messages.oftype('ab...', ('S0', 'S1'))
+    tags = ['a', 'ab', 'abc', 'b', 'abd']
+    statuses = ['S0', 'S0', 'S1', 'S1', 'S2']
+
+    assert(filt.mask_columns(tags, statuses)
+           == [False, True, True, False, False])
+
+
+# -----------------------------------------------------------------------------
+def test_select_distinct_values():
+    filt = messages.oftype(('x', 'ab...', 'a...b'), 'S0')
+
+    assert(filt.select_tags({'a', 'ab', 'abc', 'b', 'x', 'xx'})
+           == {'a', 'ab', 'abc', 'x'})
+    assert(filt.select_status({'S0', 'S1'}) == {'S0'})
+    assert(messages.oftype().select_tags({'a', 'b'}) == {'a', 'b'})
+
+
+# -----------------------------------------------------------------------------
+def test_mask_same_results_as_oftype():
+    rnd = random.Random(1)
+
+    def random_tag():
+        return ''.join(rnd.choice('abc') for _ in range(rnd.randint(0, 4)))
+
+    bms = [create_message(random_tag(), rnd.choice(['S0', 'S1', 'S2']))
+           for _ in range(300)]
+
+    for _ in range(50):
+        tags = [random_tag() + ('...' if rnd.random() < 0.5 else '')
+                for _ in range(rnd.randint(1, 3))]
+        status = rnd.choice([None, 'S0', ('S0', 'S2')])
+        filt = messages.oftype(tags, status)
+
+        assert(filt.mask(bms) == [filt(bm) for bm in bms])
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 11:58:30 2026
+@author: Jérémie Fache
+"""
+
+import pytest
+from moebius.bus import messages
+
+
+def create_message(tag, status):
+    return messages.BusMessage(tag=tag,
+                               status=status,
+                               payload=tag,
+                               seeds=tag)
+
+
+# -----------------------------------------------------------------------------
+def test_equivalent_arguments_return_same_function():
+    oftype = messages.oftype
+
+    assert(oftype(('A', 'B')) is oftype(['B', 'A', 'A']))
+    assert(oftype('ab...', ('S0', 'S1')) is oftype('ab...', ('S1', 'S0')))
+    assert(oftype(('ab...', 'a...')) is oftype('a...'))
+    assert(oftype(('abc', 'a...x')) is oftype('a...'))
+    assert(oftype() is oftype(None, None))
+
+    assert(oftype('A') is not oftype('A...'))
+    assert(oftype(()) is not oftype(None))
+
+
+# -----------------------------------------------------------------------------
+def test_cache_statistics():
+    messages.oftype.cache_clear()
+
+    messages.oftype('abc...', 'S0')
+    messages.oftype('abc...', 'S0')
+    messages.oftype(('abc...', 'abcd...'), ('S0', 'S0'))
+
+    info = messages.oftype.cache_info()
+    assert(info.misses == 1)
+    assert(info.hits == 2)
+    assert(info.currsize == 1)
+    assert(info.maxsize == messages.OFTYPE_CACHE_SIZE)
+
+
+# -----------------------------------------------------------------------------
+def test_canonicalized_function_keeps_semantics():
+    filt = messages.oftype(tag=('abc...', 'Bb', 'cd...', 'cdx', 'abcd...'))
+
+    assert(filt(create_message('ab', 'status0')) == False)
+    assert(filt(create_message('abc', 'status0')) == True)
+    assert(filt(create_message('abcd', 'status0')) == True)
+    assert(filt(create_message('Bb', 'status0')) == True)
+    assert(filt(create_message('Bbb', 'status0')) == False)
+    assert(filt(create_message('cdx', 'status0')) == True)
+    assert(filt(create_message('c', 'status0')) == False)
+
+
+# -----------------------------------------------------------------------------
+def test_unhashable_status_is_not_cached():
+    filt = messages.oftype('A', [['S0']])
+
+    assert(filt(create_message('A', ['S0'])) == True)
+    assert(filt(create_message('A', 'S0')) == False)
+
+
+# -----------------------------------------------------------------------------
+def test_unhashable_message_values_do_not_match():
+    filt = messages.oftype('A', 'S0')
+    bms = [create_message('A', ['S0']), create_message(['A'], 'S0'),
+           create_message('A', 'S0')]
+
+    assert(filt(bms[0]) == False)
+    assert(filt(bms[1]) == False)
+    assert(filt(bms[2]) == True)
+    assert(filt.mask(bms) == [False, False, True])
+    assert(messages.oftype(status='S0').filter_many(bms) == bms[1:])
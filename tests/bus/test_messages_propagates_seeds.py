@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 14:02:37 2026
+@author: Jérémie Fache
+"""
+
+import threading
+import pytest
+import rx
+from pyrsistent import (m as pm, s as ps, freeze)
+from moebius.bus import messages
+
+
+def identified(tag, uid, payload=None):
+    return messages.ready(tag, payload).identify(uid)
+
+
+# -----------------------------------------------------------------------------
+def test_only_ready_messages_are_forwarded():
+    received = []
+
+    @messages.propagates_seeds()
+    def stage(a):
+        return a.do_action(received.append).map(
+            lambda bm: messages.ready('OUT', bm.payload))
+
+    source = rx.subjects.Subject()
+    outputs = []
+    stage(source).subscribe(outputs.append)
+
+    source.on_next(messages.processing('A', ratio=(1, 2)))
+    source.on_next(identified('A', 'uid0', payload=1))
+
+    assert([bm.status for bm in received] == [messages.READY])
+    assert(outputs == [messages.ready('OUT', 1,
+                                      seeds=freeze({'A': ps('uid0')}))])
+
+
+# -----------------------------------------------------------------------------
+def test_outputs_carry_latest_seeds_of_every_input():
+    @messages.propagates_seeds()
+    def stage(a, b):
+        return a.combine_latest(
+            b, lambda x, y: messages.ready('C', x.payload + y.payload))
+
+    sa = rx.subjects.Subject()
+    sb = rx.subjects.Subject()
+    outputs = []
+    stage(sa, sb).subscribe(outputs.append)
+
+    sa.on_next(identified('A', 'a0', 1))
+    sb.on_next(identified('B', 'b0', 10))
+    sa.on_next(identified('A', 'a1', 2))
+
+    assert([bm.payload for bm in outputs] == [11, 12])
+    assert(outputs[0].seeds == freeze({'A': ps('a0'), 'B': ps('b0')}))
+    assert(outputs[1].seeds == freeze({'A': ps('a1'), 'B': ps('b0')}))
+
+
+# -----------------------------------------------------------------------------
+def test_seeds_sharing_a_tag_are_unioned_and_replaced():
+    @messages.propagates_seeds()
+    def stage(a, b):
+        return rx.Observable.merge(a, b).map(
+            lambda bm: messages.ready('OUT', bm.payload))
+
+    sa = rx.subjects.Subject()
+    sb = rx.subjects.Subject()
+    outputs = []
+    stage(sa, sb).subscribe(outputs.append)
+
+    sa.on_next(messages.ready('X', seeds=freeze({'R': ps('r0')})))
+    sb.on_next(messages.ready('Y', seeds=freeze({'R': ps('r1'),
+                                                 'S': ps('s0')})))
+    sb.on_next(messages.ready('Y', seeds=freeze({'R': ps('r2')})))
+
+    assert(outputs[1].seeds == freeze({'R': ps('r0', 'r1'), 'S': ps('s0')}))
+    assert(outputs[2].seeds == freeze({'R': ps('r0', 'r2')}))
+
+
+# -----------------------------------------------------------------------------
+def test_own_seeds_of_outputs_are_kept():
+    @messages.propagates_seeds()
+    def stage(a):
+        return a.map(lambda bm: messages.ready(
+            'OUT', seeds=freeze({'OWN': ps('o0')})))
+
+    source = rx.subjects.Subject()
+    outputs = []
+    stage(source).subscribe(outputs.append)
+    source.on_next(identified('A', 'a0'))
+
+    assert(outputs[0].seeds == freeze({'A': ps('a0'), 'OWN': ps('o0')}))
+
+
+# -----------------------------------------------------------------------------
+def test_fan_in_at_high_rate():
+    n_inputs = 8
+    n_messages = 2000
+
+    @messages.propagates_seeds()
+    def stage(*streams):
+        return rx.Observable.merge(*streams).map(
+            lambda bm: messages.ready('OUT', bm.payload))
+
+    subjects = [rx.subjects.Subject() for _ in range(n_inputs)]
+    outputs = []
+    lock = threading.Lock()
+
+    def collect(bm):
+        with lock:
+            outputs.append(bm)
+
+    stage(*subjects).subscribe(collect)
+
+    def produce(index):
+        tag = 'IN{}'.format(index)
+        for i in range(n_messages):
+            subjects[index].on_next(messages.processing(tag, ratio=(i, 2)))
+            subjects[index].on_next(identified(tag, '{}-{}'.format(tag, i),
+                                               payload=i))
+
+    threads = [threading.Thread(target=produce, args=(index,))
+               for index in range(n_inputs)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert(len(outputs) == n_inputs * n_messages)
+
+    last = n_messages - 1
+    expected = freeze({'IN{}'.format(index): ps('IN{}-{}'.format(index, last))
+                       for index in range(n_inputs)})
+
+    # one more message from each input gives the final combination
+    for index in range(n_inputs):
+        tag = 'IN{}'.format(index)
+        subjects[index].on_next(identified(tag, '{}-{}'.format(tag, last)))
+    assert(outputs[-1].seeds == expected)
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 11:02:51 2026
+@author: Jérémie Fache
+"""
+
+import json
+import subprocess
+import sys
+import rx
+from rx.subjects import Subject
+from moebius.bus import messages
+from moebius.bus.metrics import (Histogram, Metrics, N_BUCKETS)
+
+
+# -----------------------------------------------------------------------------
+def test_disabled_metrics_return_streams_unchanged():
+    metrics = Metrics()
+    source = rx.Observable.from_([messages.ready('A')])
+
+    def stage(source):
+        return source
+
+    assert(metrics.instrument(source, 'source') is source)
+    assert(metrics.instrument_stage(stage, 'stage') is stage)
+    assert(metrics.snapshot() == {'probes': {}, 'stages': {}})
+
+
+# -----------------------------------------------------------------------------
+def test_counts_per_tag_and_status():
+    metrics = Metrics(enabled=True)
+    bms = [messages.ready('A'),
+           messages.processing('A', ratio=(1, 2)),
+           messages.ready('A'),
+           messages.ready('B')]
+    metrics.instrument(rx.Observable.from_(bms), 'source').subscribe()
+
+    snapshot = metrics.snapshot()['probes']['source']
+    assert(snapshot['total'] == 4)
+    assert(snapshot['counts'] == {'A': {messages.READY: 2,
+                                        messages.PROCESSING: 1},
+                                  'B': {messages.READY: 1}})
+
+
+# -----------------------------------------------------------------------------
+def test_histogram_percentiles():
+    hist = Histogram()
+    assert(hist.percentile(50) is None)
+
+    for _ in range(90):
+        hist.record(10e-6)
+    for _ in range(10):
+        hist.record(1e-3)
+    hist.record(1e6)
+
+    assert(hist.count == 101)
+    assert(10e-6 <= hist.percentile(50) <= 16e-6)
+    assert(1e-3 <= hist.percentile(99) <= 1024e-6)
+    assert(hist.percentile(100) == 1e6)
+    assert(hist.buckets[N_BUCKETS - 1] == 1)
+
+
+# -----------------------------------------------------------------------------
+def test_stage_latencies():
+    metrics = Metrics(enabled=True)
+    source = Subject()
+    output = Subject()
+
+    def stage(source):
+        source.subscribe(lambda bm: None)
+        return output
+
+    results = []
+    metrics.instrument_stage(stage, 'B')(source).subscribe(results.append)
+
+    source.on_next(messages.ready('A'))
+    output.on_next(messages.processing('B', ratio=(0, 2)))
+    output.on_next(messages.processing('B', ratio=(1, 2)))
+    output.on_next(messages.ready('B'))
+    output.on_next(messages.ready('B'))
+
+    assert(len(results) == 4)
+    snapshot = metrics.snapshot()
+    stats = snapshot['stages']['B']
+    assert(stats['ready_to_ready']['count'] == 2)
+    assert(stats['processing_to_ready']['count'] == 1)
+    assert(snapshot['probes']['B']['counts']['B'] ==
+           {messages.READY: 2, messages.PROCESSING: 2})
+
+
+# -----------------------------------------------------------------------------
+def test_dump_and_stats_command(tmp_path):
+    metrics = Metrics(enabled=True)
+    bms = [messages.ready('A'), messages.processing('B', ratio=(1, 2))]
+    metrics.instrument(rx.Observable.from_(bms), 'source').subscribe()
+    metrics.stage('B')
+
+    path = str(tmp_path / 'stats.json')
+    metrics.dump(path)
+    with open(path) as f:
+        assert(json.load(f)['probes']['source']['total'] == 2)
+
+    output = subprocess.check_output(
+        [sys.executable, '-m', 'moebius', 'stats', path],
+        universal_newlines=True)
+    assert('probe source: 2 messages' in output)
+    assert('stage B:' in output)
+
+    metrics.reset()
+    assert(metrics.snapshot() == {'probes': {}, 'stages': {}})
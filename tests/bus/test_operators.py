@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 14:48:12 2026
+@author: Jérémie Fache
+"""
+
+import pytest
+from rx.subjects import Subject
+from rx.testing import TestScheduler
+from moebius.bus import messages
+from moebius.bus.operators import (coalesce_processing, Deduplicate)
+
+
+def create_coalesced(**kwargs):
+    scheduler = TestScheduler()
+    source = Subject()
+    results = []
+    completed = []
+    operator = coalesce_processing(scheduler=scheduler, **kwargs)
+    operator(source).subscribe(results.append,
+                               on_completed=lambda: completed.append(True))
+    return scheduler, source, results, completed
+
+
+def progress(tag, step, total=100):
+    return messages.processing(tag, ratio=(step, total))
+
+
+# -----------------------------------------------------------------------------
+def test_first_last_and_ready_pass_through():
+    scheduler, source, results, _ = create_coalesced(window=1.0)
+    bms = [progress('A', i) for i in range(101)]
+    for bm in bms:
+        source.on_next(bm)
+    source.on_next(messages.ready('A', payload=1))
+
+    assert(results == [bms[0], bms[-1], messages.ready('A', payload=1)])
+
+    # a new computation of the tag starts again with its first message
+    source.on_next(bms[1])
+    assert(results[-1] == bms[1])
+
+
+# -----------------------------------------------------------------------------
+def test_latest_message_is_emitted_at_the_end_of_the_window():
+    scheduler, source, results, _ = create_coalesced(window=1.0)
+    source.on_next(progress('A', 0))
+    scheduler.advance_to(100)
+    source.on_next(progress('A', 1))
+    source.on_next(progress('A', 2))
+    source.on_next(progress('B', 0))
+    assert(results == [progress('A', 0), progress('B', 0)])
+
+    scheduler.advance_to(1000)
+    assert(results[-1] == progress('A', 2))
+
+    # the window is elapsed: the next message goes straight through
+    scheduler.advance_to(2500)
+    source.on_next(progress('A', 3))
+    assert(results[-1] == progress('A', 3))
+    assert(len(results) == 4)
+
+
+# -----------------------------------------------------------------------------
+def test_ready_drops_pending_progress():
+    scheduler, source, results, _ = create_coalesced(window=1.0)
+    source.on_next(progress('A', 0))
+    source.on_next(progress('A', 1))
+    source.on_next(messages.ready('A'))
+    scheduler.advance_to(5000)
+
+    assert(results == [progress('A', 0), messages.ready('A')])
+
+
+# -----------------------------------------------------------------------------
+def test_min_delta():
+    scheduler, source, results, _ = create_coalesced(window=None,
+                                                     min_delta=0.095)
+    for i in range(100):
+        source.on_next(progress('A', i))
+    scheduler.advance_to(5000)
+
+    assert([bm.payload['ratio'][0] for bm in results] ==
+           list(range(0, 100, 10)))
+
+
+# -----------------------------------------------------------------------------
+def test_pending_progress_is_emitted_on_completion():
+    scheduler, source, results, completed = create_coalesced(window=1.0)
+    source.on_next(progress('A', 0))
+    source.on_next(progress('A', 1))
+    source.on_next(progress('A', 2))
+    source.on_completed()
+
+    assert(results == [progress('A', 0), progress('A', 2)])
+    assert(completed == [True])
+
+
+# -----------------------------------------------------------------------------
+def test_invalid_arguments():
+    with pytest.raises(ValueError):
+        coalesce_processing(window=None, min_delta=None)
+
+
+# -----------------------------------------------------------------------------
+def create_deduplicated(**kwargs):
+    scheduler = TestScheduler()
+    source = Subject()
+    results = []
+    dedup = Deduplicate(scheduler=scheduler, **kwargs)
+    dedup(source).subscribe(results.append)
+    return scheduler, source, results, dedup
+
+
+def test_duplicates_are_dropped():
+    _, source, results, dedup = create_deduplicated()
+    a0 = messages.ready('A', 1).identify('a0')
+    bms = [a0,
+           messages.ready('A', 'redelivered').identify('a0'),
+           messages.ready('A', 2).identify('a1'),
+           messages.ready('B', 1).identify('a0'),
+           # not deduplicated: PROCESSING and messages without seeds
+           progress('A', 0).identify('a0'),
+           progress('A', 0).identify('a0'),
+           messages.ready('C', 1),
+           messages.ready('C', 1),
+           a0]
+
+    for bm in bms:
+        source.on_next(bm)
+
+    assert(results == [bms[i] for i in (0, 2, 3, 4, 5, 6, 7)])
+    assert(dedup.dropped == 2)
+    assert(dedup.passed == 7)
+
+
+# -----------------------------------------------------------------------------
+def test_count_window():
+    _, source, results, dedup = create_deduplicated(max_messages=2)
+    bms = [messages.ready('A', i).identify(i) for i in range(5)]
+    for bm in bms:
+        source.on_next(bm)
+
+    # generations {2, 3} and {4}: 0 and 1 are forgotten
+    for bm in reversed(bms):
+        source.on_next(bm)
+    assert(results == bms + [bms[1], bms[0]])
+    assert(dedup.dropped == 3)
+
+
+# -----------------------------------------------------------------------------
+def test_time_window():
+    scheduler, source, results, dedup = create_deduplicated(window=1.0)
+    a = messages.ready('A').identify(0)
+    b = messages.ready('B').identify(0)
+    source.on_next(a)
+    scheduler.advance_to(1500)
+    source.on_next(a)
+    source.on_next(b)
+    assert(results == [a, b])
+
+    # a is forgotten with the previous generation, b is still remembered
+    scheduler.advance_to(2600)
+    source.on_next(a)
+    source.on_next(b)
+    assert(results == [a, b, a])
+
+    # both generations are too old
+    scheduler.advance_to(10000)
+    source.on_next(b)
+    assert(results == [a, b, a, b])
+
+
+# -----------------------------------------------------------------------------
+def test_fingerprint_bits():
+    assert(Deduplicate(max_messages=1000, fp_rate=1e-6).bits == 31)
+    assert(Deduplicate(max_messages=10 ** 9, fp_rate=1e-20).bits == 64)
+    with pytest.raises(ValueError):
+        Deduplicate(fp_rate=0.0)
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 10:27:44 2026
+@author: Jérémie Fache
+"""
+
+import threading
+import pytest
+import rx
+from moebius.bus import messages
+from moebius.bus.priority import (PriorityBuffer, PriorityDelivery,
+                                  DEFAULT_RULES)
+
+
+class Clock(object):
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def drain(buffer):
+    bms = []
+    while buffer:
+        bms.append(buffer.pop())
+    return bms
+
+
+# -----------------------------------------------------------------------------
+def test_ready_first_and_tag_order_is_kept():
+    buffer = PriorityBuffer(clock=Clock())
+    a0 = messages.processing('A', ratio=(0, 2))
+    b0 = messages.processing('B', ratio=(0, 2))
+    b1 = messages.processing('B', ratio=(1, 2))
+    c = messages.ready('C')
+    b2 = messages.ready('B')
+    d = messages.ready('D', payload=0)
+    for bm in (a0, b0, b1, c, b2, d):
+        buffer.push(bm)
+
+    # the READY of B pulls its PROCESSING messages before it
+    assert(drain(buffer) == [b0, b1, c, b2, d, a0])
+    with pytest.raises(IndexError):
+        buffer.pop()
+
+
+# -----------------------------------------------------------------------------
+def test_rules_with_ellipsis_tags():
+    rules = (('ALERT...', None, -1),) + DEFAULT_RULES
+    buffer = PriorityBuffer(rules, default_priority=1, clock=Clock())
+    bms = [messages.ready('A'),
+           messages.BM('A2', 'STARTED', None, {}),
+           messages.processing('ALERT.disk'),
+           messages.processing('B')]
+    for bm in bms:
+        buffer.push(bm)
+
+    assert(buffer.priority(bms[1]) == 1)
+    assert(drain(buffer) == [bms[2], bms[0], bms[1], bms[3]])
+
+
+# -----------------------------------------------------------------------------
+def test_starvation_protection():
+    clock = Clock()
+    buffer = PriorityBuffer(max_delay=1.0, clock=clock)
+    starving = messages.processing('A')
+    buffer.push(starving)
+
+    delivered = []
+    for i in range(5):
+        clock.now += 0.4
+        buffer.push(messages.ready('B', payload=i))
+        delivered.append(buffer.pop())
+
+    # A has waited more than one second after the third READY
+    assert(delivered.index(starving) == 2)
+
+
+# -----------------------------------------------------------------------------
+def test_delivery():
+    bms = ([messages.processing('A', ratio=(i, 100)) for i in range(100)]
+           + [messages.ready('B', payload=i) for i in range(10)])
+    gate = threading.Event()
+    done = threading.Event()
+    results = []
+
+    def on_next(bm):
+        results.append(bm)
+        gate.wait(10.0)
+
+    rx.Observable.from_(bms).let(PriorityDelivery(maxsize=200)).subscribe(
+        on_next, on_completed=done.set)
+    gate.set()
+    assert(done.wait(10.0))
+
+    assert(sorted(results, key=bms.index) == bms)
+    # READY messages overtake most of the PROCESSING ones
+    assert(max(results.index(bm) for bm in bms[100:]) < 20)
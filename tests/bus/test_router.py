@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 10:40:03 2026
+@author: Jérémie Fache
+"""
+
+import random
+import pytest
+from collections import namedtuple
+from moebius.bus import messages
+from moebius.bus.router import MessageRouter
+
+
+def create_message(tag, status):
+    return messages.BusMessage(tag=tag,
+                               status=status,
+                               payload=tag,
+                               seeds=tag)
+
+
+# -----------------------------------------------------------------------------
+def test_raise_TypeError_when_no_tag_or_status_attrib():
+    router = MessageRouter()
+    router.register(lambda bm: None, 'abc...', 'stat0')
+
+    with pytest.raises(TypeError):
+        router.dispatch(namedtuple('M', 'bar, foo')(bar='abc', foo='cde'))
+
+    with pytest.raises(TypeError):
+        router.dispatch(namedtuple('M', 'tag, foo')(tag='abc', foo='cde'))
+
+
+# -----------------------------------------------------------------------------
+def test_dispatch_calls_matching_handlers():
+    received = []
+    router = MessageRouter()
+    router.register(lambda bm: received.append(('A', bm.tag)), 'A')
+    router.register(lambda bm: received.append(('C...', bm.tag)), 'C...')
+    router.register(lambda bm: received.append(('R', bm.tag)),
+                    status='READY')
+
+    assert(router.dispatch(create_message('A', 'PROC')) == 1)
+    assert(router.dispatch(create_message('CC', 'READY')) == 2)
+    assert(router.dispatch(create_message('B', 'PROC')) == 0)
+
+    assert(received == [('A', 'A'), ('C...', 'CC'), ('R', 'CC')])
+
+
+# -----------------------------------------------------------------------------
+def test_handler_with_overlapping_tags_is_called_once():
+    received = []
+    router = MessageRouter()
+    router.register(received.append, tag=('ab...', 'abc', 'a...'))
+
+    router.dispatch(create_message('abc', 'status0'))
+    assert(len(received) == 1)
+
+
+# -----------------------------------------------------------------------------
+def test_empty_prefix_matches_all_tags():
+    router = MessageRouter()
+    router.register(lambda bm: None, tag='...', status='READY')
+
+    assert(len(router.match(create_message('', 'READY'))) == 1)
+    assert(len(router.match(create_message('xyz', 'READY'))) == 1)
+    assert(len(router.match(create_message('xyz', 'PROC'))) == 0)
+
+
+# -----------------------------------------------------------------------------
+def test_unregister():
+    router = MessageRouter()
+    rid = router.register(lambda bm: None, tag='A')
+    router.register(lambda bm: None, tag='A...')
+
+    assert(len(router.match(create_message('A', 'status0'))) == 2)
+    router.unregister(rid)
+    assert(len(router) == 1)
+    assert(len(router.match(create_message('A', 'status0'))) == 1)
+
+
+# -----------------------------------------------------------------------------
+def test_unregister_prunes_the_index():
+    router = MessageRouter()
+    keep = router.register(lambda bm: None, tag='ab...', status='READY')
+    for _ in range(100):
+        rids = [router.register(lambda bm: None, tag=('abc...', 'A', 'a...'),
+                                status=('READY', 'PROC')),
+                router.register(lambda bm: None, status='READY')]
+        for rid in rids:
+            router.unregister(rid)
+
+    assert(len(router) == 1)
+    assert(router._exact == {})
+    assert(router._any_tag.any_status == [])
+    assert(not router._any_tag)
+    node = router._trie.children['a']
+    assert(node.entry is None)
+    assert(list(node.children) == ['b'])
+    assert(node.children['b'].children == {})
+    assert(len(router.match(create_message('abc', 'READY'))) == 1)
+
+    router.unregister(keep)
+    assert(router._trie.children == {})
+
+
+# -----------------------------------------------------------------------------
+def test_same_results_as_oftype():
+    rnd = random.Random(0)
+    alphabet = 'abc'
+
+    def random_tag():
+        return ''.join(rnd.choice(alphabet)
+                       for _ in range(rnd.randint(0, 4)))
+
+    def random_tags():
+        if rnd.random() < 0.1:
+            return None
+        tags = [random_tag() + ('...' if rnd.random() < 0.4 else '')
+                for _ in range(rnd.randint(1, 3))]
+        return tags[0] if len(tags) == 1 else tags
+
+    def random_status():
+        choice = rnd.choice([None, 'READY', 'PROC', ('READY', 'PROC')])
+        return choice
+
+    router = MessageRouter()
+    filters = []
+    for index in range(200):
+        tag = random_tags()
+        status = random_status()
+        router.register(index, tag=tag, status=status)
+        filters.append(messages.oftype(tag, status))
+
+    for _ in range(500):
+        bm = create_message(random_tag(), rnd.choice(['READY', 'PROC', 'X']))
+        expected = [index for index, filt in enumerate(filters) if filt(bm)]
+        assert(router.match(bm) == expected)
+
+    # unhashable tags and status match nothing but the wildcards
+    for tag, status in [(['a'], 'READY'), ('a', ['READY']),
+                        ({'a': 1}, {'READY'}), (['a'], ['READY'])]:
+        bm = create_message(tag, status)
+        expected = [index for index, filt in enumerate(filters) if filt(bm)]
+        assert(router.match(bm) == expected)
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 15:20:16 2026
+@author: Jérémie Fache
+"""
+
+import pickle
+import pytest
+from pyrsistent import (m as pm, s as ps, freeze)
+from moebius.bus import messages
+from moebius.bus import seeds as seeds_module
+from moebius.bus.seeds import (SeedSet, UidTable, BLOCK_BITS, seedset,
+                               union_all, compact)
+
+
+# -----------------------------------------------------------------------------
+def test_seedset_behaves_as_a_set():
+    seeds = seedset('uid0', 'uid1', 'uid1')
+
+    assert(len(seeds) == 2)
+    assert('uid0' in seeds)
+    assert('uid2' not in seeds)
+    assert('never interned' not in seeds)
+    assert(set(seeds) == {'uid0', 'uid1'})
+    assert(len(seedset()) == 0)
+
+
+# -----------------------------------------------------------------------------
+def test_seedset_equals_and_hashes_as_pset():
+    assert(seedset('a', 'b') == ps('a', 'b'))
+    assert(ps('a', 'b') == seedset('b', 'a'))
+    assert(seedset('a') != ps('a', 'b'))
+    assert(seedset('a', 'b') == frozenset({'a', 'b'}))
+    assert(hash(seedset('a', 'b')) == hash(ps('a', 'b')))
+
+
+# -----------------------------------------------------------------------------
+def test_union():
+    assert(seedset('u0') | seedset('u1') == seedset('u0', 'u1'))
+    assert(seedset('u0') | ps('u1') == ps('u0', 'u1'))
+    assert(ps('u1') | seedset('u0') == ps('u0', 'u1'))
+    assert(union_all(seedset('u0'), seedset(), seedset('u1', 'u2'))
+           == seedset('u0', 'u1', 'u2'))
+    assert(union_all() == seedset())
+
+
+# -----------------------------------------------------------------------------
+def test_bitmap_blocks_do_not_depend_on_code_distance():
+    table = UidTable()
+    for i in range(100000):
+        table.code('uid{}'.format(i))
+
+    first = SeedSet(['uid0', 'uid1'], table=table)
+    assert(first._keys == (0,))
+    assert(first._words == (0b11,))
+
+    seeds = first | table.seedset('uid99999')
+    assert(len(seeds._keys) == 2)
+    assert(max(bits.bit_length() for bits in seeds._words) <= 1 << BLOCK_BITS)
+    assert(len(seeds) == 3)
+    assert(set(seeds) == {'uid0', 'uid1', 'uid99999'})
+    assert('uid99999' in seeds)
+    assert('uid50000' not in seeds)
+    assert(seeds == union_all(table.seedset('uid99999', 'uid1'),
+                              table.seedset('uid0')))
+
+
+# -----------------------------------------------------------------------------
+def test_default_table_is_replaced_when_full(monkeypatch):
+    monkeypatch.setattr(seeds_module, 'TABLE_SIZE', 3)
+    monkeypatch.setattr(seeds_module, '_default_table', UidTable())
+
+    old = seedset('a', 'b', 'c')
+    new = seedset('d')
+    assert(new._table is not old._table)
+    assert(len(new._table) == 1)
+    # sets of different tables are compared and united by uids
+    assert(old | new == ps('a', 'b', 'c', 'd'))
+    assert(seedset('a') == old - ps('b', 'c'))
+    assert(hash(seedset('a', 'd')) == hash(ps('a', 'd')))
+
+
+# -----------------------------------------------------------------------------
+def test_pickle_round_trip():
+    seeds = seedset('uid0', 'uid1')
+    assert(pickle.loads(pickle.dumps(seeds)) == seeds)
+
+
+# -----------------------------------------------------------------------------
+def test_combine_seeds_with_seedsets():
+    s0 = pm(A=seedset('a0'), B=seedset('b0'))
+    s1 = pm(A=seedset('a1'))
+    s2 = pm(A=seedset('a2'), C=seedset('c0'))
+
+    result = messages.combine_seeds(s0, None, s1, s2)
+
+    assert(result == freeze({'A': ps('a0', 'a1', 'a2'),
+                             'B': ps('b0'),
+                             'C': ps('c0')}))
+    assert(isinstance(result['A'], SeedSet))
+
+
+# -----------------------------------------------------------------------------
+def test_combine_seeds_mixing_representations():
+    result = messages.combine_seeds(pm(A=seedset('a0')), pm(A=ps('a1')))
+    assert(result == freeze({'A': ps('a0', 'a1')}))
+
+
+# -----------------------------------------------------------------------------
+def test_identify_with_seedset_factory():
+    bm = messages.ready('tag').identify('UID', factory=seedset)
+
+    assert(isinstance(bm.seeds['tag'], SeedSet))
+    assert(bm == messages.ready('tag').identify('UID'))
+    assert(hash(bm.seeds) == hash(freeze({'tag': ps('UID')})))
+
+
+# -----------------------------------------------------------------------------
+def test_compact():
+    seeds = compact(freeze({'A': ps('a0', 'a1'), 'B': seedset('b0')}))
+
+    assert(all(isinstance(vec, SeedSet) for vec in seeds.values()))
+    assert(seeds == freeze({'A': ps('a0', 'a1'), 'B': ps('b0')}))
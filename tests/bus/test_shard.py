@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 14:21:37 2026
+@author: Jérémie Fache
+"""
+
+import os
+import subprocess
+import sys
+import pytest
+from moebius.bus import messages
+from moebius.bus.shard import (ShardedBus, shard_of)
+
+
+def setup(router, publish, index):
+    """
+    IN... -> MID... -> OUT..., each step possibly on another shard.
+    """
+    def to_mid(bm):
+        publish(messages.ready('MID' + bm.tag[2:], payload=bm.payload))
+
+    def to_out(bm):
+        publish(messages.ready('OUT' + bm.tag[3:],
+                               payload=(bm.payload, index)))
+
+    router.register(to_mid, 'IN...')
+    router.register(to_out, 'MID...')
+
+
+def failing_setup(router, publish, index):
+    """
+    Publishes OUT<payload> for IN messages, raising for odd payloads.
+    """
+    def handle(bm):
+        if bm.payload % 2:
+            raise ValueError(bm.payload)
+        publish(messages.ready('OUT', payload=bm.payload))
+
+    router.register(handle, 'IN...')
+    router.register(lambda bm: publish(messages.ready('OUT', payload=-1)),
+                    'IN...')
+
+
+def broken_setup(router, publish, index):
+    raise ValueError('broken setup')
+
+
+def source():
+    return [messages.ready('IN{}'.format(i % 5), payload=i)
+            for i in range(50)]
+
+
+# -----------------------------------------------------------------------------
+def test_shard_of():
+    assert(shard_of('A', 4) == shard_of('A', 4))
+    assert(0 <= shard_of('A', 4) < 4)
+    prefixes = ('CAM1', 'CAM')
+    assert(len({shard_of('CAM{}'.format(i), 7, prefixes)
+                for i in range(100)}) == 2)
+
+
+# -----------------------------------------------------------------------------
+def test_messages_cross_shards_in_order():
+    results = []
+    with ShardedBus(setup, workers=3, prefixes=('MID...',)) as bus:
+        bus.subscribe(results.append, 'OUT...', messages.READY)
+        bus.start()
+        for bm in source():
+            bus.publish(bm)
+        assert(bus.wait(timeout=30.0))
+    assert(sum(bus.counts) == 150)
+
+    assert(len(results) == 50)
+    # all the MID tags are owned by the same shard
+    assert({index for _, index in (bm.payload for bm in results)}
+           == {bus.shard_of('MID')})
+    for i in range(5):
+        payloads = [bm.payload[0] for bm in results
+                    if bm.tag == 'OUT{}'.format(i)]
+        assert(payloads == list(range(i, 50, 5)))
+
+
+# -----------------------------------------------------------------------------
+def test_handler_errors_are_reported():
+    results = []
+    errors = []
+    with ShardedBus(failing_setup, workers=2, on_error=errors.append) as bus:
+        bus.subscribe(results.append, 'OUT')
+        bus.subscribe(lambda bm: 1 / bm.payload, 'OUT')
+        bus.start()
+        for i in range(10):
+            bus.publish(messages.ready('IN{}'.format(i), payload=i))
+        assert(bus.wait(timeout=30.0))
+
+        # the workers are still alive
+        bus.publish(messages.ready('IN', payload=10))
+        assert(bus.wait(timeout=30.0))
+
+    # the other handlers of a message are called after an error
+    assert(sorted(bm.payload for bm in results) == [-1] * 11 + [
+        0, 2, 4, 6, 8, 10])
+    assert(errors == bus.errors)
+    assert(sorted(error.bm.payload for error in errors
+                  if error.worker is not None) == [1, 3, 5, 7, 9])
+    assert(all('ValueError' in error.traceback for error in errors
+               if error.worker is not None))
+    # 1 / 0 in the parent process
+    parent = [error for error in errors if error.worker is None]
+    assert([error.bm.payload for error in parent] == [0])
+    assert('ZeroDivisionError' in parent[0].traceback)
+
+
+# -----------------------------------------------------------------------------
+def test_wait_fails_when_a_worker_exited():
+    with ShardedBus(broken_setup, workers=2) as bus:
+        bus.start()
+        for i in range(10):
+            bus.publish(messages.ready('IN{}'.format(i), payload=i))
+        with pytest.raises(RuntimeError):
+            bus.wait(timeout=30.0)
+
+
+# -----------------------------------------------------------------------------
+def test_stop_waits_for_messages_published_by_handlers():
+    results = []
+    with ShardedBus(setup, workers=3) as bus:
+        bus.subscribe(results.append, 'OUT...')
+        bus.start()
+        for bm in source():
+            bus.publish(bm)
+    assert(len(results) == 50)
+
+
+# -----------------------------------------------------------------------------
+def test_subscribe_after_start():
+    with ShardedBus(setup, workers=1) as bus:
+        bus.start()
+        with pytest.raises(RuntimeError):
+            bus.subscribe(print)
+
+
+# -----------------------------------------------------------------------------
+def test_prefixes_must_have_ellipsis():
+    with pytest.raises(ValueError):
+        ShardedBus(setup, workers=2, prefixes=('A',))
+
+
+# -----------------------------------------------------------------------------
+def test_shard_command():
+    env = dict(os.environ)
+    tests = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env['PYTHONPATH'] = os.pathsep.join([tests, env.get('PYTHONPATH', '')])
+    output = subprocess.check_output(
+        [sys.executable, '-m', 'moebius', 'shard', 'bus.test_shard:setup',
+         '--workers', '2', '--source', 'bus.test_shard:source'],
+        env=env, universal_newlines=True, timeout=60)
+    assert('worker   1' in output)
+    assert('total: 150 messages' in output)
+
+
+# -----------------------------------------------------------------------------
+def test_shard_command_with_broken_setup():
+    env = dict(os.environ)
+    tests = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env['PYTHONPATH'] = os.pathsep.join([tests, env.get('PYTHONPATH', '')])
+    process = subprocess.run(
+        [sys.executable, '-m', 'moebius', 'shard',
+         'bus.test_shard:broken_setup', '--workers', '2',
+         '--source', 'bus.test_shard:source'],
+        env=env, universal_newlines=True, timeout=60,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    assert(process.returncode == 1)
+    assert('exited with code' in process.stderr)
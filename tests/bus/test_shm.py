@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 17:38:26 2026
+@author: Jérémie Fache
+"""
+
+import multiprocessing
+import pytest
+from pyrsistent import (s as ps, freeze)
+from moebius.bus import messages
+from moebius.bus.shm import (SharedRing, ShmPublisher, ShmSubscriber,
+                             PayloadHandle, RingFull, ALIGNMENT)
+
+
+def consume(control, acks, results):
+    subscriber = ShmSubscriber(control, acks)
+    while True:
+        bm = subscriber.get(timeout=10.0)
+        if bm.payload is None:
+            break
+        with subscriber.payload(bm) as payload:
+            results.put((bm.tag, bm.seeds, bytes(payload)))
+    subscriber.close()
+
+
+# -----------------------------------------------------------------------------
+def test_envelope_and_zero_copy_view():
+    with SharedRing(4096) as ring:
+        control = multiprocessing.Queue()
+        publisher = ShmPublisher(ring, [control])
+        seeds = freeze({'root': ps('uid0')})
+        publisher.publish(messages.ready('FRAME', b'abcdef', seeds=seeds))
+        publisher.publish(messages.ready('OTHER', payload=12))
+
+        subscriber = ShmSubscriber(control, ring.acks)
+        bm = subscriber.get(timeout=10.0)
+        assert(isinstance(bm.payload, PayloadHandle))
+        assert((bm.tag, bm.seeds) == ('FRAME', seeds))
+
+        view = subscriber.view(bm.payload)
+        assert(isinstance(view, memoryview))
+        assert(view.obj is subscriber._blocks[ring.name].buf.obj)
+        assert(bytes(view) == b'abcdef')
+        view.release()
+
+        with subscriber.payload(subscriber.get(timeout=10.0)) as payload:
+            assert(payload == 12)
+
+        assert(len(ring) == 1)
+        subscriber.ack(bm.payload)
+        ring.collect(block=True, timeout=10.0)
+        assert(len(ring) == 0)
+        subscriber.close()
+
+
+# -----------------------------------------------------------------------------
+def test_slots_are_released_after_every_acknowledgement():
+    with SharedRing(4 * ALIGNMENT) as ring:
+        handles = [ring.put(b'x' * ALIGNMENT, refs=2) for _ in range(4)]
+        with pytest.raises(RingFull):
+            ring.put(b'y', refs=1)
+
+        # the oldest slot is only reclaimed when both subscribers released it
+        ring.release(handles[0].slot)
+        with pytest.raises(RingFull):
+            ring.put(b'y', refs=1)
+        ring.release(handles[1].slot)
+        ring.release(handles[1].slot)
+        with pytest.raises(RingFull):
+            ring.put(b'y', refs=1)
+
+        ring.release(handles[0].slot)
+        assert(len(ring) == 2)
+        handle = ring.put(b'y' * 100, refs=1)
+        # wrapped around to the start of the ring
+        assert(handle.offset == 0)
+        with pytest.raises(RingFull):
+            ring.put(b'z' * 3 * ALIGNMENT, refs=1)
+
+
+# -----------------------------------------------------------------------------
+def test_payload_larger_than_the_ring():
+    with SharedRing(ALIGNMENT) as ring:
+        with pytest.raises(RingFull):
+            ring.put(b'x' * (ALIGNMENT + 1), refs=1)
+
+    # fits the ring, but not once aligned: fails at once, even if waiting
+    with SharedRing(100) as ring:
+        with pytest.raises(RingFull):
+            ring.put(b'x' * 90, refs=1, timeout=None)
+        ring.put(b'x' * ALIGNMENT, refs=1)
+
+
+# -----------------------------------------------------------------------------
+def test_subscriber_processes():
+    payloads = [bytes([i]) * (i * 1000 + 1) for i in range(20)]
+    with SharedRing(64 * 1024) as ring:
+        controls = [multiprocessing.Queue() for _ in range(2)]
+        results = [multiprocessing.Queue() for _ in range(2)]
+        processes = [multiprocessing.Process(target=consume,
+                                             args=(control, ring.acks, out),
+                                             daemon=True)
+                     for control, out in zip(controls, results)]
+        for process in processes:
+            process.start()
+
+        # the ring is smaller than the payloads: slots are reused as soon as
+        # both subscribers acknowledged them
+        publisher = ShmPublisher(ring, controls, timeout=10.0)
+        for i, payload in enumerate(payloads):
+            publisher.publish(messages.ready('T{}'.format(i), payload))
+        publisher.publish(messages.ready('END'))
+
+        for out in results:
+            received = [out.get(timeout=10.0) for _ in payloads]
+            assert([payload for _, _, payload in received] == payloads)
+        for process in processes:
+            process.join(10.0)
+            assert(process.exitcode == 0)
+
+        ring.collect()
+        assert(len(ring) == 0)
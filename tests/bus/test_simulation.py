@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Oct 22 15:36:02 2026
+@author: Jérémie Fache
+"""
+
+import time
+from datetime import timedelta
+import pytest
+from moebius.bus import messages
+from moebius.bus.operators import coalesce_processing
+from moebius.bus.simulation import (VirtualScheduler, LoadGenerator,
+                                    Simulation, format_report)
+
+
+def run_pipeline(seed=0, duration=10.0, **kwargs):
+    sim = Simulation()
+    load = LoadGenerator({'A': 3, 'B': 1}, rate=200, steps=4,
+                         job_time=0.005, seed=seed, **kwargs)
+    results = []
+    (sim.source(load, duration)
+     .let(coalesce_processing(window=0.001, scheduler=sim.scheduler))
+     .let(sim.stage('decode', 0.0002))
+     .filter(messages.oftype(status=messages.READY))
+     .let(sim.stage('fft', 0.0045, maxsize=10))
+     .subscribe(results.append))
+    return sim, sim.run(), results
+
+
+# -----------------------------------------------------------------------------
+def test_virtual_scheduler():
+    scheduler = VirtualScheduler()
+    calls = []
+    for delay in (0.00025, 0.0001, 0.00025, 0.0):
+        scheduler.schedule_relative(
+            timedelta(seconds=delay),
+            lambda s, d: calls.append((d, s.clock)), delay)
+    scheduler.schedule_relative(2, lambda s, _: calls.append(s.seconds))
+
+    scheduler.start()
+    # microseconds kept, same time in scheduling order, integers are ms
+    assert(calls == [(0.0, 0), (0.0001, 100), (0.00025, 250),
+                     (0.00025, 250), 0.002])
+
+
+# -----------------------------------------------------------------------------
+def test_run_until_keeps_scheduling_order():
+    scheduler = VirtualScheduler()
+    calls = []
+    for i in range(3):
+        scheduler.schedule_relative(1, lambda s, i: calls.append(i), i)
+
+    # the first action is taken out of the queue and put back, not due yet
+    scheduler.run_until(0.0005)
+    assert(calls == [])
+    scheduler.run_until(0.002)
+    assert(calls == [0, 1, 2])
+
+
+# -----------------------------------------------------------------------------
+def test_load_generator():
+    load = LoadGenerator({'A': 3, 'B': 1}, rate=1000, steps=2,
+                         job_time=0.01, seed=1)
+    events = load.events(2.0)
+    assert(events == LoadGenerator({'A': 3, 'B': 1}, rate=1000, steps=2,
+                                   job_time=0.01, seed=1).events(2.0))
+    assert(events != LoadGenerator({'A': 3, 'B': 1}, rate=1000, steps=2,
+                                   job_time=0.01, seed=2).events(2.0))
+    assert([t for t, _ in events] == sorted(t for t, _ in events))
+
+    readys = [bm for _, bm in events if bm.status == messages.READY]
+    assert(1800 < len(readys) < 2200)
+    assert(len(events) == 3 * len(readys))
+    share = sum(bm.tag == 'A' for bm in readys) / len(readys)
+    assert(0.7 < share < 0.8)
+
+    # the messages of a job share its uid and end with its READY message
+    first = readys[0]
+    job = [bm for _, bm in events if bm.seeds == first.seeds]
+    assert(job == [messages.processing(first.tag, (1, 2), seeds=first.seeds),
+                   messages.processing(first.tag, (2, 2), seeds=first.seeds),
+                   first])
+    assert(first.seeds == messages.ready(first.tag).identify(
+        first.tag + '#0').seeds)
+
+
+# -----------------------------------------------------------------------------
+def test_bursts():
+    load = LoadGenerator(['A'], rate=100, burst_period=1.0,
+                         burst_duration=0.1, burst_factor=10)
+    times = [t for t, _ in load.arrivals(100.0)]
+    in_bursts = sum(t % 1.0 < 0.1 for t in times)
+    # 10 times the rate during a tenth of the time: half of the jobs
+    assert(0.45 < in_bursts / len(times) < 0.55)
+    assert(load.rate_at(5.05) == 1000)
+    assert(load.rate_at(5.5) == 100)
+
+
+# -----------------------------------------------------------------------------
+def test_report():
+    sim, report, results = run_pipeline()
+    assert(report['duration'] == pytest.approx(10.0, abs=0.01))
+
+    decode = report['stages']['decode']
+    fft = report['stages']['fft']
+    assert(decode['dropped'] == 0)
+    assert(decode['emitted'] == decode['received'])
+    assert(fft['received'] == len(results) + fft['dropped'])
+    assert(fft['emitted'] == len(results))
+    assert(fft['throughput'] == pytest.approx(len(results) / 10.0, rel=0.01))
+
+    # fft is loaded at 90%: messages queue up, to at most maxsize
+    assert(fft['max_depth'] == 10)
+    assert(fft['dropped'] > 0)
+    assert(fft['mean_depth'] > decode['mean_depth'])
+    assert(fft['latency']['p50'] >= 0.0045)
+    assert(fft['latency']['p99'] > fft['latency']['p50'])
+    assert(decode['latency']['max'] < fft['latency']['max'])
+
+    text = format_report(report)
+    assert('stage decode' in text)
+    assert('stage fft' in text)
+
+
+# -----------------------------------------------------------------------------
+def test_deterministic_and_faster_than_real_time():
+    start = time.perf_counter()
+    _, report, results = run_pipeline(seed=3, burst_period=1.0,
+                                      burst_duration=0.1, burst_factor=3)
+    wall_time = time.perf_counter() - start
+    assert(wall_time < report['duration'] / 2)
+
+    _, again, results_again = run_pipeline(seed=3, burst_period=1.0,
+                                           burst_duration=0.1,
+                                           burst_factor=3)
+    assert(results == results_again)
+    del report['wall_time']
+    del again['wall_time']
+    assert(report == again)
+
+
+# -----------------------------------------------------------------------------
+def test_handler_and_workers():
+    sim = Simulation()
+    load = LoadGenerator(['A'], rate=100, seed=0)
+    results = []
+    completed = []
+
+    def split(bm):
+        if bm.payload % 2:
+            return None
+        return [bm, bm._replace(tag='B')]
+
+    (sim.source(load, 1.0)
+     .let(sim.stage('split', lambda bm: 0.05, split, workers=100))
+     .subscribe(results.append, on_completed=lambda: completed.append(True)))
+    report = sim.run()
+
+    stage = report['stages']['split']
+    assert(stage['emitted'] == len(results))
+    assert(stage['emitted'] == 2 * stage['latency']['count'])
+    assert(stage['latency']['max'] == pytest.approx(0.05))
+    # completion waits for the messages in service
+    assert(completed == [True])
+    assert(report['duration'] > 1.0)
+
+    with pytest.raises(ValueError):
+        sim.stage('split')
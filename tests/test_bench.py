@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 10:05:31 2026
+@author: Jérémie Fache
+"""
+
+import json
+import pytest
+from moebius import bench
+from moebius.__main__ import main
+
+
+# -----------------------------------------------------------------------------
+def test_run_saves_results_for_every_point(tmp_path):
+    output = tmp_path / 'results.json'
+    status = main(['bench', 'ready', 'combine_seeds', '--quick',
+                   '--repeat', '1', '--min-time', '0.0001',
+                   '-o', str(output)])
+
+    assert(status == 0)
+    results = json.loads(output.read_text())
+    assert(list(results['results']) == ['combine_seeds', 'ready'])
+    assert(len(results['results']['combine_seeds']) == 4)
+    assert('n_maps=2,seed_size=1' in results['results']['combine_seeds'])
+
+
+# -----------------------------------------------------------------------------
+def test_compare_with_baseline():
+    baseline = {'results': {'a': {'x=1': 1.0, 'x=2': 1.0}}}
+    results = {'results': {'a': {'x=1': 1.1, 'x=2': 1.5, 'x=3': 9.0},
+                           'b': {'x=1': 9.0}}}
+
+    assert(bench.compare(results, baseline, 0.2) == [('a', 'x=2', 1.0, 1.5)])
+    assert(bench.compare(results, baseline, 0.6) == [])
+
+
+# -----------------------------------------------------------------------------
+def test_regression_fails_the_run(tmp_path):
+    baseline = tmp_path / 'baseline.json'
+    baseline.write_text(json.dumps(
+        {'results': {'ready': {'n_messages=1000': 1e-9}}}))
+
+    status = main(['bench', 'ready', '--quick', '--repeat', '1',
+                   '--min-time', '0.0001', '-b', str(baseline)])
+    assert(status == 1)
+
+
+# -----------------------------------------------------------------------------
+def test_unknown_benchmark():
+    with pytest.raises(SystemExit):
+        main(['bench', 'unknown'])